@@ -3,6 +3,12 @@ from rest_framework_simplejwt.views import TokenRefreshView
 from .views import (
     AdminLoginView,
     DashboardView,
+    DashboardTimeseriesView,
+    DashboardCrosstabView,
+    DashboardPortfolioView,
+    DashboardCommentTermsView,
+    DashboardCommentsView,
+    DashboardLiveView,
     AdminResponsesListView,
     AdminResponsesExportExcelView,
     AdminResponsesExportPdfView,
@@ -10,6 +16,7 @@ from .views import (
     AdminUserListCreateView,
     AdminUserDetailView,
     AdminUserResetPasswordView,
+    IngestMetricsView,
 )
 from surveys.admin_views import AdminSurveyListCreateView
 
@@ -17,10 +24,17 @@ urlpatterns = [
     path('login/', AdminLoginView.as_view(), name='admin-login'),
     path('token/refresh/', TokenRefreshView.as_view(), name='admin-token-refresh'),
     path('dashboard/', DashboardView.as_view(), name='admin-dashboard'),
+    path('dashboard/timeseries/', DashboardTimeseriesView.as_view(), name='admin-dashboard-timeseries'),
+    path('dashboard/crosstab/', DashboardCrosstabView.as_view(), name='admin-dashboard-crosstab'),
+    path('dashboard/portfolio/', DashboardPortfolioView.as_view(), name='admin-dashboard-portfolio'),
+    path('dashboard/comments/', DashboardCommentsView.as_view(), name='admin-dashboard-comments'),
+    path('dashboard/comments/terms/', DashboardCommentTermsView.as_view(), name='admin-dashboard-comment-terms'),
+    path('dashboard/live/', DashboardLiveView.as_view(), name='admin-dashboard-live'),
     path('change-password/', ChangePasswordView.as_view(), name='admin-change-password'),
     path('users/', AdminUserListCreateView.as_view(), name='admin-users-list-create'),
     path('users/<int:pk>/', AdminUserDetailView.as_view(), name='admin-users-detail'),
     path('users/<int:pk>/reset-password/', AdminUserResetPasswordView.as_view(), name='admin-users-reset-password'),
+    path('ingest/metrics/', IngestMetricsView.as_view(), name='admin-ingest-metrics'),
     path('surveys/', include('surveys.admin_urls')),
     path('responses/', AdminResponsesListView.as_view(), name='admin-responses-list'),
     path('responses/export.xlsx', AdminResponsesExportExcelView.as_view(), name='admin-responses-export-excel'),
@@ -4,14 +4,38 @@ from rest_framework import status
 from django.contrib.auth import authenticate, get_user_model
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework.permissions import IsAuthenticated, BasePermission
-from django.db.models import Avg, Q, Count
+from django.db.models import Q, Count
 from django.utils import timezone
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
 from django.utils.dateparse import parse_date
 from django.utils.html import strip_tags
+from django.utils.cache import patch_cache_control
+from django.utils.functional import cached_property
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from django.conf import settings
+import hashlib
+import queue
+import time
+from datetime import datetime, timezone as dt_timezone
 
 from surveys.models import Survey, Section, Question, Response as SurveyResponse, Answer
+from surveys.ingest import get_spool, ingest_mode
+from surveys.regions import get_region_index, response_region_filter
 from utils.export_utils import export_responses_to_excel, export_responses_to_pdf
+from utils.ad_utils import invalidate_admin_identity
+from utils.analytics import get_answer_cube
+from surveys.aggregates import aggregate_answers
+from surveys.rollups import aggregate_rollups, rollup_region_filter
+from surveys.cache import get_dashboard_blocks, get_data_generation, set_dashboard_blocks
+from surveys.timeseries import analytics_timezone, local_date, local_day_filter, parse_range, survey_timeseries
+from surveys.crosstab import answer_pairs, cross_tabulate, dimension_title, resolve_dimension
+from surveys.portfolio import portfolio
+from surveys.stats import rating_statistics
+from surveys.search import highlight, parse_query, search_responses
+from surveys.keywords import TEXT_TYPES, answers_with_terms, start_comment_index, term_postings, tokenize, top_terms
+from surveys.snapshots import get_snapshot, start_scheduler as start_snapshot_scheduler, store_snapshot, update_snapshot
+from surveys.live import EventStreamRenderer, delta_event, get_hub, load_items, sse
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiTypes, OpenApiResponse
 
 
@@ -79,245 +103,348 @@ class AdminLoginView(APIView):
         )
 
 
-class DashboardView(APIView):
-    permission_classes = [IsAuthenticated]
-
-    @extend_schema(
-        tags=["Admin Dashboard"],
-        description="Aggregated dashboard data for the active survey: totals, averages, timeseries, and distributions.",
+def _region_filter_key(region) -> str:
+    # Spellings of one region (English, Amharic) select the same responses.
+    if not region:
+        return ""
+    return "|".join(f"{k}:{v}" for k, v in sorted(response_region_filter(region).items()))
+
+
+def _pct_breakdown_1dp_sum100(counts, keys=range(1, 6)):
+    # Percentages (1 decimal place) that sum to exactly 100.0%: computed in tenths
+    # of a percent, with the rounding remainder given to the largest remainders.
+    keys = list(keys)
+    total = int(sum(int(counts.get(k, 0) or 0) for k in keys))
+    target_tenths = 1000
+    perc_tenths = {k: 0 for k in keys}
+    if total > 0:
+        raw = []
+        used = 0
+        for k in keys:
+            raw_tenths = (int(counts.get(k, 0) or 0) * target_tenths) / float(total)
+            floor_tenths = int(raw_tenths)
+            used += floor_tenths
+            raw.append((k, floor_tenths, raw_tenths - floor_tenths))
+
+        remaining = target_tenths - used
+        raw.sort(key=lambda x: x[2], reverse=True)
+        for i in range(max(0, remaining)):
+            k, _floor_tenths, _rem = raw[i % len(raw)]
+            perc_tenths[k] += 1
+
+        for k, floor_tenths, _rem in raw:
+            perc_tenths[k] += floor_tenths
+
+    return {
+        str(k): {
+            "count": int(counts.get(k, 0) or 0),
+            "total": total,
+            "percent": round(perc_tenths[k] / 10.0, 1),
+        }
+        for k in keys
+    }
+
+
+def _rating_stats(counts, pct_breakdown) -> dict:
+    total = sum(counts.values())
+    weighted = sum(r * c for r, c in counts.items())
+    return {
+        "avg_rating": round(weighted / float(total), 2) if total else None,
+        "ratings": pct_breakdown(counts),
+        "statistics": rating_statistics(counts),
+    }
+
+
+def _region_breakdown(base_responses_qs, pct_breakdown) -> dict:
+    """Responses and rating mix per top-level region, with its CSCs as children.
+
+    Two grouped queries over ``Response.region`` / ``Response.csc`` cover every region
+    at once; they are ordered by the Regions.JSON hierarchy in memory (surveys/regions.py).
+    """
+    index = get_region_index()
+    empty = lambda: {"responses": 0, "counts": {r: 0 for r in range(1, 6)}}  # noqa: E731
+    regions = {}
+    other = empty()
+
+    def bucket(key, csc):
+        # Response.region / Response.csc: a blank region with a CSC value is an unknown answer.
+        if not key:
+            return other if csc else None
+        node = regions.setdefault(key, {**empty(), "children": {}})
+        if csc:
+            node = node["children"].setdefault(csc, empty())
+        return node
+
+    response_rows = base_responses_qs.values_list("region", "csc").annotate(c=Count("id"))
+    for key, csc, c in response_rows:
+        node = bucket(key, csc)
+        if node is not None:
+            node["responses"] += int(c)
+
+    rating_rows = (
+        Answer.objects.filter(
+            response__in=base_responses_qs,
+            question__question_type="rating",
+            rating__isnull=False,
+        )
+        .values_list("response__region", "response__csc", "rating")
+        .annotate(c=Count("id"))
     )
-    def get(self, request):
-        survey_id = request.query_params.get("survey")
-        date_from = request.query_params.get("from")
-        date_to = request.query_params.get("to")
-        survey = None
-        if survey_id:
-            try:
-                survey = Survey.objects.filter(id=int(survey_id)).first()
-            except (TypeError, ValueError):
-                survey = None
-        if not survey:
-            survey = (
-                Survey.objects.filter(is_active=True)
-                .order_by("-created_at")
-                .first()
-            )
-        if not survey:
-            return Response({
-                "survey": None,
-                "totals": {"responses": 0},
-                "averages": [],
-                "recent": [],
-                "timeseries": [],
-                "distributions": {},
-            })
+    for key, csc, rating, c in rating_rows:
+        r = int(rating)
+        node = bucket(key, csc)
+        if node is not None and 1 <= r <= 5:
+            node["counts"][r] += int(c)
+
+    def render(node, children=None, **meta):
+        out = {**meta, "responses": node["responses"], **_rating_stats(node["counts"], pct_breakdown)}
+        if children is not None:
+            out["children"] = children
+        return out
+
+    out = []
+    for region in index.regions:
+        node = regions.get(region.key)
+        if node is None:
+            continue
+        # Region totals include answers naming the region itself and all of its CSCs.
+        for child in node["children"].values():
+            node["responses"] += child["responses"]
+            for r, c in child["counts"].items():
+                node["counts"][r] += c
+        children = [
+            render(node["children"][value], value=value, title=value)
+            for value in region.children
+            if value in node["children"]
+        ]
+        out.append(
+            render(node, key=region.key, title=region.en["title"], title_am=region.am["title"], children=children)
+        )
+    return {
+        "regions": out,
+        "other": render(other) if other["responses"] else None,
+    }
 
-        region = request.query_params.get("region")
 
-        base_responses_qs = SurveyResponse.objects.filter(survey=survey)
-        # Date filters (inclusive)
-        if date_from:
-            d = parse_date(date_from)
-            if d:
-                base_responses_qs = base_responses_qs.filter(submitted_at__date__gte=d)
-        if date_to:
-            d = parse_date(date_to)
-            if d:
-                base_responses_qs = base_responses_qs.filter(submitted_at__date__lte=d)
-        if region:
-            # Filter responses by selected region based on the Regions question answer.
-            base_responses_qs = base_responses_qs.filter(
-                answers__question__question_type="regions",
-                answers__choice=region,
-            ).distinct()
-
-        total_responses = base_responses_qs.count()
+def _dashboard_survey(survey_id):
+    # The requested survey, falling back to the active one.
+    survey = None
+    if survey_id:
+        try:
+            survey = Survey.objects.filter(id=int(survey_id)).first()
+        except (TypeError, ValueError):
+            survey = None
+    if not survey:
+        survey = (
+            Survey.objects.filter(is_active=True)
+            .order_by("-created_at")
+            .first()
+        )
+    return survey
+
+
+def _dashboard_responses(survey, region, day_from, day_to):
+    # Date filters (inclusive local days, as the rollups, the cube and the timeseries count them)
+    base_responses_qs = SurveyResponse.objects.filter(survey=survey, **local_day_filter(day_from, day_to))
+    if region:
+        # A region matches either language and all of its CSCs, using the columns
+        # copied from the regions answer at submit time (surveys/regions.py).
+        base_responses_qs = base_responses_qs.filter(**response_region_filter(region))
+    return base_responses_qs
+
+
+def _dashboard_filter_key(day_from, day_to, region) -> str:
+    # The default timeseries window moves with the local date.
+    today = local_date(timezone.now())
+    return f"{day_from}|{day_to}|{_region_filter_key(region)}|{today}"
+
+
+def _cached_dashboard_blocks(survey, filter_key, names, build, snapshot=False, refresh=False) -> dict:
+    """Cache entries of the named blocks for ``filter_key``; out-of-date ones are rebuilt
+    together with ``build(missing names)``, which returns ``{name: body}``.
+
+    Entries are tagged with the survey's data generation, which changes on every
+    submission and survey edit. Within ``SURVEY_DASHBOARD_STALE_SECONDS`` an entry from
+    an older generation is still served, so a burst of refreshes costs one computation.
+    With ``snapshot``, out-of-date blocks are first looked up in the precomputed
+    snapshot (surveys/snapshots.py); ``refresh`` rebuilds every block.
+    """
+    generation, last_submitted_at = get_data_generation(survey.id)
+    entries = {} if refresh else get_dashboard_blocks(survey.id, filter_key, names)
+    stale_seconds = float(getattr(settings, "SURVEY_DASHBOARD_STALE_SECONDS", 0))
+    now = time.time()
+    missing = [
+        name for name in names
+        if name not in entries or (
+            entries[name]["generation"] != generation and now - entries[name]["computed_at"] >= stale_seconds
+        )
+    ]
+    if missing and snapshot and not refresh:
+        stored = get_snapshot(survey.id, filter_key, generation) or {}
+        served = {
+            name: stored[name] for name in missing
+            if name in stored and (name not in entries or stored[name]["computed_at"] > entries[name]["computed_at"])
+        }
+        entries.update(served)
+        missing = [name for name in missing if name not in served]
+        current = {name: entry for name, entry in served.items() if entry["generation"] == generation}
+        if current:
+            set_dashboard_blocks(survey.id, filter_key, current)
+    if missing:
+        bodies = build(missing)
+        fresh = {
+            name: {"generation": generation, "computed_at": now, "last_modified": last_submitted_at, "body": bodies[name]}
+            for name in missing
+        }
+        set_dashboard_blocks(survey.id, filter_key, fresh)
+        entries.update(fresh)
+    return entries
+
+
+class _DashboardBlocks:
+    """Dashboard blocks for one survey and filter set, each computed on first use.
+
+    Inputs shared by several blocks (questions, answer aggregates, response count) are
+    cached properties, so a request for a few blocks runs only the queries they need.
+    """
+
+    def __init__(self, survey, region, day_from, day_to, names):
+        self.survey = survey
+        self.region = region
+        self.day_from = day_from
+        self.day_to = day_to
+        self.names = set(names)
+
+    def build(self, names) -> dict:
+        return {name: getattr(self, name)() for name in names}
+
+    @cached_property
+    def base_responses_qs(self):
+        return _dashboard_responses(self.survey, self.region, self.day_from, self.day_to)
+
+    @cached_property
+    def questions(self) -> list:
+        # Survey questions and sections are read once; all answer aggregates below come
+        # from two grouped queries (surveys/aggregates.py) and are derived in memory.
+        return list(
+            Question.objects.filter(survey=self.survey)
+            .values("id", "text", "question_type", "section_id", "demographic_role")
+        )
 
+    @cached_property
+    def rating_questions(self) -> list:
+        return [q for q in self.questions if q["question_type"] == "rating"]
+
+    def _role_question(self, role):
+        # Demographic questions are found by their role (surveys/demographics.py);
+        # lowest id wins if several questions share a role.
+        matches = [q for q in self.questions if q["demographic_role"] == role]
+        return min(matches, key=lambda q: q["id"]) if matches else None
+
+    @cached_property
+    def demographic_questions(self) -> dict:
+        # Choice answers are only aggregated when a demographic block is requested.
+        if not self.names & {"gender", "age", "education"}:
+            return {}
+        roles = {"gender": "gender", "age": "age_band", "education": "education"}
+        return {block: self._role_question(role) for block, role in roles.items()}
+
+    @cached_property
+    def cube(self):
+        return get_answer_cube(self.survey.id)
+
+    @cached_property
+    def counts(self):
+        """``(total responses, AnswerAggregates)`` for the filtered responses."""
+        rating_ids = [q["id"] for q in self.rating_questions]
+        demographic = [q for q in self.demographic_questions.values() if q]
+        choice_ids = [q["id"] for q in demographic]
+        # The in-memory answer cube (utils/analytics.py) answers any filter; without it, date
+        # and top-level region filters are answered from the rollups (surveys/rollups.py)
+        # once they cover the survey, and anything else reads the raw answers.
+        rollup_region = rollup_region_filter(self.region) if self.survey.rollups_built_at else None
+        if self.cube is not None:
+            selection = self.cube.select(self.day_from, self.day_to, self.region)
+            return self.cube.response_count(selection), self.cube.aggregates(selection, rating_ids, choice_ids)
+        if rollup_region is not None:
+            return aggregate_rollups(
+                self.survey.id, self.day_from, self.day_to, rollup_region, rating_ids, choice_ids,
+                roles={q["id"]: q["demographic_role"] for q in demographic},
+            )
+        return self.base_responses_qs.count(), aggregate_answers(self.base_responses_qs, rating_ids, choice_ids)
+
+    @property
+    def aggregates(self):
+        return self.counts[1]
+
+    def totals(self) -> dict:
+        # The aggregates include the count; when no requested block needs them, the
+        # count alone is cheaper.
+        if "counts" in self.__dict__ or self.names - {"totals", "recent", "timeseries", "region_breakdown"}:
+            return {"responses": self.counts[0]}
+        if self.cube is not None:
+            return {"responses": self.cube.response_count(self.cube.select(self.day_from, self.day_to, self.region))}
+        return {"responses": self.base_responses_qs.count()}
+
+    def averages(self) -> list:
         # Average rating per rating-type question
         averages = []
-        for q in Question.objects.filter(survey=survey, question_type="rating"):
-            avg = Answer.objects.filter(
-                response__in=base_responses_qs,
-                question=q,
-                rating__isnull=False,
-            ).aggregate(v=Avg("rating"))["v"]
+        for q in self.rating_questions:
+            avg = self.aggregates.average(q["id"])
             averages.append({
-                "question_id": q.id,
-                "question": q.text,
+                "question_id": q["id"],
+                "question": q["text"],
                 "avg_rating": round(float(avg), 2) if avg is not None else None,
             })
+        return averages
 
+    def recent(self) -> list:
         recent_qs = (
-            base_responses_qs
+            self.base_responses_qs
             .order_by("-submitted_at")
             .values("id", "submitted_at")[:10]
         )
-        recent = list(recent_qs)
-
-        # Responses per day (last 14 days)
-        today = timezone.now().date()
-        start_date = today - timezone.timedelta(days=13)
-        ts_counts = (
-            base_responses_qs
-            .filter(submitted_at__date__gte=start_date, submitted_at__date__lte=today)
-            .extra({'day': "date(submitted_at)"})
-            .values('day')
-            .annotate(c=Count('id', distinct=True))
-        )
-        ts_map = {str(r['day']): r['c'] for r in ts_counts}
-        timeseries = []
-        for i in range(14):
-            d = start_date + timezone.timedelta(days=i)
-            timeseries.append({"date": d.isoformat(), "count": int(ts_map.get(str(d), 0))})
+        return list(recent_qs)
 
+    def timeseries(self) -> list:
+        # Responses per local day over the date filter, or the last 14 days.
+        tz = analytics_timezone()
+        day_from, day_to = self.day_from, self.day_to
+        try:
+            start, end = parse_range(day_from and day_from.isoformat(), day_to and day_to.isoformat(), "day", tz)
+            series = survey_timeseries(self.survey.id, start, end, "day", tz, region=self.region)
+        except ValueError:
+            series = []
+        return [{"date": bucket.date().isoformat(), "count": count} for bucket, count in series]
+
+    @cached_property
+    def _distributions(self) -> dict:
         # Distribution per rating question (counts for 1..5)
-        distributions = {}
-        for q in Question.objects.filter(survey=survey, question_type="rating"):
-            counts = {r: 0 for r in range(1, 6)}
-            agg = (
-                Answer.objects.filter(
-                    response__in=base_responses_qs,
-                    question=q,
-                    rating__isnull=False,
-                )
-                .values('rating')
-                .annotate(c=Count('id'))
-            )
-            for row in agg:
-                r = int(row['rating'])
-                if 1 <= r <= 5:
-                    counts[r] = row['c']
-            distributions[str(q.id)] = counts
-
-        def _pct(part: int, total: int) -> float:
-            if total <= 0:
-                return 0.0
-            return round((float(part) / float(total)) * 100.0, 1)
-
-        def _pct_breakdown_1dp_sum100(counts):
-            total = int(sum(int(counts.get(r, 0) or 0) for r in range(1, 6)))
-            target_tenths = 1000
-            perc_tenths = {r: 0 for r in range(1, 6)}
-            if total > 0:
-                raw = []
-                used = 0
-                for r in range(1, 6):
-                    raw_tenths = (int(counts.get(r, 0) or 0) * target_tenths) / float(total)
-                    floor_tenths = int(raw_tenths)
-                    used += floor_tenths
-                    raw.append((r, floor_tenths, raw_tenths - floor_tenths))
-
-                remaining = target_tenths - used
-                raw.sort(key=lambda x: x[2], reverse=True)
-                for i in range(max(0, remaining)):
-                    r, _floor_tenths, _rem = raw[i % len(raw)]
-                    perc_tenths[r] += 1
-
-                for r, floor_tenths, _rem in raw:
-                    perc_tenths[r] += floor_tenths
+        return {str(q["id"]): self.aggregates.counts_for(q["id"]) for q in self.rating_questions}
 
-            return {
-                str(r): {
-                    "count": int(counts.get(r, 0) or 0),
-                    "total": total,
-                    "percent": round(perc_tenths[r] / 10.0, 1),
-                }
-                for r in range(1, 6)
-            }
+    def distributions(self) -> dict:
+        return self._distributions
 
-        overall_counts = {r: 0 for r in range(1, 6)}
-        overall_agg = (
-            Answer.objects.filter(
-                response__in=base_responses_qs,
-                question__question_type="rating",
-                rating__isnull=False,
-            )
-            .values("rating")
-            .annotate(c=Count("id"))
-        )
-        for row in overall_agg:
-            r = int(row["rating"])
-            if 1 <= r <= 5:
-                overall_counts[r] = int(row["c"])
-
-        overall_total = sum(overall_counts.values())
-
-        # Ensure the displayed percentages (1 decimal place) sum to exactly 100.0%.
-        # We compute in tenths-of-a-percent (0.1%) and distribute rounding remainders.
-        target_tenths = 1000
-        perc_tenths = {r: 0 for r in range(1, 6)}
-        if overall_total > 0:
-            raw = []
-            used = 0
-            for r in range(1, 6):
-                raw_tenths = (overall_counts[r] * target_tenths) / float(overall_total)
-                floor_tenths = int(raw_tenths)
-                used += floor_tenths
-                raw.append((r, floor_tenths, raw_tenths - floor_tenths))
-
-            remaining = target_tenths - used
-            # Distribute remaining tenths to the largest remainders
-            raw.sort(key=lambda x: x[2], reverse=True)
-            for i in range(max(0, remaining)):
-                r, floor_tenths, rem = raw[i % len(raw)]
-                perc_tenths[r] += 1
-
-            for r, floor_tenths, rem in raw:
-                perc_tenths[r] += floor_tenths
-
-        rating_overview = {
-            str(r): {
-                "count": overall_counts[r],
-                "total": overall_total,
-                "percent": round(perc_tenths[r] / 10.0, 1),
-            }
-            for r in range(1, 6)
-        }
+    def rating_overview(self) -> dict:
+        return _pct_breakdown_1dp_sum100(self.aggregates.overall_counts())
 
-        rating_question_overview = {}
-        for qid, counts in distributions.items():
-            try:
-                counts_int = {int(k): int(v) for k, v in counts.items()}
-            except Exception:
-                counts_int = {r: int(counts.get(r, 0) or 0) for r in range(1, 6)}
-            rating_question_overview[str(qid)] = _pct_breakdown_1dp_sum100(counts_int)
+    def rating_question_overview(self) -> dict:
+        return {qid: _pct_breakdown_1dp_sum100(counts) for qid, counts in self._distributions.items()}
 
+    def rating_section_overview(self) -> list:
         # Rating % by section
         section_rows = list(
-            Section.objects.filter(survey=survey)
+            Section.objects.filter(survey=self.survey)
             .values("id", "title", "order")
             .order_by("order", "id")
         )
         section_meta = {int(r["id"]): r for r in section_rows}
 
-        section_rating_agg = (
-            Answer.objects.filter(
-                response__in=base_responses_qs,
-                question__question_type="rating",
-                rating__isnull=False,
-            )
-            .values("question__section_id", "rating")
-            .annotate(c=Count("id"))
-        )
-
         # Build counts per section (including null) for ratings 1..5
-        section_counts = {}
-        for row in section_rating_agg:
-            sid = row.get("question__section_id")  # may be None
-            r = int(row.get("rating") or 0)
-            if r < 1 or r > 5:
-                continue
-            if sid not in section_counts:
-                section_counts[sid] = {i: 0 for i in range(1, 6)}
-            section_counts[sid][r] = int(row.get("c") or 0)
-
-        # Ensure we return all sections even if they have 0 ratings
-        for sid in section_meta.keys():
-            if sid not in section_counts:
-                section_counts[sid] = {i: 0 for i in range(1, 6)}
+        section_counts = self.aggregates.counts_by_section({q["id"]: q["section_id"] for q in self.rating_questions})
 
         rating_section_overview = []
-        # Ordered known sections first
+        # Ordered known sections first (all of them, even with 0 ratings)
         for sid in [int(r["id"]) for r in section_rows]:
             counts = section_counts.get(sid, {i: 0 for i in range(1, 6)})
             meta = section_meta.get(sid) or {}
@@ -326,6 +453,7 @@ class DashboardView(APIView):
                 "title": meta.get("title") or "Untitled Section",
                 "order": int(meta.get("order") or 0),
                 "ratings": _pct_breakdown_1dp_sum100(counts),
+                "statistics": rating_statistics(counts),
             })
 
         # Include ungrouped/null section ratings if any exist
@@ -335,130 +463,631 @@ class DashboardView(APIView):
                 "title": "Ungrouped",
                 "order": 10**9,
                 "ratings": _pct_breakdown_1dp_sum100(section_counts[None]),
+                "statistics": rating_statistics(section_counts[None]),
             })
+        return rating_section_overview
+
+    # Confidence intervals, medians, top/bottom-2-box and net scores come from the
+    # same histograms (surveys/stats.py): no further queries.
+    def rating_statistics(self) -> dict:
+        return rating_statistics(self.aggregates.overall_counts())
+
+    def question_statistics(self) -> dict:
+        return {qid: rating_statistics(counts) for qid, counts in self._distributions.items()}
+
+    def _choice_counts(self, question):
+        # Counts by trimmed choice label (works best for dropdown/multiple_choice questions)
+        counts_map = {}
+        for choice, c in self.aggregates.choice_counts.get(question["id"], {}).items():
+            label = str(choice or "").strip()
+            if not label:
+                continue
+            counts_map[label] = int(c) + int(counts_map.get(label, 0))
+        return counts_map
+
+    @staticmethod
+    def _breakdown(question, counts_map):
+        total = int(sum(counts_map.values()))
+        return {
+            "question_id": question["id"],
+            "question": question["text"],
+            "counts": counts_map,
+            "total": total,
+            "percent": {k: (round((v / total) * 100.0, 1) if total > 0 else 0.0) for k, v in counts_map.items()},
+        }
 
-        # Gender (Sex) distribution: locate question by text ('sex' or 'áŒ¾á‰³')
-        gender = None
-        sex_q = (
-            Question.objects.filter(survey=survey)
-            .filter(Q(text__icontains="sex") | Q(text__icontains="áŒ¾á‰³"))
-            .order_by("id")
-            .first()
-        )
-        if sex_q:
-            def _norm_gender(v: str) -> str | None:
-                if v is None:
-                    return None
-                x = str(v).strip().lower()
-                if not x:
-                    return None
-                if x in ("male", "m", "á‹ˆáŠ•á‹µ"):
-                    return "male"
-                if x in ("female", "f", "áˆ´á‰µ"):
-                    return "female"
-                return None
-
-            counts = {"male": 0, "female": 0}
-            for row in (
-                Answer.objects.filter(response__in=base_responses_qs, question=sex_q)
-                .exclude(choice__isnull=True)
-                .values("choice")
-                .annotate(c=Count("id"))
-            ):
-                g = _norm_gender(row.get("choice"))
-                if g:
-                    counts[g] += int(row.get("c") or 0)
-
-            total = int(counts["male"] + counts["female"])
-            gender = {
-                "question_id": sex_q.id,
-                "question": sex_q.text,
-                "counts": counts,
-                "total": total,
-                "percent": {
-                    "male": round((counts["male"] / total) * 100.0, 1) if total > 0 else 0.0,
-                    "female": round((counts["female"] / total) * 100.0, 1) if total > 0 else 0.0,
-                },
+    def gender(self):
+        # Gender (Sex) distribution
+        sex_q = self.demographic_questions["gender"]
+        if not sex_q:
+            return None
+        # Answers are coded "male" / "female" at ingest, whatever the option wording.
+        counts = {"male": 0, "female": 0}
+        for code, c in self.aggregates.code_counts.get(sex_q["id"], {}).items():
+            if code in counts:
+                counts[code] += int(c or 0)
+
+        total = int(counts["male"] + counts["female"])
+        return {
+            "question_id": sex_q["id"],
+            "question": sex_q["text"],
+            "counts": counts,
+            "total": total,
+            "percent": {
+                "male": round((counts["male"] / total) * 100.0, 1) if total > 0 else 0.0,
+                "female": round((counts["female"] / total) * 100.0, 1) if total > 0 else 0.0,
+            },
+        }
+
+    def age(self):
+        # Age distribution
+        age_q = self.demographic_questions["age"]
+        return self._breakdown(age_q, self._choice_counts(age_q)) if age_q else None
+
+    def education(self):
+        # Education level distribution
+        edu_q = self.demographic_questions["education"]
+        return self._breakdown(edu_q, self._choice_counts(edu_q)) if edu_q else None
+
+    def region_breakdown(self) -> dict:
+        # Per-region rollup with CSC drill-down (all regions in one pass)
+        return _region_breakdown(self.base_responses_qs, _pct_breakdown_1dp_sum100)
+
+
+def refresh_dashboard_snapshot(survey, region=None, day_from=None, day_to=None) -> str:
+    """Recompute every dashboard block for a filter set and store it as its snapshot.
+
+    Returns the filter key.
+    """
+    filter_key = _dashboard_filter_key(day_from, day_to, region)
+    names = list(DashboardView.BLOCKS)
+    entries = _cached_dashboard_blocks(
+        survey, filter_key, names,
+        lambda missing: _DashboardBlocks(survey, region, day_from, day_to, missing).build(missing),
+        refresh=True,
+    )
+    store_snapshot(survey.id, filter_key, entries)
+    return filter_key
+
+
+class DashboardView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    # Blocks in response order; ``?fields=`` selects some of them.
+    BLOCKS = (
+        "totals",
+        "averages",
+        "recent",
+        "timeseries",
+        "distributions",
+        "rating_overview",
+        "rating_question_overview",
+        "rating_section_overview",
+        "rating_statistics",
+        "question_statistics",
+        "gender",
+        "age",
+        "education",
+        "region_breakdown",
+    )
+
+    @extend_schema(
+        tags=["Admin Dashboard"],
+        description=(
+            "Aggregated dashboard data for the active survey: totals, averages, timeseries, and distributions. "
+            "`fields` limits the response to some blocks, and only their aggregates are computed. "
+            "Common filter sets may be served from a precomputed snapshot; `computed_at` says when the "
+            "oldest block was computed and `refresh=1` recomputes them."
+        ),
+        parameters=[
+            OpenApiParameter("fields", OpenApiTypes.STR, OpenApiParameter.QUERY, description="Comma-separated blocks, e.g. totals,rating_overview (default: all)"),
+            OpenApiParameter("refresh", OpenApiTypes.BOOL, OpenApiParameter.QUERY, description="Recompute instead of serving cached or precomputed blocks"),
+        ],
+    )
+    def get(self, request):
+        survey_id = request.query_params.get("survey")
+        date_from = request.query_params.get("from")
+        date_to = request.query_params.get("to")
+        fields = [f.strip() for f in (request.query_params.get("fields") or "").split(",") if f.strip()]
+        unknown = sorted(set(fields) - set(self.BLOCKS))
+        if unknown:
+            return Response(
+                {"detail": f"Unknown fields: {', '.join(unknown)}", "fields": list(self.BLOCKS)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        names = [name for name in self.BLOCKS if name in fields] if fields else list(self.BLOCKS)
+        refresh = str(request.query_params.get("refresh") or "").lower() in ("1", "true", "yes")
+        start_snapshot_scheduler()
+
+        survey = _dashboard_survey(survey_id)
+        if not survey:
+            empty = {
+                "totals": {"responses": 0},
+                "averages": [],
+                "recent": [],
+                "timeseries": [],
+                "distributions": {},
             }
+            return Response({"survey": None, **{k: v for k, v in empty.items() if not fields or k in names}})
 
-        # Age (áŠ¥á‹µáˆœ) distribution: locate question by text ('age' or 'áŠ¥á‹µáˆœ')
-        age = None
-        age_q = (
-            Question.objects.filter(survey=survey)
-            .filter(Q(text__icontains="age") | Q(text__icontains="áŠ¥á‹µáˆœ"))
-            .order_by("id")
-            .first()
+        region = request.query_params.get("region")
+        filters = {"region": region, "from": date_from, "to": date_to, "survey": (int(survey_id) if survey_id and str(survey_id).isdigit() else None)}
+        day_from = parse_date(date_from) if date_from else None
+        day_to = parse_date(date_to) if date_to else None
+
+        # Each block is cached per survey and normalised filters until the data changes,
+        # so asking for one more block reuses the others.
+        filter_key = _dashboard_filter_key(day_from, day_to, region)
+        entries = _cached_dashboard_blocks(
+            survey, filter_key, names,
+            lambda missing: _DashboardBlocks(survey, region, day_from, day_to, missing).build(missing),
+            snapshot=True, refresh=refresh,
         )
-        if age_q:
-            # Count by selected choice (works best if the question is dropdown/multiple_choice)
-            counts_map = {}
-            for row in (
-                Answer.objects.filter(response__in=base_responses_qs, question=age_q)
-                .exclude(choice__isnull=True)
-                .values("choice")
-                .annotate(c=Count("id"))
-            ):
-                label = str(row.get("choice") or "").strip()
-                if not label:
-                    continue
-                counts_map[label] = int(row.get("c") or 0) + int(counts_map.get(label, 0))
-
-            total = int(sum(counts_map.values()))
-            percent_map = {k: (round((v / total) * 100.0, 1) if total > 0 else 0.0) for k, v in counts_map.items()}
-            age = {
-                "question_id": age_q.id,
-                "question": age_q.text,
-                "counts": counts_map,
-                "total": total,
-                "percent": percent_map,
+        if refresh and not fields:
+            update_snapshot(survey.id, filter_key, entries)
+        computed_at = datetime.fromtimestamp(min(entries[name]["computed_at"] for name in names), tz=dt_timezone.utc)
+
+        # The ETag covers the echoed filters too, since they are part of the body.
+        generations = [(name, entries[name]["generation"]) for name in names]
+        raw = f"{generations}|{computed_at}|{filter_key}|{sorted(filters.items())}".encode("utf-8", errors="ignore")
+        etag = quote_etag(hashlib.sha256(raw).hexdigest()[:32])
+        last_modified = max((e["last_modified"] for e in entries.values() if e["last_modified"]), default=None)
+
+        # Kiosk batches can carry old submission times, so Last-Modified alone may miss
+        # changes; If-Modified-Since is only honoured when no ETag is sent.
+        if_none_match = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+        if if_none_match:
+            not_modified = etag in if_none_match or "*" in if_none_match
+        else:
+            since = parse_http_date_safe(request.META.get("HTTP_IF_MODIFIED_SINCE") or "")
+            not_modified = bool(since and last_modified and int(last_modified.timestamp()) <= since)
+
+        if not_modified:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            body = {"survey": {"id": survey.id, "title": survey.title}}
+            body.update((name, entries[name]["body"]) for name in names)
+            response = Response({**body, "computed_at": computed_at, "filters": filters})
+        response["ETag"] = etag
+        if last_modified:
+            response["Last-Modified"] = http_date(last_modified.timestamp())
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class DashboardTimeseriesView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=["Admin Dashboard"],
+        description=(
+            "Responses per hour, day or week over a range, bucketed in a timezone "
+            "(default ANALYTICS_TIME_ZONE). Empty buckets are included with a count of 0."
+        ),
+        parameters=[
+            OpenApiParameter("survey", OpenApiTypes.INT, OpenApiParameter.QUERY, description="Survey ID (default: active survey)"),
+            OpenApiParameter("granularity", OpenApiTypes.STR, OpenApiParameter.QUERY, description="hour, day (default) or week"),
+            OpenApiParameter("from", OpenApiTypes.STR, OpenApiParameter.QUERY, description="Start date (inclusive) or datetime"),
+            OpenApiParameter("to", OpenApiTypes.STR, OpenApiParameter.QUERY, description="End date (inclusive) or datetime (exclusive)"),
+            OpenApiParameter("tz", OpenApiTypes.STR, OpenApiParameter.QUERY, description="IANA timezone, e.g. Africa/Addis_Ababa"),
+            OpenApiParameter("region", OpenApiTypes.STR, OpenApiParameter.QUERY, description="Region or CSC"),
+        ],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    def get(self, request):
+        granularity = request.query_params.get("granularity") or "day"
+        region = request.query_params.get("region")
+        try:
+            tz = analytics_timezone(request.query_params.get("tz"))
+            start, end = parse_range(
+                request.query_params.get("from"), request.query_params.get("to"), granularity, tz
+            )
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        survey = _dashboard_survey(request.query_params.get("survey"))
+        series = survey_timeseries(survey.id, start, end, granularity, tz, region=region) if survey else []
+        return Response({
+            "survey": {"id": survey.id, "title": survey.title} if survey else None,
+            "granularity": granularity,
+            "tz": tz.key,
+            "from": start.isoformat(),
+            "to": end.isoformat(),
+            "buckets": [{"start": bucket.isoformat(), "count": count} for bucket, count in series],
+        })
+
+
+class DashboardCrosstabView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=["Admin Dashboard"],
+        description=(
+            "Pivot of two questions: counts per (row answer, column answer) with row percentages "
+            "that sum to 100%. `row` is a choice or regions question id or a demographic role "
+            "(gender, age_band, education, region, tenure); `col` is a rating or choice question id, "
+            "a role, or `rating` for all rating questions pooled."
+        ),
+        parameters=[
+            OpenApiParameter("row", OpenApiTypes.STR, OpenApiParameter.QUERY, required=True, description="Question ID or demographic role"),
+            OpenApiParameter("col", OpenApiTypes.STR, OpenApiParameter.QUERY, required=True, description="Question ID, demographic role or 'rating'"),
+            OpenApiParameter("survey", OpenApiTypes.INT, OpenApiParameter.QUERY, description="Survey ID (default: active survey)"),
+            OpenApiParameter("from", OpenApiTypes.DATE, OpenApiParameter.QUERY, description="Start date (inclusive)"),
+            OpenApiParameter("to", OpenApiTypes.DATE, OpenApiParameter.QUERY, description="End date (inclusive)"),
+            OpenApiParameter("region", OpenApiTypes.STR, OpenApiParameter.QUERY, description="Region or CSC"),
+        ],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    def get(self, request):
+        survey_id = request.query_params.get("survey")
+        survey = _dashboard_survey(survey_id)
+        if not survey:
+            return Response({"detail": "No survey found"}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            row = resolve_dimension(survey.id, request.query_params.get("row"))
+            col = resolve_dimension(survey.id, request.query_params.get("col"), column=True)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if row.question_ids == col.question_ids:
+            return Response({"detail": "'row' and 'col' must be different questions"}, status=status.HTTP_400_BAD_REQUEST)
+
+        region = request.query_params.get("region")
+        date_from = request.query_params.get("from")
+        date_to = request.query_params.get("to")
+        day_from = parse_date(date_from) if date_from else None
+        day_to = parse_date(date_to) if date_to else None
+        filters = {"region": region, "from": date_from, "to": date_to, "survey": (int(survey_id) if survey_id and str(survey_id).isdigit() else None)}
+
+        filter_key = f"crosstab|{row.key}|{col.key}|{day_from}|{day_to}|{_region_filter_key(region)}"
+        entry = _cached_dashboard_blocks(
+            survey, filter_key, ["crosstab"],
+            lambda missing: {"crosstab": self._build(survey, row, col, region, day_from, day_to)},
+        )["crosstab"]
+        response = Response({**entry["body"], "filters": filters})
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    @staticmethod
+    def _build(survey, row, col, region, day_from, day_to) -> dict:
+        cube = get_answer_cube(survey.id)
+        if cube is not None:
+            pairs = cube.answer_pairs(
+                cube.select(day_from, day_to, region), row.question_ids[0], col.question_ids, col.kind == "rating"
+            )
+        else:
+            pairs = answer_pairs(_dashboard_responses(survey, region, day_from, day_to), row, col)
+        table = cross_tabulate(pairs, row, col)
+
+        def describe(dimension):
+            question = dimension.question
+            if question is None:
+                return {"question_id": None, "question": "All rating questions", "type": "rating", "role": ""}
+            return {
+                "question_id": question["id"],
+                "question": question["text"],
+                "type": question["question_type"],
+                "role": question["demographic_role"],
             }
 
-        # Education level (á‹¨á‰µáˆáˆ…áˆ­á‰µ á‹°áˆ¨áŒƒ) distribution: locate question by text ('education' or 'á‹¨á‰µáˆáˆ…áˆ­á‰µ')
-        education = None
-        edu_q = (
-            Question.objects.filter(survey=survey)
-            .filter(Q(text__icontains="education") | Q(text__icontains="á‹¨á‰µáˆáˆ…áˆ­á‰µ"))
-            .order_by("id")
-            .first()
+        column_totals = {}
+        rows = []
+        for label in table.row_labels:
+            counts = table.counts.get(label, {})
+            for k, c in counts.items():
+                column_totals[k] = column_totals.get(k, 0) + c
+            rows.append({
+                "key": str(label),
+                **dimension_title(row, label),
+                "total": int(sum(counts.get(k, 0) for k in table.column_labels)),
+                # Each row sums to 100% over the columns.
+                "cells": _pct_breakdown_1dp_sum100(counts, table.column_labels),
+            })
+        return {
+            "survey": {"id": survey.id, "title": survey.title},
+            "row": describe(row),
+            "column": describe(col),
+            "columns": [{"key": str(label), **dimension_title(col, label)} for label in table.column_labels],
+            "rows": rows,
+            "totals": {
+                "total": int(sum(column_totals.get(k, 0) for k in table.column_labels)),
+                "cells": _pct_breakdown_1dp_sum100(column_totals, table.column_labels),
+            },
+        }
+
+
+class DashboardPortfolioView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=["Admin Dashboard"],
+        description=(
+            "Headline metrics for every survey of one or more budget years (responses, rating "
+            "distribution, section averages) and the questions they share, matched by normalised "
+            "text, for year-over-year trends. Closed surveys are read from stored summaries."
+        ),
+        parameters=[
+            OpenApiParameter("years", OpenApiTypes.STR, OpenApiParameter.QUERY, description="Comma-separated budget years (default: the two latest)"),
+        ],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    def get(self, request):
+        raw = ",".join(request.query_params.getlist("years") or request.query_params.getlist("budget_year"))
+        try:
+            years = sorted({int(y) for y in raw.split(",") if y.strip()})
+        except ValueError:
+            return Response({"detail": "years must be comma-separated integers"}, status=status.HTTP_400_BAD_REQUEST)
+        if not years:
+            years = sorted(
+                Survey.objects.exclude(budget_year__isnull=True)
+                .order_by("-budget_year")
+                .values_list("budget_year", flat=True)
+                .distinct()[:2]
+            )
+
+        result = portfolio(years)
+
+        def avg(answers, total):
+            return round(total / float(answers), 2) if answers else None
+
+        surveys = []
+        for survey in result["surveys"]:
+            metrics = survey["metrics"]
+            surveys.append({
+                **{k: survey[k] for k in ("id", "title", "budget_year", "is_active", "responses", "summary_at")},
+                "avg_rating": avg(metrics["answers"], metrics["rating_sum"]),
+                "ratings": _pct_breakdown_1dp_sum100(metrics["ratings"], [str(r) for r in range(1, 6)]),
+                "sections": [
+                    {
+                        "section_id": section["section_id"],
+                        "title": section["title"],
+                        "key": section["key"],
+                        "answers": section["answers"],
+                        "avg_rating": avg(section["answers"], section["rating_sum"]),
+                    }
+                    for section in metrics["sections"]
+                ],
+            })
+        return Response({"years": years, "surveys": surveys, "questions": result["questions"]})
+
+
+def _int_param(value):
+    try:
+        return int(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _comment_filters(request):
+    # (survey, question id, region, day_from, day_to, echoed filters) for the comment
+    # keyword views, or an error Response.
+    survey_id = request.query_params.get("survey")
+    survey = _dashboard_survey(survey_id)
+    if not survey:
+        return Response({"detail": "No survey found"}, status=status.HTTP_404_NOT_FOUND)
+    question = request.query_params.get("question")
+    question_id = None
+    if question:
+        question_id = (
+            Question.objects.filter(survey=survey, id=int(question), question_type__in=TEXT_TYPES)
+            .values_list("id", flat=True).first()
+            if str(question).isdigit() else None
         )
-        if edu_q:
-            edu_counts = {}
-            for row in (
-                Answer.objects.filter(response__in=base_responses_qs, question=edu_q)
-                .exclude(choice__isnull=True)
-                .values("choice")
-                .annotate(c=Count("id"))
-            ):
-                label = str(row.get("choice") or "").strip()
-                if not label:
-                    continue
-                edu_counts[label] = int(row.get("c") or 0) + int(edu_counts.get(label, 0))
-
-            total = int(sum(edu_counts.values()))
-            edu_percent = {k: (round((v / total) * 100.0, 1) if total > 0 else 0.0) for k, v in edu_counts.items()}
-            education = {
-                "question_id": edu_q.id,
-                "question": edu_q.text,
-                "counts": edu_counts,
-                "total": total,
-                "percent": edu_percent,
-            }
+        if question_id is None:
+            return Response({"detail": f"No text question '{question}' in this survey"}, status=status.HTTP_400_BAD_REQUEST)
+    region = request.query_params.get("region")
+    date_from = request.query_params.get("from")
+    date_to = request.query_params.get("to")
+    filters = {
+        "question": question_id, "region": region, "from": date_from, "to": date_to,
+        "survey": (int(survey_id) if survey_id and str(survey_id).isdigit() else None),
+    }
+    days = {}
+    for name, value in (("from", date_from), ("to", date_to)):
+        try:
+            days[name] = parse_date(value) if value else None
+        except ValueError:
+            days[name] = None
+        if value and days[name] is None:
+            return Response({"detail": f"'{name}' must be a date (YYYY-MM-DD)"}, status=status.HTTP_400_BAD_REQUEST)
+    if survey.comments_indexed_at is None:
+        # Comments answered before the index existed are indexed in the background.
+        start_comment_index(survey.id)
+        return Response(
+            {"detail": "The comment index of this survey is being built; try again shortly.", "index": "building"},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": "30"},
+        )
+    return survey, term_postings(survey.id, question_id, region, days["from"], days["to"]), filters
 
-        return Response({
+
+_COMMENT_FILTER_PARAMETERS = [
+    OpenApiParameter("survey", OpenApiTypes.INT, OpenApiParameter.QUERY, description="Survey ID (default: active survey)"),
+    OpenApiParameter("question", OpenApiTypes.INT, OpenApiParameter.QUERY, description="Text or paragraph question ID"),
+    OpenApiParameter("from", OpenApiTypes.DATE, OpenApiParameter.QUERY, description="Start date (inclusive)"),
+    OpenApiParameter("to", OpenApiTypes.DATE, OpenApiParameter.QUERY, description="End date (inclusive)"),
+    OpenApiParameter("region", OpenApiTypes.STR, OpenApiParameter.QUERY, description="Region or CSC"),
+]
+
+
+class DashboardCommentTermsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=["Admin Dashboard"],
+        description=(
+            "Most frequent terms in the open-text comments (English and Amharic, stop words removed), "
+            "from the comment keyword index. `answers` counts the comments mentioning a term."
+        ),
+        parameters=_COMMENT_FILTER_PARAMETERS + [
+            OpenApiParameter("limit", OpenApiTypes.INT, OpenApiParameter.QUERY, description="Number of terms (default 50, at most 500)"),
+        ],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    def get(self, request):
+        resolved = _comment_filters(request)
+        if isinstance(resolved, Response):
+            return resolved
+        survey, postings, filters = resolved
+        try:
+            limit = min(max(int(request.query_params.get("limit", 50)), 1), 500)
+        except ValueError:
+            limit = 50
+        response = Response({
             "survey": {"id": survey.id, "title": survey.title},
-            "totals": {"responses": total_responses},
-            "averages": averages,
-            "recent": recent,
-            "timeseries": timeseries,
-            "distributions": distributions,
-            "rating_overview": rating_overview,
-            "rating_question_overview": rating_question_overview,
-            "rating_section_overview": rating_section_overview,
-            "gender": gender,
-            "age": age,
-            "education": education,
-            "filters": {"region": region, "from": date_from, "to": date_to, "survey": (int(survey_id) if survey_id and str(survey_id).isdigit() else None)},
+            "comments": postings.values("answer_id").distinct().count(),
+            "terms": top_terms(postings, limit),
+            "filters": filters,
         })
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class DashboardCommentsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=["Admin Dashboard"],
+        description=(
+            "Comments containing a term (every term, if `term` has several words), newest first, "
+            "looked up in the comment keyword index."
+        ),
+        parameters=[
+            OpenApiParameter("term", OpenApiTypes.STR, OpenApiParameter.QUERY, required=True, description="Term(s) from the top-terms list"),
+        ] + _COMMENT_FILTER_PARAMETERS + [
+            OpenApiParameter("page", OpenApiTypes.INT, OpenApiParameter.QUERY),
+            OpenApiParameter("page_size", OpenApiTypes.INT, OpenApiParameter.QUERY),
+        ],
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    def get(self, request):
+        terms = sorted(set(tokenize(request.query_params.get("term"))))
+        if not terms:
+            return Response({"detail": "'term' must contain a word that is indexed"}, status=status.HTTP_400_BAD_REQUEST)
+        resolved = _comment_filters(request)
+        if isinstance(resolved, Response):
+            return resolved
+        survey, postings, filters = resolved
+
+        try:
+            page = max(int(request.query_params.get("page", 1)), 1)
+            page_size = min(max(int(request.query_params.get("page_size", 20)), 1), 200)
+        except ValueError:
+            page, page_size = 1, 20
+        qs = (
+            Answer.objects.filter(id__in=answers_with_terms(postings, terms))
+            .select_related("response", "question")
+            .order_by("-response__submitted_at", "-id")
+        )
+        total = qs.count()
+        start = (page - 1) * page_size
+        results = [
+            {
+                "response_id": a.response_id,
+                "submitted_at": a.response.submitted_at,
+                "region": a.response.region,
+                "csc": a.response.csc,
+                "question_id": a.question_id,
+                "question": a.question.text,
+                "comment": a.comment,
+            }
+            for a in qs[start:start + page_size]
+        ]
+        response = Response({
+            "survey": {"id": survey.id, "title": survey.title},
+            "terms": terms,
+            "count": total,
+            "page": page,
+            "page_size": page_size,
+            "results": results,
+            "filters": filters,
+        })
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class DashboardLiveView(APIView):
+    """Server-sent events with response deltas for one survey (surveys/live.py).
+
+    Clients load the dashboard once, then add each ``delta`` event's counts to it. The
+    stream ends after ``SURVEY_LIVE_MAX_SECONDS`` so a worker is never held for long;
+    clients reconnect with ``Last-Event-ID`` and are sent what they missed, or a
+    ``resync`` event when that is more than ``SURVEY_LIVE_REPLAY_MAX`` responses.
+    """
+
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [EventStreamRenderer, JSONRenderer]
+
+    @extend_schema(
+        tags=["Admin Dashboard"],
+        description=(
+            "text/event-stream of `delta` events ({survey, last_id, responses, ratings: {question: "
+            "{rating: n}}, regions: {key: {responses, children: {csc: n}}}}) as submissions arrive."
+        ),
+        parameters=[
+            OpenApiParameter("survey", OpenApiTypes.INT, OpenApiParameter.QUERY, description="Survey ID (default: active survey)"),
+            OpenApiParameter("region", OpenApiTypes.STR, OpenApiParameter.QUERY, description="Region or CSC"),
+        ],
+        responses={200: OpenApiTypes.STR},
+    )
+    def get(self, request):
+        survey = _dashboard_survey(request.query_params.get("survey"))
+        if not survey:
+            return Response({"detail": "No survey"}, status=status.HTTP_404_NOT_FOUND)
+        region = request.query_params.get("region")
+        region_filter = response_region_filter(region) if region else None
+
+        # A reconnecting client names the last response it has seen and gets what it missed.
+        after = request.META.get("HTTP_LAST_EVENT_ID") or request.query_params.get("after")
+        after = int(after) if str(after or "").isdigit() else None
+        response = StreamingHttpResponse(
+            self._stream(survey.id, region_filter, after), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        # Keep reverse proxies (nginx) from buffering the stream.
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    @staticmethod
+    def _stream(survey_id, region_filter, after):
+        keepalive = float(getattr(settings, "SURVEY_LIVE_KEEPALIVE", 15))
+        deadline = time.monotonic() + float(getattr(settings, "SURVEY_LIVE_MAX_SECONDS", 300))
+        replay_max = int(getattr(settings, "SURVEY_LIVE_REPLAY_MAX", 5000))
+        # Subscribed on first iteration, so a response that is never sent leaves nothing behind.
+        hub = get_hub()
+        q = hub.subscribe(survey_id)
+        replayed = set()
+        try:
+            yield "retry: 3000\n\n"
+            yield sse("hello", {"survey": survey_id})
+            if after is not None:
+                items = load_items(survey_id, after, limit=replay_max + 1)
+                if len(items) > replay_max:
+                    # Too far behind to catch up by deltas: the client refetches the dashboard.
+                    yield sse("resync", {"survey": survey_id})
+                else:
+                    replayed = {item.response_id for item in items}
+                    event = delta_event(survey_id, items, region_filter)
+                    if event:
+                        yield sse("delta", event, event_id=event["last_id"])
+            while time.monotonic() < deadline:
+                try:
+                    items = q.get(timeout=min(keepalive, max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                # Fold everything already queued into one event.
+                while True:
+                    try:
+                        items = items + q.get_nowait()
+                    except queue.Empty:
+                        break
+                if replayed:
+                    items = [item for item in items if item.response_id not in replayed]
+                event = delta_event(survey_id, items, region_filter)
+                if event:
+                    yield sse("delta", event, event_id=event["last_id"])
+        finally:
+            hub.unsubscribe(survey_id, q)
 
 
 class AdminResponsesListView(APIView):
@@ -466,9 +1095,17 @@ class AdminResponsesListView(APIView):
 
     @extend_schema(
         tags=["Admin Responses"],
-        description="List responses with filtering and pagination.",
+        description=(
+            "List responses with filtering and pagination. With `q`, only responses with a comment "
+            "matching the search are listed, best matches first; each carries a `rank` and its "
+            "matching answers a `highlight` (the comment as HTML, matches in `<mark>`)."
+        ),
         parameters=[
             OpenApiParameter("survey", OpenApiTypes.INT, OpenApiParameter.QUERY, description="Survey ID"),
+            OpenApiParameter(
+                "q", OpenApiTypes.STR, OpenApiParameter.QUERY,
+                description='Full-text search of comments: all words must match; "quoted phrases" match in sequence',
+            ),
             OpenApiParameter("from", OpenApiTypes.DATE, OpenApiParameter.QUERY, description="From date (YYYY-MM-DD), inclusive"),
             OpenApiParameter("to", OpenApiTypes.DATE, OpenApiParameter.QUERY, description="To date (YYYY-MM-DD), inclusive"),
             OpenApiParameter("question", OpenApiTypes.INT, OpenApiParameter.QUERY, description="Filter by question ID"),
@@ -486,6 +1123,7 @@ class AdminResponsesListView(APIView):
         date_to = request.query_params.get("to")
         rating_min = request.query_params.get("rating_min")
         rating_max = request.query_params.get("rating_max")
+        phrases = parse_query(request.query_params.get("q"))
 
         qs = SurveyResponse.objects.select_related("survey").prefetch_related("answers", "answers__question").all()
 
@@ -496,11 +1134,11 @@ class AdminResponsesListView(APIView):
         if date_from:
             d = parse_date(date_from)
             if d:
-                qs = qs.filter(submitted_at__date__gte=d)
+                qs = qs.filter(**local_day_filter(day_from=d))
         if date_to:
             d = parse_date(date_to)
             if d:
-                qs = qs.filter(submitted_at__date__lte=d)
+                qs = qs.filter(**local_day_filter(day_to=d))
 
         # Build an answers filter for rating range and/or specific question
         answer_filter = Q()
@@ -531,13 +1169,25 @@ class AdminResponsesListView(APIView):
             page_size = int(request.query_params.get("page_size", 20))
         except ValueError:
             page, page_size = 1, 20
-        total = qs.count()
         start = (page - 1) * page_size
         end = start + page_size
+
+        marks = {}
+        if phrases:
+            # Ranked, ordered and sliced in the database (surveys/search.py).
+            qs = search_responses(qs, phrases, survey_id=_int_param(survey_id), question_id=_int_param(q_id))
+        total = qs.count()
+        responses = list(qs[start:end])
+        if phrases:
+            marks = highlight([resp.id for resp in responses], phrases, question_id=_int_param(q_id))
+
         items = []
-        for resp in qs[start:end]:
-            answers = [
-                {
+        for resp in responses:
+            answers = []
+            for a in resp.answers.all():
+                if q_id and str(a.question_id) != str(q_id):
+                    continue
+                answer = {
                     "question_id": a.question_id,
                     "question": a.question.text,
                     "type": a.question.question_type,
@@ -545,14 +1195,18 @@ class AdminResponsesListView(APIView):
                     "comment": a.comment,
                     "choice": a.choice,
                 }
-                for a in resp.answers.all() if (not q_id or str(a.question_id) == str(q_id))
-            ]
-            items.append({
+                if a.id in marks:
+                    answer["highlight"] = marks[a.id]
+                answers.append(answer)
+            item = {
                 "id": resp.id,
                 "submitted_at": resp.submitted_at,
                 "survey": {"id": resp.survey_id, "title": resp.survey.title},
                 "answers": answers,
-            })
+            }
+            if phrases:
+                item["rank"] = round(resp.search_rank or 0.0, 4)
+            items.append(item)
 
         return Response({
             "count": total,
@@ -596,11 +1250,11 @@ class AdminResponsesExportExcelView(APIView):
         if date_from:
             d = parse_date(date_from)
             if d:
-                qs = qs.filter(submitted_at__date__gte=d)
+                qs = qs.filter(**local_day_filter(day_from=d))
         if date_to:
             d = parse_date(date_to)
             if d:
-                qs = qs.filter(submitted_at__date__lte=d)
+                qs = qs.filter(**local_day_filter(day_to=d))
         answer_filter = Q()
         if q_id:
             try:
@@ -692,11 +1346,11 @@ class AdminResponsesExportPdfView(APIView):
         if date_from:
             d = parse_date(date_from)
             if d:
-                qs = qs.filter(submitted_at__date__gte=d)
+                qs = qs.filter(**local_day_filter(day_from=d))
         if date_to:
             d = parse_date(date_to)
             if d:
-                qs = qs.filter(submitted_at__date__lte=d)
+                qs = qs.filter(**local_day_filter(day_to=d))
         answer_filter = Q()
         if q_id:
             try:
@@ -853,6 +1507,7 @@ class AdminUserListCreateView(APIView):
         user.is_staff = role in ("super_admin", "survey_designer")
         user.set_password(password)
         user.save()
+        invalidate_admin_identity(user.username)
 
         return Response(
             {
@@ -896,6 +1551,7 @@ class AdminUserDetailView(APIView):
 
         username = request.data.get("username")
         role = request.data.get("role")
+        previous_username = user.username
 
         if username:
             if User.objects.exclude(pk=user.pk).filter(username=username).exists():
@@ -911,6 +1567,7 @@ class AdminUserDetailView(APIView):
             user.is_staff = role in ("super_admin", "survey_designer")
 
         user.save()
+        invalidate_admin_identity(previous_username, user.username)
 
         return Response(
             {
@@ -931,7 +1588,9 @@ class AdminUserDetailView(APIView):
         if request.user.pk == user.pk:
             return Response({"detail": "You cannot delete your own account."}, status=status.HTTP_400_BAD_REQUEST)
 
+        username = user.username
         user.delete()
+        invalidate_admin_identity(username)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -971,6 +1630,21 @@ class AdminUserResetPasswordView(APIView):
         return Response({"detail": "Password reset successfully"}, status=status.HTTP_200_OK)
 
 
+class IngestMetricsView(APIView):
+    permission_classes = [IsAuthenticated, IsSuperAdmin]
+
+    @extend_schema(
+        tags=["Admin Monitoring"],
+        description="Submission ingestion metrics: spool queue depth and flush latency (spool mode only).",
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    def get(self, request):
+        mode = ingest_mode()
+        if mode != "spool":
+            return Response({"mode": mode})
+        return Response(get_spool().stats())
+
+
 
 
 
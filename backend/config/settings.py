@@ -160,8 +160,8 @@ CORS_ALLOWED_ORIGINS = [
     'http://localhost:5173',
     'http://127.0.0.1:5173',
 ]
-CORS_ALLOW_HEADERS = list(default_headers) + ['authorization']
-CORS_EXPOSE_HEADERS = ['Content-Disposition']
+CORS_ALLOW_HEADERS = list(default_headers) + ['authorization', 'idempotency-key']
+CORS_EXPOSE_HEADERS = ['Content-Disposition', 'ETag', 'Last-Modified', 'Idempotent-Replayed']
 
 # DRF / JWT / Schema
 REST_FRAMEWORK = {
@@ -179,3 +179,86 @@ SPECTACULAR_SETTINGS = {
     'DESCRIPTION': 'API for anonymous surveys and admin analytics',
     'VERSION': '1.0.0',
 }
+
+# Public survey payload cache (seconds). The default CACHES backend is per-process;
+# configure a shared backend (Redis/Memcached) when running several workers so that
+# survey edits are seen by every process immediately.
+SURVEY_CACHE_TIMEOUT = 60 * 60
+SURVEY_ACTIVE_REF_TIMEOUT = 5
+# How long a survey's version number is trusted before it is re-read from the database.
+SURVEY_VERSION_TIMEOUT = 5
+# Dashboard results are cached per survey and filter set. A survey's data generation
+# (re-read at most every SURVEY_GENERATION_TIMEOUT seconds, and at once after a submission
+# in this process) decides when they are recomputed; within SURVEY_DASHBOARD_STALE_SECONDS
+# of the last computation an older result is still served.
+SURVEY_GENERATION_TIMEOUT = 5
+SURVEY_DASHBOARD_CACHE_TIMEOUT = 10 * 60
+SURVEY_DASHBOARD_STALE_SECONDS = 0
+# Dashboard snapshots (surveys/snapshots.py): the active survey's dashboard for common filter
+# sets, stored in the database and served for blocks that are not cached (after new submissions,
+# for up to SURVEY_DASHBOARD_SNAPSHOT_MAX_AGE seconds). They are refreshed by
+# `manage.py precompute_dashboard` or, with SURVEY_DASHBOARD_SNAPSHOT_SCHEDULER, by a thread in
+# each web worker that checks every SURVEY_DASHBOARD_SNAPSHOT_POLL seconds: once the data has
+# changed, after SURVEY_DASHBOARD_SNAPSHOT_INTERVAL seconds or SURVEY_DASHBOARD_SNAPSHOT_SUBMISSIONS
+# new responses.
+SURVEY_DASHBOARD_SNAPSHOT_SCHEDULER = False
+SURVEY_DASHBOARD_SNAPSHOT_POLL = 15
+SURVEY_DASHBOARD_SNAPSHOT_INTERVAL = 5 * 60
+SURVEY_DASHBOARD_SNAPSHOT_SUBMISSIONS = 200
+SURVEY_DASHBOARD_SNAPSHOT_MAX_AGE = 15 * 60
+
+# Timeseries analytics (surveys/timeseries.py). Buckets are computed in ANALYTICS_TIME_ZONE
+# unless a request names another zone. ANALYTICS_TIME_ZONE also decides the day of a
+# submission for every from/to filter, the rollups and the comment keyword index; after
+# changing it, run manage.py rebuild_rollups and rebuild_comment_index. Buckets that ended more than
+# SURVEY_TIMESERIES_LATE_SECONDS ago are closed and cached; submissions stored with an
+# older timestamp retire those caches.
+ANALYTICS_TIME_ZONE = 'Africa/Addis_Ababa'
+SURVEY_TIMESERIES_LATE_SECONDS = 5 * 60
+SURVEY_TIMESERIES_CACHE_TIMEOUT = 60 * 60
+SURVEY_TIMESERIES_MAX_BUCKETS = 2000
+
+# In-memory answer cube (utils/analytics.py): each worker keeps the answers of up to
+# SURVEY_ANSWER_CUBE_SURVEYS surveys in numpy columns for dashboard and crosstab slicing.
+# Surveys above SURVEY_ANSWER_CUBE_MAX_ANSWERS answers are queried in SQL.
+# Memory cost, per worker process: about 20 bytes per answer plus 20 per response once
+# loaded, so up to SURVEY_ANSWER_CUBE_SURVEYS x MAX_ANSWERS x ~30 bytes (~120 MB with the
+# values below), and several times a survey's share while it loads. A survey is loaded
+# synchronously by the first dashboard request that needs it. Off by default; enable it
+# where workers have that memory to spare.
+SURVEY_ANSWER_CUBE = False
+SURVEY_ANSWER_CUBE_SURVEYS = 4
+SURVEY_ANSWER_CUBE_MAX_ANSWERS = 1_000_000
+
+# Live dashboard stream (surveys/live.py, GET /api/admin/dashboard/live/). Each open stream
+# holds a worker thread, so run gunicorn with threaded workers (--worker-class gthread).
+# Streams end after SURVEY_LIVE_MAX_SECONDS and clients reconnect; other workers'
+# submissions are picked up by polling every SURVEY_LIVE_POLL_INTERVAL seconds.
+SURVEY_LIVE_MAX_SECONDS = 300
+SURVEY_LIVE_KEEPALIVE = 15
+SURVEY_LIVE_POLL_INTERVAL = 2.0
+
+# Submission ingestion. "direct" writes each submission inside its request; "spool"
+# appends it to a durable local spool that a background thread flushes in batches.
+# Drain leftovers after a crash with: python manage.py flush_submission_spool
+SURVEY_INGEST_MODE = 'direct'
+SURVEY_SPOOL_DIR = BASE_DIR / 'spool'
+SURVEY_SPOOL_BATCH_SIZE = 500
+SURVEY_SPOOL_FLUSH_INTERVAL = 2.0
+SURVEY_SPOOL_ORPHAN_AGE = 60
+
+# Recently seen submission ids kept in memory to answer rapid retries without a query.
+SUBMISSION_ID_CACHE_SIZE = 10000
+SUBMISSION_ID_CACHE_TTL = 600
+
+# Batch submissions from offline kiosks (POST /api/survey/submit/batch/).
+SURVEY_BATCH_SUBMIT_MAX_ITEMS = 500
+SURVEY_BATCH_SUBMIT_MAX_BYTES = 10 * 1024 * 1024
+
+# Admin status of an employee identifier, cached per process (utils.ad_utils.is_admin_user).
+ADMIN_IDENTITY_CACHE_SIZE = 10000
+ADMIN_IDENTITY_CACHE_TTL = 60
+
+# Region / CSC catalog (surveys/regions.py, GET /api/regions/).
+REGION_DATA_DIR = BASE_DIR / 'Region& csc'
+REGION_CATALOG_MAX_AGE = 3600
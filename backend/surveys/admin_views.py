@@ -5,6 +5,8 @@ from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 
 from .models import Survey
+from .cache import invalidate_survey
+from .portfolio import deactivate_surveys
 from .serializers import (
     SurveyCreateUpdateSerializer,
     SurveyDetailSerializer,
@@ -75,7 +77,9 @@ class AdminSurveyListCreateView(APIView):
         if is_active in ("true", "false"):
             qs = qs.filter(is_active=(is_active == "true"))
 
-        qs = qs.order_by('-created_at').prefetch_related('sections', 'sections__questions', 'questions')
+        # Sections and questions for every listed survey are loaded in two queries
+        # by SurveyDetailSerializer's list serializer (see surveys/tree.py).
+        qs = qs.order_by('-created_at')
         data = SurveyDetailSerializer(qs, many=True).data
         return Response(data)
 
@@ -114,6 +118,7 @@ class AdminSurveyDetailView(APIView):
             return Response({"detail": "Forbidden"}, status=status.HTTP_403_FORBIDDEN)
         survey = self.get_object(pk)
         survey.delete()
+        invalidate_survey(pk)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -126,7 +131,8 @@ class AdminSurveyActivateView(APIView):
         # Deactivate others and activate this one
         survey = get_object_or_404(Survey, pk=pk)
         if not survey.is_active:
-            Survey.objects.filter(is_active=True).update(is_active=False)
+            deactivate_surveys()
             survey.is_active = True
             survey.save(update_fields=['is_active'])
+            invalidate_survey(survey.id)
         return Response({"ok": True})
@@ -0,0 +1,101 @@
+"""Grouped answer aggregates for the admin dashboard.
+
+``aggregate_answers`` reads everything the dashboard derives from answers in two
+grouped queries, whatever the number of questions:
+
+* (question, rating) -> count for every rating answer of the selected responses;
+* (question, choice, code) -> count for the requested choice questions (sex, age, ...).
+
+Averages, distributions, the overall and per-section rating mix are then computed
+in memory from these counts.
+"""
+from typing import NamedTuple
+
+from django.db.models import Count
+
+from .models import Answer
+
+RATING_VALUES = range(1, 6)
+
+
+def empty_rating_counts() -> dict:
+    return {r: 0 for r in RATING_VALUES}
+
+
+class AnswerAggregates(NamedTuple):
+    # question id -> {1..5: count}; only questions that have rating answers appear.
+    rating_counts: dict
+    # question id -> (answers, sum of ratings), including out-of-range ratings like AVG() does.
+    rating_sums: dict
+    # question id -> {raw choice: count}
+    choice_counts: dict
+    # question id -> {canonical code: count} for demographic questions (``Answer.code``)
+    code_counts: dict
+
+    def counts_for(self, question_id) -> dict:
+        return dict(self.rating_counts.get(question_id) or empty_rating_counts())
+
+    def average(self, question_id):
+        n, total = self.rating_sums.get(question_id, (0, 0))
+        if not n:
+            return None
+        return total / float(n)
+
+    def overall_counts(self) -> dict:
+        totals = empty_rating_counts()
+        for counts in self.rating_counts.values():
+            for r, c in counts.items():
+                totals[r] += c
+        return totals
+
+    def counts_by_section(self, section_of) -> dict:
+        """Rating counts summed per section; ``section_of`` maps question id -> section id (or None)."""
+        out = {}
+        for qid, counts in self.rating_counts.items():
+            sid = section_of.get(qid)
+            bucket = out.setdefault(sid, empty_rating_counts())
+            for r, c in counts.items():
+                bucket[r] += c
+        return out
+
+
+def aggregate_answers(responses_qs, rating_question_ids, choice_question_ids=()) -> AnswerAggregates:
+    rating_counts = {}
+    rating_sums = {}
+    if rating_question_ids:
+        rows = (
+            Answer.objects.filter(
+                response__in=responses_qs,
+                question_id__in=list(rating_question_ids),
+                rating__isnull=False,
+            )
+            .values_list("question_id", "rating")
+            .annotate(c=Count("id"))
+        )
+        for qid, rating, c in rows:
+            n, total = rating_sums.get(qid, (0, 0))
+            rating_sums[qid] = (n + int(c), total + rating * int(c))
+            r = int(rating)
+            if r in RATING_VALUES:
+                rating_counts.setdefault(qid, empty_rating_counts())[r] += int(c)
+
+    choice_counts = {}
+    code_counts = {}
+    choice_question_ids = [q for q in choice_question_ids if q is not None]
+    if choice_question_ids:
+        rows = (
+            Answer.objects.filter(response__in=responses_qs, question_id__in=choice_question_ids)
+            .exclude(choice__isnull=True)
+            .values_list("question_id", "choice", "code")
+            .annotate(c=Count("id"))
+        )
+        for qid, choice, code, c in rows:
+            bucket = choice_counts.setdefault(qid, {})
+            bucket[choice] = bucket.get(choice, 0) + int(c)
+            if code:
+                bucket = code_counts.setdefault(qid, {})
+                bucket[code] = bucket.get(code, 0) + int(c)
+
+    return AnswerAggregates(
+        rating_counts=rating_counts, rating_sums=rating_sums, choice_counts=choice_counts, code_counts=code_counts
+    )
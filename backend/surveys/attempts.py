@@ -0,0 +1,68 @@
+"""Attempt counting for the public attempt-limit endpoints.
+
+On PostgreSQL and SQLite every operation is a single ``INSERT ... ON CONFLICT DO UPDATE
+... RETURNING`` statement, so concurrent kiosks behind one NAT IP never lose an
+increment and never wait on a row lock. Other backends fall back to a locked
+read-modify-write.
+"""
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import SurveyAttempt
+
+
+def _supports_upsert() -> bool:
+    return connection.vendor in ("postgresql", "sqlite") and connection.features.can_return_columns_from_insert
+
+
+def _upsert(fp_hash: str, limit: int | None):
+    table = connection.ops.quote_name(SurveyAttempt._meta.db_table)
+    sql = (
+        f"INSERT INTO {table} (fingerprint_hash, attempts, last_submitted) VALUES (%s, 1, %s) "
+        f"ON CONFLICT (fingerprint_hash) DO UPDATE "
+        f"SET attempts = {table}.attempts + 1, last_submitted = excluded.last_submitted"
+    )
+    params = [fp_hash, connection.ops.adapt_datetimefield_value(timezone.now())]
+    if limit is not None:
+        # The conflicting row is only updated while it is under the limit; otherwise
+        # nothing is returned, which is how a refusal is reported.
+        sql += f" WHERE {table}.attempts < %s"
+        params.append(limit)
+    sql += " RETURNING attempts"
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    return int(row[0]) if row else None
+
+
+def _locked_update(fp_hash: str, limit: int | None):
+    with transaction.atomic():
+        obj, _created = SurveyAttempt.objects.select_for_update().get_or_create(
+            fingerprint_hash=fp_hash,
+            defaults={"attempts": 0, "last_submitted": None},
+        )
+        if limit is not None and int(obj.attempts or 0) >= limit:
+            return None
+        obj.attempts = int(obj.attempts or 0) + 1
+        obj.last_submitted = timezone.now()
+        obj.save(update_fields=["attempts", "last_submitted"])
+        return obj.attempts
+
+
+def increment_attempt(fp_hash: str) -> int:
+    """Record one attempt unconditionally and return the new count."""
+    if _supports_upsert():
+        return _upsert(fp_hash, None)
+    return _locked_update(fp_hash, None)
+
+
+def claim_attempt(fp_hash: str, limit: int) -> tuple[bool, int]:
+    """Take one attempt if fewer than ``limit`` were used.
+
+    Returns ``(allowed, attempts)``. When refused the count is already at (or past) the
+    limit and is left untouched, so ``limit`` is reported.
+    """
+    attempts = _upsert(fp_hash, limit) if _supports_upsert() else _locked_update(fp_hash, limit)
+    if attempts is None:
+        return False, limit
+    return True, attempts
@@ -0,0 +1,223 @@
+"""Caching helpers for the public survey payload and the admin dashboard.
+
+The active survey tree only changes when an admin edits or (de)activates a survey,
+so it is rendered once per ``Survey.version`` and kept in a small process-local map
+backed by Django's shared cache. Per-request fields are added by the view.
+
+Dashboard blocks are cached per survey and normalised filter set, tagged with the
+survey's data generation (see ``get_data_generation``). Closed timeseries buckets are
+cached under a per-survey history token that backdated submissions retire.
+"""
+import hashlib
+import json
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Max
+from rest_framework.renderers import JSONRenderer
+
+from .models import Response, Survey
+
+
+ACTIVE_SURVEY_KEY = "surveys:active"
+
+_local_payloads = {}
+_local_lock = threading.Lock()
+
+
+def _payload_key(survey_id: int, version: int) -> str:
+    return f"surveys:payload:{survey_id}:{version}"
+
+
+def _version_key(survey_id: int) -> str:
+    return f"surveys:version:{survey_id}"
+
+
+def _generation_key(survey_id: int) -> str:
+    return f"surveys:generation:{survey_id}"
+
+
+def _history_key(survey_id: int) -> str:
+    return f"surveys:history:{survey_id}"
+
+
+def _dashboard_key(survey_id: int, filter_key: str) -> str:
+    digest = hashlib.sha256(filter_key.encode("utf-8")).hexdigest()[:32]
+    return f"dashboard:{survey_id}:{digest}"
+
+
+def _payload_timeout() -> int:
+    return int(getattr(settings, "SURVEY_CACHE_TIMEOUT", 60 * 60))
+
+
+def _active_ref_timeout() -> int:
+    return int(getattr(settings, "SURVEY_ACTIVE_REF_TIMEOUT", 5))
+
+
+def _version_timeout() -> int:
+    return int(getattr(settings, "SURVEY_VERSION_TIMEOUT", 5))
+
+
+def _generation_timeout() -> int:
+    return int(getattr(settings, "SURVEY_GENERATION_TIMEOUT", 5))
+
+
+def _dashboard_timeout() -> int:
+    return int(getattr(settings, "SURVEY_DASHBOARD_CACHE_TIMEOUT", 10 * 60))
+
+
+def invalidate_survey(survey_id: int | None = None) -> None:
+    """Bump the survey version and forget which survey is active.
+
+    Call this after any change to a survey's structure or activation state. Cached
+    payloads are keyed by version, so stale entries are simply never read again.
+    """
+    keys = [ACTIVE_SURVEY_KEY]
+    if survey_id is not None:
+        Survey.objects.filter(pk=survey_id).update(version=F("version") + 1)
+        keys.extend([_version_key(survey_id), _generation_key(survey_id)])
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def touch_survey_data(survey_ids) -> None:
+    """Start a new data generation for these surveys once the current transaction commits."""
+    keys = [_generation_key(sid) for sid in set(survey_ids)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def get_data_generation(survey_id: int):
+    """Return ``(generation, last_submitted_at)`` for a survey's responses.
+
+    The generation is derived from the survey version, its response count and highest
+    response id, and the history token, so it changes with every stored submission,
+    every survey edit and every rewrite of stored responses (``touch_survey_history``),
+    and every worker derives the same value. It is cached for ``SURVEY_GENERATION_TIMEOUT``
+    seconds and dropped as soon as a submission or edit commits in this process (or in
+    any process, with a shared cache backend).
+    """
+    key = _generation_key(survey_id)
+    hit = cache.get(key)
+    if hit is None:
+        row = Response.objects.filter(survey_id=survey_id).aggregate(
+            n=Count("id"), last_id=Max("id"), last_at=Max("submitted_at")
+        )
+        generation = (
+            f"{get_survey_version(survey_id) or 0}.{row['n']}.{row['last_id'] or 0}.{get_history_token(survey_id)}"
+        )
+        hit = (generation, row["last_at"])
+        cache.set(key, hit, _generation_timeout())
+    return hit
+
+
+def split_generation(generation: str):
+    """``(version, responses, last_id, history token)`` of a ``get_data_generation`` value."""
+    version, count, last_id, history = generation.split(".", 3)
+    return int(version), int(count), int(last_id), history
+
+
+def touch_survey_history(survey_ids) -> None:
+    """Retire cached closed timeseries buckets of these surveys (see ``surveys/timeseries.py``).
+
+    Call when submissions are stored with a ``submitted_at`` older than the late window,
+    or when stored responses are rewritten. Also starts a new data generation.
+    """
+    keys = [_history_key(sid) for sid in set(survey_ids)]
+    keys += [_generation_key(sid) for sid in set(survey_ids)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def get_history_token(survey_id: int) -> str:
+    """Token that closed timeseries buckets of a survey are cached under."""
+    key = _history_key(survey_id)
+    token = cache.get(key)
+    if token is None:
+        token = uuid.uuid4().hex[:12]
+        # add() keeps a token another process set first.
+        if not cache.add(key, token, None):
+            token = cache.get(key) or token
+    return token
+
+
+def get_dashboard_blocks(survey_id: int, filter_key: str, names) -> dict:
+    """Cached dashboard blocks for a filter set, ``{name: entry}`` for those present."""
+    keys = {_dashboard_key(survey_id, f"{filter_key}#{name}"): name for name in names}
+    return {keys[key]: entry for key, entry in cache.get_many(list(keys)).items()}
+
+
+def set_dashboard_blocks(survey_id: int, filter_key: str, entries) -> None:
+    cache.set_many(
+        {_dashboard_key(survey_id, f"{filter_key}#{name}"): entry for name, entry in entries.items()},
+        _dashboard_timeout(),
+    )
+
+
+def get_survey_version(survey_id: int) -> int | None:
+    """Return the current version of a survey, or None if it does not exist."""
+    key = _version_key(survey_id)
+    version = cache.get(key)
+    if version is None:
+        version = Survey.objects.filter(pk=survey_id).values_list("version", flat=True).first()
+        # Unknown ids are remembered as 0 so bogus submissions do not hit the database.
+        version = int(version or 0)
+        cache.set(key, version, _version_timeout())
+    return version or None
+
+
+def get_active_survey_ref():
+    """Return ``(survey_id, version)`` for the active survey, or None."""
+    ref = cache.get(ACTIVE_SURVEY_KEY)
+    if ref is None:
+        row = (
+            Survey.objects.filter(is_active=True)
+            .order_by("-created_at")
+            .values_list("id", "version")
+            .first()
+        )
+        # Cache "no active survey" too, as an empty tuple, so idle portals stay cheap.
+        ref = tuple(row) if row else ()
+        cache.set(ACTIVE_SURVEY_KEY, ref, _active_ref_timeout())
+    return ref or None
+
+
+def _render_payload(survey_id: int):
+    from .serializers import SurveySerializer
+
+    survey = Survey.objects.filter(pk=survey_id).first()
+    if survey is None:
+        return None
+    content = JSONRenderer().render(SurveySerializer(survey).data)
+    etag = hashlib.sha256(content).hexdigest()[:32]
+    return json.loads(content), etag
+
+
+def get_active_survey_payload():
+    """Return ``(payload, etag)`` for the active survey, or ``(None, None)``.
+
+    ``payload`` is shared between requests and must not be mutated; copy it first.
+    """
+    ref = get_active_survey_ref()
+    if not ref:
+        return None, None
+
+    survey_id, version = ref
+    key = _payload_key(survey_id, version)
+    hit = _local_payloads.get(key)
+    if hit is None:
+        hit = cache.get(key)
+        if hit is None:
+            hit = _render_payload(survey_id)
+            if hit is None:
+                return None, None
+            cache.set(key, hit, _payload_timeout())
+        prefix = _payload_key(survey_id, "")
+        with _local_lock:
+            # Keep only the latest rendered version of each survey in this process.
+            for old in [k for k in _local_payloads if k.startswith(prefix)]:
+                del _local_payloads[old]
+            _local_payloads[key] = hit
+    return hit
@@ -0,0 +1,161 @@
+"""Cross-tabulation of the answers to two questions (pivot tables for the dashboard).
+
+The row dimension is a choice question (dropdown / multiple choice), a regions question
+or a demographic role; the column dimension is a rating question (columns 1..5), another
+choice question, or ``rating`` for all rating questions of the survey pooled together.
+
+Every cell comes from one grouped query that joins each row answer to the column answers
+of the same response (``Answer`` -> ``Response`` -> ``Answer``), whatever the number of
+cells, or from the in-memory answer cube (``utils/analytics.py``) when it is loaded. Labels are derived in memory: canonical codes where a demographic role has them
+(``Answer.code``), region keys for regions answers, trimmed choices otherwise.
+"""
+from typing import NamedTuple
+
+from django.db.models import Count
+
+from .aggregates import RATING_VALUES
+from .demographics import REGION, demographic_code
+from .models import Answer, Question
+from .regions import get_region_index, response_region
+
+CHOICE_TYPES = ("dropdown", "multiple_choice")
+# Column value pooling every rating question of the survey.
+POOLED_RATINGS = "rating"
+OTHER = "other"
+
+
+class Dimension(NamedTuple):
+    # "rating", "choice" or "region"
+    kind: str
+    question_ids: tuple
+    # The question row (id, text, question_type, demographic_role, options), or None when pooled.
+    question: dict | None
+
+    @property
+    def key(self) -> str:
+        return f"{self.kind}:{','.join(str(q) for q in self.question_ids)}"
+
+
+def _question_kind(question) -> str:
+    if question["question_type"] == "rating":
+        return "rating"
+    if question["question_type"] == "regions" or question["demographic_role"] == REGION:
+        return "region"
+    if question["question_type"] in CHOICE_TYPES or question["demographic_role"]:
+        return "choice"
+    return ""
+
+
+def resolve_dimension(survey_id, value, column=False) -> Dimension:
+    """The dimension named by a ``row`` / ``col`` query value; raises ValueError.
+
+    ``value`` is a question id or a demographic role (``age_band``, ``region``, ...);
+    columns also accept ``rating``.
+    """
+    value = str(value or "").strip()
+    if not value:
+        raise ValueError("Both 'row' and 'col' are required")
+    questions = Question.objects.filter(survey_id=survey_id).values(
+        "id", "text", "question_type", "demographic_role", "options"
+    )
+    if column and value == POOLED_RATINGS:
+        ids = tuple(sorted(q["id"] for q in questions.filter(question_type="rating")))
+        if not ids:
+            raise ValueError("The survey has no rating questions")
+        return Dimension("rating", ids, None)
+
+    if value.isdigit():
+        question = questions.filter(id=int(value)).first()
+    else:
+        # Lowest id wins if several questions share a role, as on the dashboard.
+        question = questions.filter(demographic_role=value).order_by("id").first()
+    if question is None:
+        raise ValueError(f"No question '{value}' in this survey")
+
+    kind = _question_kind(question)
+    if not kind or (kind == "rating" and not column):
+        side = "column" if column else "row"
+        raise ValueError(f"Question {question['id']} ({question['question_type']}) cannot be a {side}")
+    return Dimension(kind, (question["id"],), question)
+
+
+class CrossTab(NamedTuple):
+    row_labels: list
+    column_labels: list
+    # row label -> {column label: count}
+    counts: dict
+
+
+def _labeller(dimension):
+    if dimension.kind == "rating":
+        return lambda rating, choice, code: int(rating) if rating is not None and int(rating) in RATING_VALUES else None
+    if dimension.kind == "region":
+        def region_label(rating, choice, code):
+            key, csc = response_region(choice)
+            return key or (OTHER if csc else None)
+        return region_label
+    return lambda rating, choice, code: code or str(choice or "").strip() or None
+
+
+def _ordered(dimension, seen_totals) -> list:
+    if dimension.kind == "rating":
+        return list(RATING_VALUES)
+    if dimension.kind == "region":
+        order = [region.key for region in get_region_index().regions] + [OTHER]
+        return [key for key in order if key in seen_totals]
+    by_count = sorted(seen_totals, key=lambda label: (-seen_totals[label], str(label)))
+    # Listed options first, in designer order (as codes where the role has them), then
+    # anything else answered.
+    role = dimension.question["demographic_role"]
+    options = []
+    for line in str(dimension.question.get("options") or "").splitlines():
+        line = demographic_code(role, line) or line.strip()
+        if line and line not in options:
+            options.append(line)
+    return options + [label for label in by_count if label not in options]
+
+
+def answer_pairs(responses_qs, row, col):
+    """``(choice, code, column rating, column choice, column code, count)`` for the responses
+    in ``responses_qs``: each row answer paired with the column answers of its response."""
+    join = {"response__answers__question_id__in": list(col.question_ids)}
+    if col.kind == "rating":
+        join["response__answers__rating__isnull"] = False
+    return (
+        # One filter() call, so both conditions apply to the same joined answer.
+        Answer.objects.filter(response__in=responses_qs, question_id=row.question_ids[0], **join)
+        .values_list("choice", "code", "response__answers__rating", "response__answers__choice", "response__answers__code")
+        .annotate(c=Count("id"))
+    )
+
+
+def cross_tabulate(rows, row, col) -> CrossTab:
+    """Counts per (row label, column label) from ``answer_pairs`` rows (or the answer cube's).
+
+    Pooled ratings count every rating answer, so a row total is a number of ratings
+    rather than of respondents.
+    """
+    row_label = _labeller(row)
+    col_label = _labeller(col)
+    counts = {}
+    row_totals = {}
+    col_totals = {}
+    for choice, code, col_rating, col_choice, col_code, c in rows:
+        r = row_label(None, choice, code)
+        k = col_label(col_rating, col_choice, col_code)
+        if r is None or k is None:
+            continue
+        cells = counts.setdefault(r, {})
+        cells[k] = cells.get(k, 0) + int(c)
+        row_totals[r] = row_totals.get(r, 0) + int(c)
+        col_totals[k] = col_totals.get(k, 0) + int(c)
+    return CrossTab(_ordered(row, row_totals), _ordered(col, col_totals), counts)
+
+
+def dimension_title(dimension, label) -> dict:
+    """Display titles for a row / column label."""
+    if dimension.kind == "region" and label != OTHER:
+        region = get_region_index().by_key.get(label)
+        if region is not None:
+            return {"title": region.en["title"], "title_am": region.am["title"]}
+    return {"title": str(label)}
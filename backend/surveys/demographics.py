@@ -0,0 +1,77 @@
+"""Demographic question roles and canonical answer codes.
+
+A question's ``demographic_role`` says which respondent attribute it asks for, so the
+dashboard finds the gender, age and education questions by role instead of searching
+question texts. Designers set it in the builder; when a question is saved without one,
+``suggest_role`` proposes it once from the question type and text.
+
+Roles with a fixed value set also get a compact canonical code per answer
+(``Answer.code``), assigned at ingest, so "Male", "m" and "ወንድ" are counted together
+without normalising strings at read time. ``recode_answers`` re-derives the codes of a
+question whose role changed.
+"""
+import re
+
+from .models import Answer
+
+GENDER = "gender"
+AGE_BAND = "age_band"
+EDUCATION = "education"
+REGION = "region"
+TENURE = "tenure"
+
+# Only selection questions describe the respondent; a rating question mentioning
+# "age" or "percentage" is never suggested a role.
+_SUGGESTABLE_TYPES = ("dropdown", "multiple_choice")
+
+# (role, pattern) in priority order; English words must match whole words.
+_SUGGESTIONS = (
+    (GENDER, re.compile(r"\b(sex|gender)\b|ጾታ|ፆታ", re.IGNORECASE)),
+    (AGE_BAND, re.compile(r"\bage\b|እድሜ|ዕድሜ", re.IGNORECASE)),
+    (EDUCATION, re.compile(r"\beducation(al)?\b|የትምህርት", re.IGNORECASE)),
+    (TENURE, re.compile(r"\b(years? of service|work experience|tenure)\b|የአገልግሎት|የሥራ ልምድ|የስራ ልምድ", re.IGNORECASE)),
+)
+
+# role -> {normalised answer: code}
+_CODES = {
+    GENDER: {
+        "male": "male",
+        "m": "male",
+        "ወንድ": "male",
+        "female": "female",
+        "f": "female",
+        "ሴት": "female",
+    },
+}
+
+
+def suggest_role(text, question_type) -> str:
+    """Role suggested for a new question, or "" if nothing fits."""
+    if question_type == "regions":
+        return REGION
+    if question_type not in _SUGGESTABLE_TYPES:
+        return ""
+    text = str(text or "")
+    for role, pattern in _SUGGESTIONS:
+        if pattern.search(text):
+            return role
+    return ""
+
+
+def demographic_code(role, choice) -> str:
+    """Canonical code of a choice answer to a question with ``role``, or ""."""
+    codes = _CODES.get(role)
+    if not codes:
+        return ""
+    return codes.get(str(choice or "").strip().lower(), "")
+
+
+def recode_answers(question_id, role) -> None:
+    """Recompute ``Answer.code`` for every answer of a question, e.g. after its role changed."""
+    answers = Answer.objects.filter(question_id=question_id)
+    # Selection questions have a handful of distinct answers: one UPDATE per code.
+    choices_by_code = {}
+    for choice in answers.values_list("choice", flat=True).distinct():
+        choices_by_code.setdefault(demographic_code(role, choice), []).append(choice)
+    for code, choices in choices_by_code.items():
+        answers.filter(choice__in=choices).exclude(code=code).update(code=code)
@@ -0,0 +1,65 @@
+"""Idempotent survey submissions.
+
+Clients may send a client-generated submission id (``Idempotency-Key`` header or a
+``submission_id`` field). It is stored on ``Response`` under a unique index, so a
+retried request is answered with the original result instead of inserting again.
+Rapid retries are absorbed by a small in-memory cache before they reach the database.
+"""
+import re
+
+from django.conf import settings
+from rest_framework import serializers
+
+from utils.cache_utils import TTLCache
+from .models import Response
+
+
+SUBMISSION_ID_RE = re.compile(r"^[A-Za-z0-9_.:\-]{1,64}$")
+
+_recent = TTLCache(
+    maxsize=getattr(settings, "SUBMISSION_ID_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "SUBMISSION_ID_CACHE_TTL", 600),
+)
+
+
+def clean_submission_id(value) -> str | None:
+    """Normalise a submission id; raises ValidationError if it is malformed."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value:
+        return None
+    if not SUBMISSION_ID_RE.match(value):
+        raise serializers.ValidationError({"submission_id": "Invalid submission id"})
+    return value
+
+
+def submission_id_from_request(request) -> str | None:
+    raw = request.META.get("HTTP_IDEMPOTENCY_KEY")
+    if not raw and hasattr(request.data, "get"):
+        raw = request.data.get("submission_id")
+    return clean_submission_id(raw)
+
+
+def remember(submission_id: str, status_code: int, body) -> None:
+    _recent.set(submission_id, (status_code, body))
+
+
+def previous_result(submission_id: str):
+    """Return ``(status_code, body)`` of an earlier submission with this id, or None."""
+    hit = _recent.get(submission_id)
+    if hit is not None:
+        return hit
+    if Response.objects.filter(submission_id=submission_id).exists():
+        hit = (201, {"ok": True})
+        _recent.set(submission_id, hit)
+        return hit
+    return None
+
+
+def existing_submission_ids(submission_ids) -> set:
+    """Return the subset of ``submission_ids`` already stored (one indexed query)."""
+    submission_ids = [k for k in submission_ids if k]
+    if not submission_ids:
+        return set()
+    return set(Response.objects.filter(submission_id__in=submission_ids).values_list("submission_id", flat=True))
@@ -0,0 +1,457 @@
+"""Survey submission ingestion.
+
+``write_submissions`` inserts any number of validated submissions with one
+``Response`` bulk insert and one ``Answer`` bulk insert, and updates the analytics
+rollups and the comment keyword index in the same transaction. It is used directly by the
+submit endpoint and, when ``SURVEY_INGEST_MODE = "spool"``, by the write-behind
+flusher below.
+
+In spool mode each validated submission is appended to a local, fsync'd segment file
+and acknowledged straight away. A background thread in every process rotates its
+segment every ``SURVEY_SPOOL_FLUSH_INTERVAL`` seconds (or once it holds
+``SURVEY_SPOOL_BATCH_SIZE`` records) and writes the rows in multi-response batches.
+
+Files in ``SURVEY_SPOOL_DIR`` (shared by all workers on the host):
+
+    <pid>-<n>.spool            segment being appended to by process <pid>
+    <pid>-<n>.ready            closed segment waiting to be flushed
+    <pid>-<n>.flushing.<pid2>  segment claimed by the flusher of process <pid2>
+    <pid>-<n>.ack              records of a claimed segment already committed
+    rejected.jsonl             records the database refused (e.g. deleted survey)
+
+Segments that have not been touched for ``SURVEY_SPOOL_ORPHAN_AGE`` seconds belong to
+a dead process and are taken over by the next flusher, or drained with
+``manage.py flush_submission_spool``; with ``--all`` it also takes over the segments of
+processes that are no longer running, but never those of a live one. Records already
+acknowledged are skipped.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Response, Answer
+from .idempotency import existing_submission_ids
+from .demographics import demographic_code
+from .regions import response_region
+from .rollups import apply_rollups
+from .keywords import index_comments
+from .cache import touch_survey_data, touch_survey_history
+from .validation import get_validation_plan
+from .timeseries import late_seconds
+from .live import publish_records
+
+logger = logging.getLogger(__name__)
+
+
+def write_submissions(records, skip_duplicates=False):
+    """Insert submissions (see ``SubmitSurveySerializer.to_record``) and return their Responses.
+
+    With ``skip_duplicates``, records whose ``submission_id`` is already stored (or repeated
+    within ``records``) are dropped instead of failing on the unique index.
+    """
+    if skip_duplicates:
+        records = _without_duplicates(records)
+    responses = []
+    plans = {}
+    for r in records:
+        submitted_at = parse_datetime(r["submitted_at"]) if r.get("submitted_at") else None
+        if r["survey"] not in plans:
+            plans[r["survey"]] = get_validation_plan(r["survey"])
+        region, csc = response_region(_regions_answer(r, plans[r["survey"]]))
+        responses.append(
+            Response(
+                survey_id=r["survey"],
+                employee_identifier=r.get("employee_identifier"),
+                submission_id=r.get("submission_id") or None,
+                submitted_at=submitted_at or timezone.now(),
+                region=region,
+                csc=csc,
+            )
+        )
+
+    with transaction.atomic():
+        if connection.features.can_return_rows_from_bulk_insert:
+            Response.objects.bulk_create(responses)
+        else:
+            for resp in responses:
+                resp.save(force_insert=True)
+
+        bulk = []
+        for resp, r in zip(responses, records):
+            plan = plans[r["survey"]]
+            rules = plan.rules if plan else {}
+            for a in r["answers"]:
+                rule = rules.get(a["question"])
+                bulk.append(
+                    Answer(
+                        response=resp,
+                        question_id=a["question"],
+                        rating=a.get("rating"),
+                        comment=a.get("comment") or "",
+                        choice=(a.get("choice") or ""),
+                        code=demographic_code(rule.role, a.get("choice")) if rule else "",
+                    )
+                )
+        Answer.objects.bulk_create(bulk, batch_size=1000)
+        # Analytics rollups move with the rows they count (surveys/rollups.py).
+        apply_rollups(zip(responses, records))
+        # So does the keyword index of their comments (surveys/keywords.py).
+        index_comments(bulk, plans)
+        touch_survey_data(r["survey"] for r in records)
+        # Rows older than the late window change timeseries buckets already cached as closed.
+        late = timezone.now() - timedelta(seconds=late_seconds())
+        touch_survey_history(r["survey"] for r, resp in zip(records, responses) if resp.submitted_at < late)
+        # Connected live dashboards get the new rows once they are visible (surveys/live.py).
+        written = list(zip(responses, records))
+        transaction.on_commit(lambda: publish_records(written, plans))
+    return responses
+
+
+def _regions_answer(record, plan) -> str:
+    # The lowest-id regions question with an answer decides the response's region.
+    rules = plan.rules if plan else {}
+    for a in sorted(record["answers"], key=lambda a: a["question"]):
+        rule = rules.get(a["question"])
+        if rule and rule.question_type == "regions" and (a.get("choice") or "").strip():
+            return a["choice"]
+    return ""
+
+
+def _without_duplicates(records):
+    keys = [r["submission_id"] for r in records if r.get("submission_id")]
+    if not keys:
+        return records
+    seen = existing_submission_ids(keys)
+    out = []
+    for r in records:
+        key = r.get("submission_id")
+        if key:
+            if key in seen:
+                continue
+            seen.add(key)
+        out.append(r)
+    return out
+
+
+def ingest_mode() -> str:
+    return getattr(settings, "SURVEY_INGEST_MODE", "direct")
+
+
+class SubmissionSpool:
+    def __init__(self, directory, batch_size=500, flush_interval=2.0, orphan_age=60.0):
+        self.directory = Path(directory)
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = float(flush_interval)
+        self.orphan_age = float(orphan_age)
+        self.pid = os.getpid()
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._segment = None
+        self._segment_base = None
+        self._segment_count = 0
+        self._seq = 0
+
+        self._appended = 0
+        self._flushed = 0
+        self._rejected = 0
+        self._batches = 0
+        self._last_flush_seconds = None
+        self._max_flush_seconds = 0.0
+        self._total_flush_seconds = 0.0
+        self._last_error = None
+
+    # -- writers -----------------------------------------------------------------
+
+    def append(self, record) -> None:
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._segment is not None and not (self.directory / f"{self._segment_base}.spool").exists():
+                # Claimed by another flusher (taken for an orphan); what it holds is flushed
+                # there, later records go to a new segment.
+                logger.warning("Spool segment %s was claimed by another process", self._segment_base)
+                self._segment.close()
+                self._segment = None
+                self._segment_base = None
+            if self._segment is None:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self._seq += 1
+                self._segment_base = f"{self.pid}-{time.time_ns()}-{self._seq}"
+                self._segment = open(self.directory / f"{self._segment_base}.spool", "a", encoding="utf-8")
+                self._segment_count = 0
+            self._segment.write(line)
+            self._segment.flush()
+            os.fsync(self._segment.fileno())
+            self._segment_count += 1
+            self._appended += 1
+            full = self._segment_count >= self.batch_size
+        self.start()
+        if full:
+            self._wakeup.set()
+
+    def _rotate(self) -> None:
+        with self._lock:
+            if self._segment is None:
+                return
+            self._segment.close()
+            try:
+                os.replace(
+                    self.directory / f"{self._segment_base}.spool",
+                    self.directory / f"{self._segment_base}.ready",
+                )
+            except FileNotFoundError:
+                logger.warning("Spool segment %s was claimed by another process", self._segment_base)
+            self._segment = None
+            self._segment_base = None
+
+    # -- flusher -----------------------------------------------------------------
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="survey-spool-flusher", daemon=True)
+            self._thread.start()
+            atexit.register(self.drain)
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:  # keep the flusher alive; records stay on disk
+                self._last_error = str(e)
+                logger.exception("Survey spool flush failed")
+            finally:
+                connection.close()
+
+    def drain(self) -> None:
+        """Flush everything this process has spooled (used at exit)."""
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Survey spool drain failed")
+
+    def flush(self, include_active: bool = False) -> int:
+        """Rotate this process's segment and write every claimable segment. Returns records written."""
+        self._rotate()
+        written = 0
+        with self._flush_lock:
+            for path in self._claim_segments(include_active=include_active):
+                written += self._flush_segment(path)
+        return written
+
+    def _is_orphan(self, path: Path) -> bool:
+        # A live process rotates its segment every flush interval and rewrites the ack
+        # file after every batch, so anything untouched for ``orphan_age`` is abandoned.
+        base = path.name.split(".", 1)[0]
+        mtimes = []
+        for candidate in (path, self.directory / f"{base}.ack"):
+            try:
+                mtimes.append(candidate.stat().st_mtime)
+            except FileNotFoundError:
+                pass
+        return bool(mtimes) and (time.time() - max(mtimes)) > self.orphan_age
+
+    def _claimable(self, path: Path, owner: str, include_active: bool) -> bool:
+        # ``include_active`` skips the orphan age for segments whose process has exited;
+        # a running owner may still append to or flush its segment.
+        if self._is_orphan(path):
+            return True
+        return include_active and not _process_alive(owner)
+
+    def _claim(self, path: Path, base: str):
+        target = self.directory / f"{base}.flushing.{self.pid}"
+        try:
+            os.replace(path, target)
+        except FileNotFoundError:
+            return None  # another flusher got there first
+        return target
+
+    def _claim_segments(self, include_active: bool = False):
+        if not self.directory.exists():
+            return []
+        claimed = []
+        for path in sorted(self.directory.iterdir()):
+            name = path.name
+            if name.endswith(".ready"):
+                target = self._claim(path, name[: -len(".ready")])
+            elif name.endswith(".spool"):
+                if name[: -len(".spool")] == self._segment_base:
+                    continue
+                if not self._claimable(path, name.split("-", 1)[0], include_active):
+                    continue
+                target = self._claim(path, name[: -len(".spool")])
+            elif ".flushing." in name:
+                base, owner = name.split(".flushing.", 1)
+                if owner == str(self.pid):
+                    target = path  # left over from an earlier failed flush in this process
+                elif self._claimable(path, owner, include_active):
+                    target = self._claim(path, base)
+                else:
+                    continue
+            else:
+                continue
+            if target is not None:
+                claimed.append(target)
+        return claimed
+
+    def _flush_segment(self, path: Path) -> int:
+        base = path.name.split(".flushing.", 1)[0]
+        ack_path = self.directory / f"{base}.ack"
+        try:
+            done = int(ack_path.read_text().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            done = 0
+
+        written = 0
+        batch = []
+        lineno = 0
+        with open(path, encoding="utf-8") as fh:
+            for lineno, line in enumerate(fh, start=1):
+                if lineno <= done or not line.strip():
+                    continue
+                try:
+                    batch.append(json.loads(line))
+                except ValueError:
+                    # A torn final line from a crash mid-append; nothing was acknowledged for it.
+                    logger.warning("Skipping unreadable spool record %s:%s", path.name, lineno)
+                    continue
+                if len(batch) >= self.batch_size:
+                    written += self._write_batch(batch)
+                    batch = []
+                    self._ack(ack_path, lineno)
+        if batch:
+            written += self._write_batch(batch)
+            self._ack(ack_path, lineno)
+
+        path.unlink(missing_ok=True)
+        ack_path.unlink(missing_ok=True)
+        return written
+
+    def _ack(self, ack_path: Path, lineno: int) -> None:
+        with open(ack_path, "w", encoding="utf-8") as fh:
+            fh.write(str(lineno))
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    def _write_batch(self, batch) -> int:
+        started = time.monotonic()
+        # Retried submissions share a submission_id; replays are dropped here, which also
+        # makes re-flushing a segment after a crash harmless for keyed submissions.
+        try:
+            written = len(write_submissions(batch, skip_duplicates=True))
+        except DatabaseError:
+            # One bad record (e.g. its survey was deleted) must not block the rest.
+            written = 0
+            for record in batch:
+                try:
+                    written += len(write_submissions([record], skip_duplicates=True))
+                except DatabaseError as e:
+                    self._reject(record, e)
+        elapsed = time.monotonic() - started
+
+        self._flushed += written
+        self._batches += 1
+        self._last_flush_seconds = elapsed
+        self._max_flush_seconds = max(self._max_flush_seconds, elapsed)
+        self._total_flush_seconds += elapsed
+        logger.debug("Flushed %s spooled submissions in %.3fs", written, elapsed)
+        return written
+
+    def _reject(self, record, error) -> None:
+        self._rejected += 1
+        logger.error("Rejected spooled submission for survey %s: %s", record.get("survey"), error)
+        with open(self.directory / "rejected.jsonl", "a", encoding="utf-8") as fh:
+            fh.write(json.dumps({"record": record, "error": str(error)}, ensure_ascii=False) + "\n")
+
+    # -- metrics -----------------------------------------------------------------
+
+    def stats(self) -> dict:
+        # Queue depth is measured on disk so it covers every worker sharing the spool.
+        queue_depth = 0
+        backlog_files = 0
+        if self.directory.exists():
+            for path in self.directory.iterdir():
+                name = path.name
+                if not (name.endswith(".spool") or name.endswith(".ready") or ".flushing." in name):
+                    continue
+                backlog_files += 1
+                try:
+                    queue_depth += path.read_bytes().count(b"\n")
+                except FileNotFoundError:
+                    continue
+                if ".flushing." in name:
+                    try:
+                        queue_depth -= int((self.directory / f"{name.split('.flushing.', 1)[0]}.ack").read_text() or 0)
+                    except (FileNotFoundError, ValueError):
+                        pass
+        return {
+            "mode": "spool",
+            "pid": self.pid,
+            "queue_depth": max(0, queue_depth),
+            "backlog_files": backlog_files,
+            "appended": self._appended,
+            "flushed": self._flushed,
+            "rejected": self._rejected,
+            "batches": self._batches,
+            "last_flush_seconds": self._last_flush_seconds,
+            "max_flush_seconds": self._max_flush_seconds,
+            "avg_flush_seconds": (self._total_flush_seconds / self._batches) if self._batches else None,
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "last_error": self._last_error,
+        }
+
+
+def _process_alive(pid) -> bool:
+    """Whether process ``pid`` (as named in a segment file) is running on this host."""
+    try:
+        pid = int(pid)
+    except (TypeError, ValueError):
+        return False
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":
+        # os.kill would terminate the process on Windows; rely on the orphan age there.
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # running, as another user
+    return True
+
+
+_spool = None
+_spool_lock = threading.Lock()
+
+
+def get_spool() -> SubmissionSpool:
+    global _spool
+    if _spool is None:
+        with _spool_lock:
+            if _spool is None:
+                _spool = SubmissionSpool(
+                    getattr(settings, "SURVEY_SPOOL_DIR", Path(settings.BASE_DIR) / "spool"),
+                    batch_size=getattr(settings, "SURVEY_SPOOL_BATCH_SIZE", 500),
+                    flush_interval=getattr(settings, "SURVEY_SPOOL_FLUSH_INTERVAL", 2.0),
+                    orphan_age=getattr(settings, "SURVEY_SPOOL_ORPHAN_AGE", 60.0),
+                )
+    return _spool
@@ -0,0 +1,247 @@
+"""Keyword index of open-text comments (text and paragraph questions).
+
+Each comment is split into terms (``comment_terms``). ``CommentTerm`` keeps one row per
+(answer, term) with the response's local day and region copied in, as the rollups do.
+Top terms and term drill-downs are then grouped or indexed lookups on that table,
+filtered by question, region and date; the comments themselves are never scanned.
+``index_comments`` adds the comments of new submissions inside the transaction that
+inserts them (see ``ingest.write_submissions``).
+
+Surveys with comments from before the index are indexed with ``manage.py
+rebuild_comment_index``, or in a background thread started by the first request that
+needs them (``start_comment_index``); the comment views answer 503 until then.
+
+Tokenizing handles English and Amharic:
+
+- Text is NFKC-normalised and case-folded.
+- Words are runs of Ge'ez (Ethiopic) syllables or of other letters, so the Ethiopic word
+  separator and punctuation (፡ ። ፣ ፤ ...), digits and a change of script all end a word.
+- Amharic letters that sound alike and are used interchangeably (ሐ/ኀ -> ሀ, ሠ -> ሰ,
+  ዐ -> አ, ፀ -> ጸ) are folded to one spelling.
+- Stop words of both languages are dropped, as are English words under 3 letters and
+  Ge'ez words under 2 syllables.
+"""
+import logging
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import Answer, CommentTerm, Survey
+from .regions import response_region_filter
+from .timeseries import local_date
+
+# Question types whose answers are free text in ``Answer.comment``.
+TEXT_TYPES = ("text", "paragraph")
+
+MAX_TERM_LENGTH = 64
+INSERT_BATCH = 1000
+# Longest a background index build may hold its lock.
+INDEX_LOCK_TIMEOUT = 60 * 60
+
+logger = logging.getLogger(__name__)
+
+# Ethiopic syllables (base, supplement, extended, extended-A); excludes the Ethiopic
+# punctuation (U+1360-1368) and numerals (U+1369-137C).
+_ETHIOPIC = "\u1200-\u135f\u1380-\u1399\u2d80-\u2dde\uab01-\uab2e"
+_GEEZ = re.compile(f"[{_ETHIOPIC}]")
+_WORD = re.compile(f"[{_ETHIOPIC}]+|[^\\W\\d_{_ETHIOPIC}]+")
+
+
+def _fold_series(source, target, orders=7):
+    return {source + i: target + i for i in range(orders)}
+
+
+# Homophone letter series, each folded onto the common spelling (all seven orders).
+_AMHARIC_FOLD = {
+    **_fold_series(0x1210, 0x1200),  # ሐ -> ሀ
+    **_fold_series(0x1280, 0x1200),  # ኀ -> ሀ
+    **_fold_series(0x1220, 0x1230),  # ሠ -> ሰ
+    **_fold_series(0x12D0, 0x12A0),  # ዐ -> አ
+    **_fold_series(0x1340, 0x1338),  # ፀ -> ጸ
+}
+
+ENGLISH_STOP_WORDS = frozenset("""
+a about above after again against all also am an and any are aren as at be because been
+before being below between both but by can cannot could couldn did didn do does doesn
+doing don down during each even ever every few for from further get gets got had hadn has
+hasn have haven having he her here hers herself him himself his how however i if in into
+is isn it its itself just let like ll made make many may me might more most much must
+mustn my myself need no nor not now of off on once one only or other ought our ours
+ourselves out over own per please re really same shan she should shouldn so some such
+than that the their theirs them themselves then there these they thing things this those
+though through to too under until up upon us very was wasn we well were weren what when
+where which while who whom why will with won would wouldn yes yet you your yours
+yourself yourselves also etc via
+""".split())
+
+AMHARIC_STOP_WORDS = frozenset(w.translate(_AMHARIC_FOLD) for w in """
+እና እንዲሁም ወይም ግን ነገር ግን ስለ ስለዚህ ስለሆነ ስለሆነም ምክንያቱም እንደ እንደዚህ እንደዚሁ እስከ ድረስ ጋር
+ላይ ውስጥ ውጪ ውጭ ታች በላይ በታች ወደ ከ የ በ ለ ነው ናቸው ነበር ነበሩ ነኝ ነህ ነሽ ነን ናችሁ አለ አሉ
+አለው አላቸው አለን አለኝ የለም የሉም የለውም አይደለም አይደሉም ይህ ያ ይህን ያን እነዚህ እነዚያ ይሄ ያኛው
+እኔ እኛ አንተ አንቺ እርስዎ እሱ እሷ እሳቸው እነሱ እናንተ የእኔ የኛ ሁሉ ሁሉም ሁሌ ሁልጊዜ በጣም ብቻ ደግሞ
+ም ና ያለ ያሉ ያለው ያላቸው የሚል የሚሉ ሆኖ ሆነ ሆኗል ይሆናል ሲሆን መሆን ቢሆን ቢሆንም ወዘተ ምንም ማንም
+እንጂ እንጅ ከዚያ ከዚህ በዚህ በዚያ ለዚህ ለዚያ እዚህ እዚያ አሁን ገና ነገር ነገሮች ያህል አንድ ሌላ ሌሎች
+""".split())
+
+
+def normalize_term(word) -> str:
+    word = unicodedata.normalize("NFKC", str(word or "")).casefold()
+    return word.translate(_AMHARIC_FOLD)
+
+
+def _keep(word) -> bool:
+    if word in ENGLISH_STOP_WORDS or word in AMHARIC_STOP_WORDS or len(word) > MAX_TERM_LENGTH:
+        return False
+    return len(word) >= (2 if _GEEZ.match(word) else 3)
+
+
+def tokenize(text) -> list:
+    """Index terms of a text, in order (repeats included)."""
+    text = normalize_term(text)
+    return [word for word in _WORD.findall(text) if _keep(word)]
+
+
+def comment_terms(text) -> Counter:
+    """term -> occurrences in a comment."""
+    return Counter(tokenize(text))
+
+
+def _postings(survey_id, question_id, answer_id, comment, submitted_at, region):
+    day = local_date(submitted_at)
+    return [
+        CommentTerm(
+            survey_id=survey_id,
+            question_id=question_id,
+            answer_id=answer_id,
+            term=term,
+            day=day,
+            region=region,
+            occurrences=min(n, 32767),
+        )
+        for term, n in comment_terms(comment).items()
+    ]
+
+
+def index_comments(answers, plans) -> None:
+    """Index the comments of ``Answer`` rows just inserted; call inside the inserting transaction.
+
+    ``plans`` maps survey ids to their validation plans (question types).
+    """
+    text_questions = {
+        qid
+        for plan in plans.values() if plan
+        for qid, rule in plan.rules.items() if rule.question_type in TEXT_TYPES
+    }
+    answers = [a for a in answers if a.question_id in text_questions and (a.comment or "").strip()]
+    if not answers:
+        return
+    ids = {}
+    if any(a.pk is None for a in answers):
+        # The backend could not return the ids of the bulk insert.
+        ids = {
+            (response_id, question_id): pk
+            for pk, response_id, question_id in Answer.objects.filter(
+                response_id__in={a.response.id for a in answers}, question_id__in=text_questions
+            ).values_list("id", "response_id", "question_id")
+        }
+    rows = []
+    for a in answers:
+        answer_id = a.pk or ids.get((a.response.id, a.question_id))
+        if answer_id is not None:
+            rows += _postings(a.response.survey_id, a.question_id, answer_id, a.comment, a.response.submitted_at, a.response.region)
+    CommentTerm.objects.bulk_create(rows, batch_size=INSERT_BATCH)
+
+
+def rebuild_comment_index(survey_id: int) -> int:
+    """Re-index every comment of a survey; returns how many terms were stored."""
+    stored = 0
+    with transaction.atomic():
+        CommentTerm.objects.filter(survey_id=survey_id).delete()
+        answers = (
+            Answer.objects.filter(response__survey_id=survey_id, question__question_type__in=TEXT_TYPES)
+            .exclude(comment="")
+            .values_list("id", "question_id", "comment", "response__submitted_at", "response__region")
+        )
+        batch = []
+        for answer_id, question_id, comment, submitted_at, region in answers.iterator(chunk_size=INSERT_BATCH):
+            batch += _postings(survey_id, question_id, answer_id, comment, submitted_at, region)
+            if len(batch) >= INSERT_BATCH:
+                # Comments of concurrent submissions may already be indexed.
+                CommentTerm.objects.bulk_create(batch, ignore_conflicts=True)
+                stored += len(batch)
+                batch = []
+        CommentTerm.objects.bulk_create(batch, ignore_conflicts=True)
+        stored += len(batch)
+        Survey.objects.filter(pk=survey_id).update(comments_indexed_at=timezone.now())
+    return stored
+
+
+def _index_lock_key(survey_id: int) -> str:
+    return f"comments:index:lock:{survey_id}"
+
+
+def _build_comment_index(survey_id: int) -> None:
+    try:
+        rebuild_comment_index(survey_id)
+    except Exception:
+        logger.exception("Comment index build of survey %s failed", survey_id)
+    finally:
+        close_old_connections()
+        cache.delete(_index_lock_key(survey_id))
+
+
+def start_comment_index(survey_id: int) -> None:
+    """Index the comments of a survey answered before the index existed, in a background thread.
+
+    With a shared cache, only one worker builds a survey's index at a time; further
+    calls while it runs do nothing.
+    """
+    if cache.add(_index_lock_key(survey_id), os.getpid(), timeout=INDEX_LOCK_TIMEOUT):
+        threading.Thread(
+            target=_build_comment_index, args=(survey_id,), name=f"comment-index-{survey_id}", daemon=True
+        ).start()
+
+
+def term_postings(survey_id, question_id=None, region=None, day_from=None, day_to=None):
+    """``CommentTerm`` rows of a survey matching the dashboard filters."""
+    qs = CommentTerm.objects.filter(survey_id=survey_id)
+    if question_id is not None:
+        qs = qs.filter(question_id=question_id)
+    if day_from:
+        qs = qs.filter(day__gte=day_from)
+    if day_to:
+        qs = qs.filter(day__lte=day_to)
+    if region:
+        # A region matches all of its CSCs; a CSC is looked up on the response.
+        (field, value), = response_region_filter(region).items()
+        qs = qs.filter(region=value) if field == "region" else qs.filter(answer__response__csc=value)
+    return qs
+
+
+def top_terms(postings, limit) -> list:
+    """The most frequent terms: ``{"term", "answers", "occurrences"}``, by answers mentioning them."""
+    rows = (
+        postings.values_list("term")
+        .annotate(answers=Count("id"), occurrences=Sum("occurrences"))
+        .order_by("-answers", "-occurrences", "term")[:limit]
+    )
+    return [{"term": term, "answers": answers, "occurrences": occurrences} for term, answers, occurrences in rows]
+
+
+def answers_with_terms(postings, terms):
+    """Ids of the answers whose comment contains every one of ``terms`` (a values queryset)."""
+    terms = sorted(set(terms))
+    return (
+        postings.filter(term__in=terms)
+        .values("answer_id")
+        .annotate(n=Count("id"))
+        .filter(n=len(terms))
+        .values("answer_id")
+    )
@@ -0,0 +1,243 @@
+"""Live dashboard updates.
+
+Each process keeps a small publish/subscribe hub. ``write_submissions`` publishes the
+responses it stored once their transaction commits, so dashboards connected to the same
+process see them at once. Submissions stored by other workers are found by a poller
+thread (one per process, running only while someone is subscribed) that reads
+responses above the highest id this process has seen every ``SURVEY_LIVE_POLL_INTERVAL``
+seconds. A short id look-back covers transactions that commit out of id order; ids
+already published are remembered, so nothing is counted twice.
+
+Subscribers receive ``LiveItem`` lists and fold them into delta events themselves,
+which lets each stream apply its own region filter (see ``delta_event``).
+"""
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Max
+
+from rest_framework.renderers import BaseRenderer
+
+from .models import Answer, Response
+
+logger = logging.getLogger(__name__)
+
+
+class LiveItem(NamedTuple):
+    response_id: int
+    region: str
+    csc: str
+    # question id -> rating
+    ratings: dict
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets ``Accept: text/event-stream`` requests through DRF content negotiation."""
+
+    media_type = "text/event-stream"
+    format = "event-stream"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only error bodies are rendered here; the stream itself is a StreamingHttpResponse.
+        return f"event: error\ndata: {json.dumps(data, default=str)}\n\n".encode("utf-8")
+
+
+def sse(event, data, event_id=None) -> str:
+    """One server-sent event."""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}\n\n"
+
+
+def _poll_interval() -> float:
+    return float(getattr(settings, "SURVEY_LIVE_POLL_INTERVAL", 2.0))
+
+
+def _id_lookback() -> int:
+    return int(getattr(settings, "SURVEY_LIVE_ID_LOOKBACK", 200))
+
+
+class _SurveyFeed:
+    def __init__(self, last_id):
+        self.subscribers = set()
+        self.last_id = last_id
+        self.published = set()
+        self._order = deque()
+
+    def mark(self, ids) -> list:
+        """Record ids as published and return the ones that were new."""
+        fresh = [i for i in ids if i not in self.published]
+        for i in fresh:
+            self.published.add(i)
+            self._order.append(i)
+            self.last_id = max(self.last_id, i)
+        # Remember enough ids to cover the look-back window.
+        while len(self._order) > 10 * _id_lookback() + 1000:
+            self.published.discard(self._order.popleft())
+        return fresh
+
+
+class LiveHub:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._feeds = {}
+        self._poller = None
+
+    def subscribe(self, survey_id) -> queue.Queue:
+        q = queue.Queue(maxsize=int(getattr(settings, "SURVEY_LIVE_QUEUE_SIZE", 1000)))
+        with self._lock:
+            feed = self._feeds.get(survey_id)
+            if feed is None:
+                last_id = Response.objects.filter(survey_id=survey_id).aggregate(m=Max("id"))["m"] or 0
+                feed = self._feeds[survey_id] = _SurveyFeed(last_id)
+                # Responses inside the look-back window are history, not news.
+                feed.mark(
+                    Response.objects.filter(survey_id=survey_id, id__gt=last_id - _id_lookback())
+                    .values_list("id", flat=True)
+                )
+            feed.subscribers.add(q)
+            if self._poller is None or not self._poller.is_alive():
+                self._poller = threading.Thread(target=self._poll_loop, name="survey-live-poller", daemon=True)
+                self._poller.start()
+        return q
+
+    def unsubscribe(self, survey_id, q) -> None:
+        with self._lock:
+            feed = self._feeds.get(survey_id)
+            if feed is None:
+                return
+            feed.subscribers.discard(q)
+            if not feed.subscribers:
+                del self._feeds[survey_id]
+
+    def publish(self, survey_id, items) -> None:
+        with self._lock:
+            feed = self._feeds.get(survey_id)
+            if feed is None:
+                return
+            fresh = set(feed.mark([item.response_id for item in items]))
+            items = [item for item in items if item.response_id in fresh]
+            subscribers = list(feed.subscribers)
+        if not items:
+            return
+        for q in subscribers:
+            try:
+                q.put_nowait(items)
+            except queue.Full:
+                # A stalled client loses events; it resyncs from the dashboard on reconnect.
+                pass
+
+    def _poll_loop(self) -> None:
+        while True:
+            time.sleep(_poll_interval())
+            with self._lock:
+                watch = {sid: (feed.last_id, set(feed.published)) for sid, feed in self._feeds.items()}
+            if not watch:
+                with self._lock:
+                    if not self._feeds:
+                        self._poller = None
+                        return
+                continue
+            try:
+                for survey_id, (last_id, published) in watch.items():
+                    items = load_items(survey_id, max(0, last_id - _id_lookback()), skip=published)
+                    if items:
+                        self.publish(survey_id, items)
+            except Exception:
+                logger.exception("Live update poll failed")
+            finally:
+                close_old_connections()
+
+
+def load_items(survey_id, after_id, skip=(), limit=None) -> list:
+    """``LiveItem`` for responses of a survey with an id above ``after_id``, except ``skip``."""
+    qs = Response.objects.filter(survey_id=survey_id, id__gt=after_id).order_by("id").values_list("id", "region", "csc")
+    if limit is not None:
+        qs = qs[:limit]
+    rows = [row for row in qs if row[0] not in skip]
+    if not rows:
+        return []
+    ratings = {}
+    answers = Answer.objects.filter(
+        response_id__in=[r[0] for r in rows], rating__isnull=False, question__question_type="rating"
+    ).values_list("response_id", "question_id", "rating")
+    for response_id, question_id, rating in answers:
+        ratings.setdefault(response_id, {})[question_id] = rating
+    return [LiveItem(rid, region, csc, ratings.get(rid, {})) for rid, region, csc in rows]
+
+
+def items_from_records(pairs, rating_question_ids) -> dict:
+    """survey id -> ``LiveItem`` list for ``(Response, record)`` pairs just written."""
+    out = {}
+    for response, record in pairs:
+        rated = rating_question_ids.get(record["survey"], ())
+        ratings = {a["question"]: int(a["rating"]) for a in record["answers"]
+                   if a.get("rating") is not None and a["question"] in rated}
+        out.setdefault(record["survey"], []).append(
+            LiveItem(response.id, response.region, response.csc, ratings)
+        )
+    return out
+
+
+def delta_event(survey_id, items, region_filter=None) -> dict | None:
+    """Fold items into one delta event, keeping those that match ``region_filter``.
+
+    ``region_filter`` is ``response_region_filter`` output (``{"region": key}`` or
+    ``{"csc": value}``) or None for all responses.
+    """
+    if region_filter:
+        (field, value), = region_filter.items()
+        items = [item for item in items if getattr(item, field) == value]
+    if not items:
+        return None
+    ratings = {}
+    regions = {}
+    for item in items:
+        for qid, rating in item.ratings.items():
+            bucket = ratings.setdefault(str(qid), {})
+            bucket[str(rating)] = bucket.get(str(rating), 0) + 1
+        if item.region:
+            node = regions.setdefault(item.region, {"responses": 0, "children": {}})
+            node["responses"] += 1
+            if item.csc:
+                node["children"][item.csc] = node["children"].get(item.csc, 0) + 1
+    return {
+        "survey": survey_id,
+        "last_id": max(item.response_id for item in items),
+        "responses": len(items),
+        "ratings": ratings,
+        "regions": regions,
+    }
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_hub() -> LiveHub:
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                _hub = LiveHub()
+    return _hub
+
+
+def publish_records(pairs, plans) -> None:
+    """Publish committed submissions; ``write_submissions`` registers this with ``on_commit``."""
+    if _hub is None:
+        # Nobody has subscribed in this process.
+        return
+    rating_ids = {
+        sid: {qid for qid, rule in (plan.rules if plan else {}).items() if rule.question_type == "rating"}
+        for sid, plan in plans.items()
+    }
+    by_survey = items_from_records(pairs, rating_ids)
+    for survey_id, items in by_survey.items():
+        _hub.publish(survey_id, items)
@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from surveys.cache import touch_survey_history
+from surveys.models import Answer, Response
+from surveys.regions import response_region
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy each response's regions answer into Response.region / Response.csc. Needed once "
+        "for responses stored before those columns existed; safe to re-run. Works in batches, "
+        "one short transaction each, so it can run while the portal is live."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("surveys", nargs="*", type=int, help="Survey ids (default: every survey).")
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive")
+        qs = Response.objects.order_by("id")
+        if options["surveys"]:
+            qs = qs.filter(survey_id__in=options["surveys"])
+
+        last_id = 0
+        scanned = updated = 0
+        while True:
+            batch = list(qs.filter(id__gt=last_id).values_list("id", "survey_id", "region", "csc")[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            ids = [row[0] for row in batch]
+
+            # The lowest-id regions question with an answer decides, as at submit time.
+            choices = {}
+            for response_id, choice in (
+                Answer.objects.filter(response_id__in=ids, question__question_type="regions")
+                .exclude(choice="")
+                .order_by("response_id", "-question_id")
+                .values_list("response_id", "choice")
+            ):
+                if choice.strip():
+                    choices[response_id] = choice
+
+            changed = []
+            surveys = set()
+            for response_id, survey_id, region, csc in batch:
+                new = response_region(choices.get(response_id))
+                if new != (region, csc):
+                    changed.append(Response(id=response_id, region=new[0], csc=new[1]))
+                    surveys.add(survey_id)
+            if changed:
+                with transaction.atomic():
+                    Response.objects.bulk_update(changed, ["region", "csc"], batch_size=500)
+                    # Cached dashboards, timeseries buckets and answer cubes of these
+                    # surveys are recomputed.
+                    touch_survey_history(surveys)
+
+            scanned += len(batch)
+            updated += len(changed)
+            self.stdout.write(f"up to response {last_id}: {scanned} scanned, {updated} updated")
+
+        self.stdout.write(self.style.SUCCESS(f"Response regions backfilled ({updated} of {scanned} changed)."))
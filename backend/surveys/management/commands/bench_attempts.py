@@ -0,0 +1,86 @@
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from surveys.attempts import claim_attempt, increment_attempt
+from surveys.models import SurveyAttempt
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer one fingerprint from many threads and check that the attempt counter "
+        "loses no increments and never grants more claims than the limit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--ops", type=int, default=50, help="Operations per thread.")
+        parser.add_argument("--limit", type=int, default=2, help="Limit used for the claim phase.")
+
+    def _run_threads(self, threads, target):
+        errors = []
+
+        def worker():
+            try:
+                target()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        started = time.perf_counter()
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        return time.perf_counter() - started, errors
+
+    def handle(self, *args, **options):
+        threads, ops, limit = options["threads"], options["ops"], options["limit"]
+        if threads < 1 or ops < 1 or limit < 1:
+            raise CommandError("--threads, --ops and --limit must be positive")
+
+        self.stdout.write(f"Backend: {connection.vendor}, {threads} threads x {ops} ops")
+        prefix = f"bench-{uuid.uuid4().hex}"
+        inc_hash, claim_hash = f"{prefix}-inc", f"{prefix}-claim"
+        granted = []
+        granted_lock = threading.Lock()
+
+        def do_increments():
+            for _ in range(ops):
+                increment_attempt(inc_hash)
+
+        def do_claims():
+            for _ in range(ops):
+                allowed, _attempts = claim_attempt(claim_hash, limit)
+                if allowed:
+                    with granted_lock:
+                        granted.append(1)
+
+        try:
+            elapsed, errors = self._run_threads(threads, do_increments)
+            expected = threads * ops
+            actual = SurveyAttempt.objects.get(fingerprint_hash=inc_hash).attempts
+            self.stdout.write(
+                f"increment: expected={expected} actual={actual} lost={expected - actual} "
+                f"errors={len(errors)} {expected / elapsed:.0f} ops/s"
+            )
+
+            elapsed, claim_errors = self._run_threads(threads, do_claims)
+            stored = SurveyAttempt.objects.get(fingerprint_hash=claim_hash).attempts
+            self.stdout.write(
+                f"claim:     limit={limit} granted={len(granted)} stored={stored} "
+                f"errors={len(claim_errors)} {expected / elapsed:.0f} ops/s"
+            )
+        finally:
+            SurveyAttempt.objects.filter(fingerprint_hash__startswith=prefix).delete()
+
+        for e in (errors + claim_errors)[:5]:
+            self.stderr.write(f"error: {e!r}")
+        if actual != expected or len(granted) != limit or stored != limit or errors or claim_errors:
+            raise CommandError("Attempt counter lost or over-granted updates")
+        self.stdout.write(self.style.SUCCESS("No lost increments."))
@@ -0,0 +1,60 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.views import DashboardView
+
+
+class Command(BaseCommand):
+    help = "Time GET /api/admin/dashboard/ in-process and report its query count and latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--survey", type=int, help="Survey id (default: the active survey).")
+        parser.add_argument("--region")
+        parser.add_argument("--from", dest="date_from")
+        parser.add_argument("--to", dest="date_to")
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be positive")
+        user = get_user_model().objects.filter(is_superuser=True).order_by("id").first()
+        if user is None:
+            raise CommandError("Create a super admin first (manage.py createsuperuser).")
+
+        params = {
+            "survey": options["survey"],
+            "region": options["region"],
+            "from": options["date_from"],
+            "to": options["date_to"],
+        }
+        params = {k: v for k, v in params.items() if v not in (None, "")}
+        factory = APIRequestFactory()
+        view = DashboardView.as_view()
+
+        timings = []
+        queries = 0
+        for _ in range(options["repeat"]):
+            request = factory.get("/api/admin/dashboard/", params)
+            force_authenticate(request, user=user)
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = view(request)
+                response.render()
+                timings.append((time.perf_counter() - started) * 1000.0)
+            if response.status_code != 200:
+                raise CommandError(f"Dashboard returned {response.status_code}: {response.content[:200]!r}")
+            queries = len(ctx.captured_queries)
+
+        timings.sort()
+        self.stdout.write(
+            f"dashboard {params or '(active survey)'}: queries={queries} "
+            f"median={statistics.median(timings):.1f}ms "
+            f"p90={timings[int(0.9 * (len(timings) - 1))]:.1f}ms "
+            f"min={timings[0]:.1f}ms over {len(timings)} runs"
+        )
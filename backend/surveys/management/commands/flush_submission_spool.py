@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from surveys.ingest import get_spool
+
+
+class Command(BaseCommand):
+    help = "Write spooled survey submissions to the database (crash recovery / manual drain)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help=(
+                "Also take over the segments of processes that are no longer running, without waiting "
+                "for SURVEY_SPOOL_ORPHAN_AGE. Segments of running processes are left to them."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        spool = get_spool()
+        written = spool.flush(include_active=options["all"])
+        stats = spool.stats()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Flushed {written} submission(s); {stats['rejected']} rejected, "
+                f"{stats['queue_depth']} still queued."
+            )
+        )
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from surveys.models import Survey
+from surveys.snapshots import refresh_due, refresh_snapshots, run_scheduler
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompute the dashboard snapshots of a survey (default: the active one) for the common "
+        "filter sets: no filter, each region, the last 7 and 30 days."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("survey", nargs="?", type=int, help="Survey id (default: the active survey).")
+        parser.add_argument(
+            "--if-due",
+            action="store_true",
+            help="Only when the snapshots are due (data changed and interval or submission count reached).",
+        )
+        parser.add_argument(
+            "--watch",
+            action="store_true",
+            help="Keep running and refresh the active survey's snapshots whenever they are due.",
+        )
+
+    def handle(self, *args, **options):
+        if options["watch"]:
+            self.stdout.write("Refreshing dashboard snapshots when due; Ctrl+C to stop.")
+            run_scheduler()
+            return
+
+        if options["survey"] is not None:
+            survey = Survey.objects.filter(id=options["survey"]).first()
+            if survey is None:
+                raise CommandError(f"Unknown survey id: {options['survey']}")
+        else:
+            survey = Survey.objects.filter(is_active=True).order_by("-created_at").first()
+            if survey is None:
+                raise CommandError("No active survey")
+
+        started = time.perf_counter()
+        stored = refresh_due(survey) if options["if_due"] else refresh_snapshots(survey)
+        self.stdout.write(self.style.SUCCESS(
+            f"survey {survey.id}: {stored} snapshot(s) stored in {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from surveys.keywords import rebuild_comment_index
+from surveys.models import Survey
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the keyword index of open-text comments from raw answers. Needed for surveys "
+        "answered before the index, or after the tokenizer changes; safe to re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("surveys", nargs="*", type=int, help="Survey ids (default: every survey).")
+        parser.add_argument(
+            "--missing",
+            action="store_true",
+            help="Only surveys whose comments were never indexed.",
+        )
+
+    def handle(self, *args, **options):
+        qs = Survey.objects.order_by("id")
+        if options["surveys"]:
+            qs = qs.filter(id__in=options["surveys"])
+            missing = set(options["surveys"]) - set(qs.values_list("id", flat=True))
+            if missing:
+                raise CommandError(f"Unknown survey id(s): {', '.join(map(str, sorted(missing)))}")
+        if options["missing"]:
+            qs = qs.filter(comments_indexed_at__isnull=True)
+
+        for survey_id in qs.values_list("id", flat=True):
+            terms = rebuild_comment_index(survey_id)
+            self.stdout.write(f"survey {survey_id}: {terms} terms")
+        self.stdout.write(self.style.SUCCESS("Comment index rebuilt."))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from surveys.models import Survey
+from surveys.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the dashboard analytics rollups from raw answers. Needed once for surveys "
+        "that predate the rollups; safe to re-run. Best run while submissions are quiet."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("surveys", nargs="*", type=int, help="Survey ids (default: every survey).")
+        parser.add_argument(
+            "--missing",
+            action="store_true",
+            help="Only surveys whose rollups were never built.",
+        )
+
+    def handle(self, *args, **options):
+        qs = Survey.objects.order_by("id")
+        if options["surveys"]:
+            qs = qs.filter(id__in=options["surveys"])
+            missing = set(options["surveys"]) - set(qs.values_list("id", flat=True))
+            if missing:
+                raise CommandError(f"Unknown survey id(s): {', '.join(map(str, sorted(missing)))}")
+        if options["missing"]:
+            qs = qs.filter(rollups_built_at__isnull=True)
+
+        for survey_id in qs.values_list("id", flat=True):
+            response_rows, answer_rows = rebuild_rollups(survey_id)
+            self.stdout.write(f"survey {survey_id}: {response_rows} response rows, {answer_rows} answer rows")
+        self.stdout.write(self.style.SUCCESS("Rollups rebuilt."))
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0017_survey_budget_year'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='survey',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0019_alter_response_submitted_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='response',
+            name='submission_id',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.8 on 2026-10-16 22:44
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0020_response_submission_id'),
+    ]
+
+    operations = [
+        # Existing surveys start without rollups (NULL) until `manage.py rebuild_rollups`;
+        # surveys created afterwards are covered from their first response.
+        migrations.AddField(
+            model_name='survey',
+            name='rollups_built_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='survey',
+            name='rollups_built_at',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, null=True),
+        ),
+        migrations.CreateModel(
+            name='AnswerRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('rating', models.SmallIntegerField(default=0)),
+                ('choice', models.CharField(blank=True, default='', max_length=300)),
+                ('region', models.CharField(blank=True, default='', max_length=128)),
+                ('answers', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.BigIntegerField(default=0)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='surveys.question')),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_rollups', to='surveys.survey')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('survey', 'day', 'question', 'rating', 'choice', 'region'), name='uniq_answer_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResponseRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('region', models.CharField(blank=True, default='', max_length=128)),
+                ('responses', models.PositiveIntegerField(default=0)),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='response_rollups', to='surveys.survey')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('survey', 'day', 'region'), name='uniq_response_rollup')],
+            },
+        ),
+    ]
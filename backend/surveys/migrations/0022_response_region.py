@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-16 22:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0021_answer_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='response',
+            name='csc',
+            field=models.CharField(blank=True, default='', max_length=300),
+        ),
+        migrations.AddField(
+            model_name='response',
+            name='region',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(fields=['survey', 'region'], name='response_survey_region_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(fields=['survey', 'csc'], name='response_survey_csc_idx'),
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.8 on 2026-10-16 22:51
+
+import re
+
+from django.db import migrations, models
+
+# Frozen copies of surveys/demographics.py as of this migration, so later changes there
+# do not change what the backfill does on a fresh database.
+SUGGESTABLE_TYPES = ('dropdown', 'multiple_choice')
+
+SUGGESTIONS = (
+    ('gender', re.compile(r"\b(sex|gender)\b|ጾታ|ፆታ", re.IGNORECASE)),
+    ('age_band', re.compile(r"\bage\b|እድሜ|ዕድሜ", re.IGNORECASE)),
+    ('education', re.compile(r"\beducation(al)?\b|የትምህርት", re.IGNORECASE)),
+    ('tenure', re.compile(r"\b(years? of service|work experience|tenure)\b|የአገልግሎት|የሥራ ልምድ|የስራ ልምድ", re.IGNORECASE)),
+)
+
+CODES = {
+    'gender': {
+        'male': 'male',
+        'm': 'male',
+        'ወንድ': 'male',
+        'female': 'female',
+        'f': 'female',
+        'ሴት': 'female',
+    },
+}
+
+
+def suggest_role(text, question_type):
+    if question_type == 'regions':
+        return 'region'
+    if question_type not in SUGGESTABLE_TYPES:
+        return ''
+    for role, pattern in SUGGESTIONS:
+        if pattern.search(str(text or '')):
+            return role
+    return ''
+
+
+def demographic_code(role, choice):
+    return CODES.get(role, {}).get(str(choice or '').strip().lower(), '')
+
+
+def backfill_roles_and_codes(apps, schema_editor):
+    # Existing questions get the suggested role once; designers can change it afterwards.
+    Question = apps.get_model('surveys', 'Question')
+    Answer = apps.get_model('surveys', 'Answer')
+
+    for q in Question.objects.all().only('id', 'text', 'question_type'):
+        role = suggest_role(q.text, q.question_type)
+        if not role:
+            continue
+        Question.objects.filter(pk=q.pk).update(demographic_role=role)
+        answers = Answer.objects.filter(question_id=q.pk)
+        for choice in answers.values_list('choice', flat=True).distinct():
+            code = demographic_code(role, choice)
+            if code:
+                answers.filter(choice=choice).update(code=code)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0022_response_region'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answer',
+            name='code',
+            field=models.CharField(blank=True, default='', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='demographic_role',
+            field=models.CharField(blank=True, choices=[('gender', 'Gender'), ('age_band', 'Age band'), ('education', 'Education level'), ('region', 'Region'), ('tenure', 'Years of service')], default='', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['survey', 'demographic_role'], name='question_survey_role_idx'),
+        ),
+        migrations.RunPython(backfill_roles_and_codes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-16 22:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0023_demographic_roles'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(fields=['survey', 'submitted_at'], name='response_survey_submitted_idx'),
+        ),
+    ]
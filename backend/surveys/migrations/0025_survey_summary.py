@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0024_response_survey_submitted_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurveySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField()),
+                ('responses', models.PositiveIntegerField()),
+                ('last_response_id', models.BigIntegerField(default=0)),
+                ('metrics', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('survey', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='summary', to='surveys.survey')),
+            ],
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:12
+
+import django.db.models.deletion
+import rest_framework.utils.encoders
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0025_survey_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('filter_key', models.CharField(max_length=255)),
+                ('generation', models.CharField(max_length=200)),
+                ('responses', models.PositiveIntegerField(default=0)),
+                ('body', models.JSONField(encoder=rest_framework.utils.encoders.JSONEncoder)),
+                ('last_submitted_at', models.DateTimeField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField()),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dashboard_snapshots', to='surveys.survey')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('survey', 'filter_key'), name='dashboard_snapshot_filter_unique')],
+            },
+        ),
+    ]
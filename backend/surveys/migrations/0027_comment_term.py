@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0026_dashboard_snapshot'),
+    ]
+
+    operations = [
+        # Existing surveys are indexed on first use or by `manage.py rebuild_comment_index`
+        # (NULL until then); surveys created afterwards are indexed from their first response.
+        migrations.AddField(
+            model_name='survey',
+            name='comments_indexed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='survey',
+            name='comments_indexed_at',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, null=True),
+        ),
+        migrations.CreateModel(
+            name='CommentTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('day', models.DateField()),
+                ('region', models.CharField(blank=True, default='', max_length=128)),
+                ('occurrences', models.PositiveSmallIntegerField(default=1)),
+                ('answer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='surveys.answer')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comment_terms', to='surveys.question')),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comment_terms', to='surveys.survey')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['survey', 'term', 'day'], name='comment_term_lookup_idx'), models.Index(fields=['survey', 'day'], name='comment_term_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('answer', 'term'), name='uniq_comment_term')],
+            },
+        ),
+    ]
@@ -0,0 +1,74 @@
+from django.db import migrations
+
+# Full-text index of Answer.comment, see surveys/search.py. The database maintains it on
+# every write, so it needs no model field: a generated tsvector column with a GIN index
+# on PostgreSQL, an external-content FTS5 table kept in step by triggers on SQLite.
+# SQLite drops the triggers when a later migration rebuilds surveys_answer; such a
+# migration must recreate them and rebuild the FTS5 table.
+POSTGRES_FORWARD = [
+    "ALTER TABLE surveys_answer ADD COLUMN comment_search tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('simple', coalesce(comment, ''))) STORED",
+    "CREATE INDEX surveys_answer_comment_search_idx ON surveys_answer USING GIN (comment_search)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS surveys_answer_comment_search_idx",
+    "ALTER TABLE surveys_answer DROP COLUMN IF EXISTS comment_search",
+]
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE surveys_answer_fts USING fts5("
+    "comment, content='surveys_answer', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER surveys_answer_fts_ai AFTER INSERT ON surveys_answer BEGIN "
+    "INSERT INTO surveys_answer_fts(rowid, comment) VALUES (new.id, new.comment); END",
+    "CREATE TRIGGER surveys_answer_fts_ad AFTER DELETE ON surveys_answer BEGIN "
+    "INSERT INTO surveys_answer_fts(surveys_answer_fts, rowid, comment) VALUES ('delete', old.id, old.comment); END",
+    "CREATE TRIGGER surveys_answer_fts_au AFTER UPDATE OF comment ON surveys_answer BEGIN "
+    "INSERT INTO surveys_answer_fts(surveys_answer_fts, rowid, comment) VALUES ('delete', old.id, old.comment); "
+    "INSERT INTO surveys_answer_fts(rowid, comment) VALUES (new.id, new.comment); END",
+    "INSERT INTO surveys_answer_fts(surveys_answer_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS surveys_answer_fts_ai",
+    "DROP TRIGGER IF EXISTS surveys_answer_fts_ad",
+    "DROP TRIGGER IF EXISTS surveys_answer_fts_au",
+    "DROP TABLE IF EXISTS surveys_answer_fts",
+]
+
+
+def _sqlite_has_fts5(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def create_comment_search(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = POSTGRES_FORWARD
+    elif vendor == 'sqlite' and _sqlite_has_fts5(schema_editor):
+        statements = SQLITE_FORWARD
+    else:
+        # Search falls back to icontains.
+        return
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def drop_comment_search(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'postgresql': POSTGRES_REVERSE, 'sqlite': SQLITE_REVERSE}.get(vendor, [])
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0027_comment_term'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_comment_search, drop_comment_search),
+    ]
@@ -0,0 +1,104 @@
+from collections import defaultdict
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+BATCH = 1000
+
+
+def _analytics_timezone():
+    return ZoneInfo(str(getattr(settings, 'ANALYTICS_TIME_ZONE', 'Africa/Addis_Ababa')))
+
+
+def rebuild_rollups_in_local_days(apps, schema_editor):
+    # Rollup and keyword index days were UTC dates; they are now dates in
+    # ANALYTICS_TIME_ZONE, like every date filter. Rollups cannot be re-bucketed row by
+    # row, so surveys that have them are recomputed from raw answers (a frozen copy of
+    # surveys.rollups.rebuild_rollups).
+    Survey = apps.get_model('surveys', 'Survey')
+    Response = apps.get_model('surveys', 'Response')
+    Answer = apps.get_model('surveys', 'Answer')
+    ResponseRollup = apps.get_model('surveys', 'ResponseRollup')
+    AnswerRollup = apps.get_model('surveys', 'AnswerRollup')
+    tz = _analytics_timezone()
+
+    for survey_id in Survey.objects.filter(rollups_built_at__isnull=False).values_list('id', flat=True):
+        ResponseRollup.objects.filter(survey_id=survey_id).delete()
+        AnswerRollup.objects.filter(survey_id=survey_id).delete()
+
+        responses = (
+            Response.objects.filter(survey_id=survey_id)
+            .annotate(day=TruncDate('submitted_at', tzinfo=tz))
+            .values_list('day', 'region')
+            .annotate(n=Count('id'))
+        )
+        ResponseRollup.objects.bulk_create(
+            [ResponseRollup(survey_id=survey_id, day=d, region=r, responses=n) for d, r, n in responses],
+            batch_size=BATCH,
+        )
+
+        answers = {}
+        base = Answer.objects.filter(response__survey_id=survey_id).annotate(
+            day=TruncDate('response__submitted_at', tzinfo=tz)
+        )
+        rating_rows = (
+            base.filter(rating__isnull=False)
+            .values_list('day', 'question_id', 'rating', 'response__region')
+            .annotate(n=Count('id'), total=Sum('rating'))
+        )
+        for day, qid, rating, region, n, total in rating_rows:
+            key = (day, qid, int(rating), '', region)
+            prev_n, prev_total = answers.get(key, (0, 0))
+            answers[key] = (prev_n + n, prev_total + int(total or 0))
+        choice_rows = (
+            base.exclude(choice='')
+            .values_list('day', 'question_id', 'choice', 'response__region')
+            .annotate(n=Count('id'))
+        )
+        for day, qid, value, region, n in choice_rows:
+            if not value.strip():
+                continue
+            key = (day, qid, 0, value, region)
+            prev_n, prev_total = answers.get(key, (0, 0))
+            answers[key] = (prev_n + n, prev_total)
+        AnswerRollup.objects.bulk_create(
+            [
+                AnswerRollup(
+                    survey_id=survey_id, day=d, question_id=q, rating=rt, choice=c, region=r, answers=n, rating_sum=total
+                )
+                for (d, q, rt, c, r), (n, total) in answers.items()
+            ],
+            batch_size=BATCH,
+        )
+
+
+def move_comment_terms_to_local_days(apps, schema_editor):
+    CommentTerm = apps.get_model('surveys', 'CommentTerm')
+    tz = _analytics_timezone()
+
+    # local day -> answers whose terms carry another day
+    moved = defaultdict(set)
+    rows = CommentTerm.objects.values_list('answer_id', 'day', 'answer__response__submitted_at').order_by('answer_id')
+    for answer_id, day, submitted_at in rows.iterator(chunk_size=5000):
+        local_day = submitted_at.astimezone(tz).date()
+        if local_day != day:
+            moved[local_day].add(answer_id)
+    for day, answer_ids in moved.items():
+        answer_ids = sorted(answer_ids)
+        for start in range(0, len(answer_ids), BATCH):
+            CommentTerm.objects.filter(answer_id__in=answer_ids[start:start + BATCH]).update(day=day)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0028_answer_comment_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_rollups_in_local_days, migrations.RunPython.noop),
+        migrations.RunPython(move_comment_terms_to_local_days, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
 
 
 class Survey(models.Model):
@@ -10,6 +12,13 @@ class Survey(models.Model):
     budget_year = models.IntegerField(null=True, blank=True, db_index=True)
     is_active = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped whenever the survey structure or activation changes; used to key cached payloads.
+    version = models.PositiveIntegerField(default=1)
+    # Set once the analytics rollups cover every response (new surveys start covered);
+    # until then the dashboard reads raw answers. See surveys/rollups.py.
+    rollups_built_at = models.DateTimeField(null=True, blank=True, default=timezone.now)
+    # Set once the comment keyword index covers every response, as above (surveys/keywords.py).
+    comments_indexed_at = models.DateTimeField(null=True, blank=True, default=timezone.now)
 
     def __str__(self):
         return self.title
@@ -38,6 +47,14 @@ class Question(models.Model):
         ("linear_scale", "Linear Scale"),
         ("paragraph", "Paragraph"),
     )
+    # Respondent attribute a question asks for (surveys/demographics.py).
+    DEMOGRAPHIC_ROLE_CHOICES = (
+        ("gender", "Gender"),
+        ("age_band", "Age band"),
+        ("education", "Education level"),
+        ("region", "Region"),
+        ("tenure", "Years of service"),
+    )
     survey = models.ForeignKey(Survey, related_name="questions", on_delete=models.CASCADE)
     section = models.ForeignKey(Section, related_name="questions", on_delete=models.CASCADE, null=True, blank=True)
     text = models.CharField(max_length=300)
@@ -55,22 +72,38 @@ class Question(models.Model):
     rating_display_style = models.CharField(max_length=20, blank=True)
     # Optional max characters for text questions (e.g., 300 for short text, 500 for paragraph)
     max_chars = models.IntegerField(null=True, blank=True)
+    # Set in the builder, or suggested from the text when the question is first saved.
+    demographic_role = models.CharField(max_length=20, choices=DEMOGRAPHIC_ROLE_CHOICES, blank=True, default="")
 
     def __str__(self):
         return f"{self.survey.title} - {self.text[:50]}"
 
     class Meta:
         ordering = ["order", "id"]
+        indexes = [
+            models.Index(fields=["survey", "demographic_role"], name="question_survey_role_idx"),
+        ]
 
 
 class Response(models.Model):
     survey = models.ForeignKey(Survey, related_name="responses", on_delete=models.CASCADE)
-    submitted_at = models.DateTimeField(auto_now_add=True)
+    # Defaults to "now" but can be set explicitly, e.g. to the receipt time of a spooled submission.
+    submitted_at = models.DateTimeField(default=timezone.now)
     # Store AD domain username for employee identification (e.g., "DOMAIN\\username")
     employee_identifier = models.CharField(max_length=255, blank=True, null=True)
+    # Client-generated idempotency key; retries with the same key never insert twice.
+    submission_id = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    # Copied from the regions answer at submit time (surveys/regions.py: response_region)
+    # so region filters and breakdowns need no join on answers.
+    region = models.CharField(max_length=100, blank=True, default="")
+    csc = models.CharField(max_length=300, blank=True, default="")
 
     class Meta:
-        pass
+        indexes = [
+            models.Index(fields=["survey", "region"], name="response_survey_region_idx"),
+            models.Index(fields=["survey", "csc"], name="response_survey_csc_idx"),
+            models.Index(fields=["survey", "submitted_at"], name="response_survey_submitted_idx"),
+        ]
 
 
 class Answer(models.Model):
@@ -80,6 +113,8 @@ class Answer(models.Model):
     comment = models.TextField(blank=True)
     # For dropdown / multiple choice questions, store the selected option text
     choice = models.CharField(max_length=300, blank=True)
+    # Canonical code of ``choice`` for demographic questions (e.g. "male"), set at ingest.
+    code = models.CharField(max_length=16, blank=True, default="")
 
     class Meta:
         unique_together = ("response", "question")
@@ -90,6 +125,105 @@ class SurveyAttempt(models.Model):
     attempts = models.IntegerField(default=0)
     last_submitted = models.DateTimeField(null=True, blank=True)
 
+class ResponseRollup(models.Model):
+    """Responses per (survey, day, region); maintained on submit by surveys/rollups.py."""
+
+    survey = models.ForeignKey(Survey, related_name="response_rollups", on_delete=models.CASCADE)
+    day = models.DateField()
+    # Canonical region key (surveys/regions.py), or "" when unknown / not asked.
+    region = models.CharField(max_length=128, blank=True, default="")
+    responses = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["survey", "day", "region"], name="uniq_response_rollup"),
+        ]
+
+
+class AnswerRollup(models.Model):
+    """Answers per (survey, day, question, rating or choice, region); see surveys/rollups.py.
+
+    Rating answers are counted with ``choice=""``; choice answers with ``rating=0``.
+    """
+
+    survey = models.ForeignKey(Survey, related_name="answer_rollups", on_delete=models.CASCADE)
+    day = models.DateField()
+    question = models.ForeignKey(Question, related_name="rollups", on_delete=models.CASCADE)
+    rating = models.SmallIntegerField(default=0)
+    choice = models.CharField(max_length=300, blank=True, default="")
+    region = models.CharField(max_length=128, blank=True, default="")
+    answers = models.PositiveIntegerField(default=0)
+    rating_sum = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["survey", "day", "question", "rating", "choice", "region"],
+                name="uniq_answer_rollup",
+            ),
+        ]
+
+
+class SurveySummary(models.Model):
+    """Headline metrics of a closed survey for the budget-year portfolio (surveys/portfolio.py).
+
+    Stored when a survey is deactivated and never edited: if the survey changes later
+    (reopened, responses added or removed), the row is replaced.
+    """
+
+    survey = models.OneToOneField(Survey, related_name="summary", on_delete=models.CASCADE)
+    # State of the survey the metrics were computed from.
+    version = models.PositiveIntegerField()
+    responses = models.PositiveIntegerField()
+    last_response_id = models.BigIntegerField(default=0)
+    # Rating counts overall, per section and per question (with normalised-text keys).
+    metrics = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+
+class CommentTerm(models.Model):
+    """A term of an open-text answer's comment; the keyword index of surveys/keywords.py."""
+
+    survey = models.ForeignKey(Survey, related_name="comment_terms", on_delete=models.CASCADE)
+    question = models.ForeignKey(Question, related_name="comment_terms", on_delete=models.CASCADE)
+    answer = models.ForeignKey(Answer, related_name="terms", on_delete=models.CASCADE)
+    term = models.CharField(max_length=64)
+    # Local submission day and region of the response, as in the rollups.
+    day = models.DateField()
+    region = models.CharField(max_length=128, blank=True, default="")
+    occurrences = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["answer", "term"], name="uniq_comment_term"),
+        ]
+        indexes = [
+            models.Index(fields=["survey", "term", "day"], name="comment_term_lookup_idx"),
+            models.Index(fields=["survey", "day"], name="comment_term_day_idx"),
+        ]
+
+
+class DashboardSnapshot(models.Model):
+    """A precomputed admin dashboard for one survey and filter set (surveys/snapshots.py)."""
+
+    survey = models.ForeignKey(Survey, related_name="dashboard_snapshots", on_delete=models.CASCADE)
+    # Normalised filters, as in the dashboard cache key.
+    filter_key = models.CharField(max_length=255)
+    # Data generation (surveys/cache.py) and response count the blocks were computed from.
+    generation = models.CharField(max_length=200)
+    responses = models.PositiveIntegerField(default=0)
+    # Dashboard blocks by name.
+    body = models.JSONField(encoder=JSONEncoder)
+    last_submitted_at = models.DateTimeField(null=True, blank=True)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["survey", "filter_key"], name="dashboard_snapshot_filter_unique"),
+        ]
+
+
 # class Region(models.Model):
 #     value = models.CharField(max_length=10, unique=True)
 #     title = models.CharField(max_length=100)
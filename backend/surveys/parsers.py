@@ -0,0 +1,57 @@
+import gzip
+import io
+import zlib
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+
+class CompressedJSONParser(JSONParser):
+    """JSON parser that also accepts ``Content-Encoding: gzip`` (or ``deflate``) request bodies.
+
+    Bodies are capped by ``SURVEY_BATCH_SUBMIT_MAX_BYTES``: plain bodies as sent (DRF
+    reads the stream itself, so ``DATA_UPLOAD_MAX_MEMORY_SIZE`` does not apply), and
+    compressed ones both as sent and once decompressed, so a small compressed body
+    cannot expand into an unbounded amount of memory.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        request = parser_context.get("request")
+        encoding = ""
+        limit = int(getattr(settings, "SURVEY_BATCH_SUBMIT_MAX_BYTES", 10 * 1024 * 1024))
+        if request is not None:
+            encoding = (request.META.get("HTTP_CONTENT_ENCODING") or "").strip().lower()
+            try:
+                length = int(request.META.get("CONTENT_LENGTH") or 0)
+            except ValueError:
+                length = 0
+            if length > limit:
+                raise ParseError("Request body is too large")
+
+        if encoding in ("gzip", "x-gzip", "deflate"):
+            try:
+                if encoding == "deflate":
+                    raw = stream.read(limit + 1)
+                    if len(raw) > limit:
+                        raise ParseError("Request body is too large")
+                    data = zlib.decompressobj().decompress(raw, limit + 1)
+                else:
+                    with gzip.GzipFile(fileobj=stream) as fh:
+                        data = fh.read(limit + 1)
+            except (OSError, EOFError, zlib.error) as exc:
+                raise ParseError(f"Invalid {encoding} body - {exc}")
+            if len(data) > limit:
+                raise ParseError("Decompressed body is too large")
+            stream = io.BytesIO(data)
+        elif encoding in ("", "identity"):
+            # Chunked bodies carry no Content-Length.
+            data = stream.read(limit + 1)
+            if len(data) > limit:
+                raise ParseError("Request body is too large")
+            stream = io.BytesIO(data)
+        else:
+            raise ParseError(f"Unsupported Content-Encoding: {encoding}")
+
+        return super().parse(stream, media_type=media_type, parser_context=parser_context)
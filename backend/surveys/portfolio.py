@@ -0,0 +1,237 @@
+"""Budget-year portfolio: headline metrics of many surveys side by side.
+
+For every survey of the requested budget years the portfolio reports the response
+count, the overall rating distribution and the average rating per section and per
+question. Metrics of all open surveys come from one grouped query across surveys
+(rating answers per question and rating); closed surveys are read from their
+``SurveySummary``, stored when they are deactivated (``store_summaries``), so their
+raw answers are never scanned again.
+
+Questions are matched across surveys and years by ``text_key``: a hash of the
+question text with markup, case, punctuation and spacing normalised away, so a
+question that was re-entered in next year's survey lines up with last year's.
+"""
+import hashlib
+import html
+import re
+import unicodedata
+
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils.html import strip_tags
+
+from .aggregates import RATING_VALUES
+from .models import Answer, Question, Response, Section, Survey, SurveySummary
+
+_PUNCTUATION = re.compile(r"[^\w\s]|_", re.UNICODE)
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_text(text) -> str:
+    text = html.unescape(strip_tags(str(text or "")))
+    text = unicodedata.normalize("NFKC", text).casefold()
+    # Ethiopic punctuation (።, ፣, ...) is not \w, so it goes too.
+    text = _PUNCTUATION.sub(" ", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+def text_key(text) -> str:
+    """Stable key of a question or section text for matching across surveys."""
+    return hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()[:16]
+
+
+def _response_stats(survey_ids) -> dict:
+    # survey id -> (responses, highest response id), one grouped query.
+    rows = (
+        Response.objects.filter(survey_id__in=survey_ids)
+        .values_list("survey_id")
+        .annotate(n=Count("id"), last_id=Max("id"))
+    )
+    return {sid: (int(n), int(last_id or 0)) for sid, n, last_id in rows}
+
+
+def compute_metrics(survey_ids) -> dict:
+    """survey id -> metrics (the ``SurveySummary.metrics`` shape), computed from raw answers.
+
+    All surveys share one grouped query over their rating answers.
+    """
+    survey_ids = list(survey_ids)
+    questions = list(
+        Question.objects.filter(survey_id__in=survey_ids, question_type="rating")
+        .values_list("id", "survey_id", "section_id", "text")
+        .order_by("survey_id", "order", "id")
+    )
+    sections = list(
+        Section.objects.filter(survey_id__in=survey_ids)
+        .values_list("id", "survey_id", "title", "order")
+        .order_by("survey_id", "order", "id")
+    )
+    counts = {}
+    sums = {}
+    rows = (
+        Answer.objects.filter(question_id__in=[q[0] for q in questions], rating__isnull=False)
+        .values_list("question_id", "rating")
+        .annotate(c=Count("id"))
+    )
+    for qid, rating, c in rows:
+        n, total = sums.get(qid, (0, 0))
+        sums[qid] = (n + int(c), total + int(rating) * int(c))
+        if int(rating) in RATING_VALUES:
+            bucket = counts.setdefault(qid, {str(r): 0 for r in RATING_VALUES})
+            bucket[str(rating)] += int(c)
+
+    out = {
+        sid: {"ratings": {str(r): 0 for r in RATING_VALUES}, "answers": 0, "rating_sum": 0, "sections": [], "questions": []}
+        for sid in survey_ids
+    }
+    section_rows = {}
+    for section_id, sid, title, order in sections:
+        row = {"section_id": section_id, "title": title, "order": order, "key": text_key(title), "answers": 0, "rating_sum": 0}
+        section_rows[section_id] = row
+        out[sid]["sections"].append(row)
+    for qid, sid, section_id, text in questions:
+        metrics = out[sid]
+        n, total = sums.get(qid, (0, 0))
+        q_counts = counts.get(qid, {str(r): 0 for r in RATING_VALUES})
+        metrics["questions"].append({
+            "question_id": qid,
+            "text": text,
+            "key": text_key(text),
+            "section_id": section_id,
+            "answers": n,
+            "rating_sum": total,
+            "ratings": q_counts,
+        })
+        metrics["answers"] += n
+        metrics["rating_sum"] += total
+        for r, c in q_counts.items():
+            metrics["ratings"][r] += c
+        section = section_rows.get(section_id)
+        if section is not None:
+            section["answers"] += n
+            section["rating_sum"] += total
+    return out
+
+
+def store_summaries(survey_ids, metrics=None) -> None:
+    """Snapshot the metrics of closed surveys; an existing snapshot that still matches is kept.
+
+    ``metrics`` may hold metrics the caller has just computed for some of them.
+    """
+    surveys = {
+        s.id: s for s in Survey.objects.filter(id__in=list(survey_ids), is_active=False).only("id", "version")
+    }
+    if not surveys:
+        return
+    stats = _response_stats(list(surveys))
+    current = {
+        s.survey_id: s for s in SurveySummary.objects.filter(survey_id__in=list(surveys)).only(
+            "survey_id", "version", "responses", "last_response_id"
+        )
+    }
+    stale = [
+        sid for sid, survey in surveys.items()
+        if sid not in current or not _matches(current[sid], survey.version, stats.get(sid, (0, 0)))
+    ]
+    if not stale:
+        return
+    metrics = dict(metrics or {})
+    missing = [sid for sid in stale if sid not in metrics]
+    if missing:
+        metrics.update(compute_metrics(missing))
+    with transaction.atomic():
+        SurveySummary.objects.filter(survey_id__in=stale).delete()
+        # A concurrent store of the same survey wins; both computed the same metrics.
+        SurveySummary.objects.bulk_create([
+            SurveySummary(
+                survey_id=sid,
+                version=surveys[sid].version,
+                responses=stats.get(sid, (0, 0))[0],
+                last_response_id=stats.get(sid, (0, 0))[1],
+                metrics=metrics[sid],
+            )
+            for sid in stale
+        ], ignore_conflicts=True)
+
+
+def summarize_on_commit(survey_ids) -> None:
+    """Store summaries of surveys just deactivated, once the deactivation commits."""
+    survey_ids = list(survey_ids)
+    if survey_ids:
+        transaction.on_commit(lambda: store_summaries(survey_ids))
+
+
+def deactivate_surveys() -> None:
+    """Deactivate every active survey and snapshot them."""
+    survey_ids = list(Survey.objects.filter(is_active=True).values_list("id", flat=True))
+    if survey_ids:
+        Survey.objects.filter(id__in=survey_ids).update(is_active=False)
+        summarize_on_commit(survey_ids)
+
+
+def _matches(summary, version, stats) -> bool:
+    return (summary.version, summary.responses, summary.last_response_id) == (version, stats[0], stats[1])
+
+
+def portfolio(years) -> dict:
+    """Surveys of the budget ``years`` with their metrics, plus questions matched across them.
+
+    Returns ``{"surveys": [...], "questions": [...]}``; each survey carries ``responses``,
+    ``metrics`` and ``summary_at`` (when read from a snapshot, else None).
+    """
+    surveys = list(
+        Survey.objects.filter(budget_year__in=list(years))
+        .order_by("budget_year", "created_at", "id")
+        .values("id", "title", "budget_year", "is_active", "version")
+    )
+    ids = [s["id"] for s in surveys]
+    stats = _response_stats(ids)
+    summaries = {s.survey_id: s for s in SurveySummary.objects.filter(survey_id__in=ids)}
+
+    live = []
+    for survey in surveys:
+        summary = summaries.get(survey["id"])
+        if survey["is_active"] or summary is None or not _matches(summary, survey["version"], stats.get(survey["id"], (0, 0))):
+            summaries.pop(survey["id"], None)
+            live.append(survey["id"])
+    metrics = compute_metrics(live) if live else {}
+    # Closed surveys without a snapshot (closed before snapshots existed, or changed
+    # since) get one now, so the next call reads it.
+    closed = [s["id"] for s in surveys if s["id"] in metrics and not s["is_active"]]
+    if closed:
+        store_summaries(closed, metrics)
+
+    out = []
+    for survey in surveys:
+        summary = summaries.get(survey["id"])
+        out.append({
+            **{k: survey[k] for k in ("id", "title", "budget_year", "is_active")},
+            "responses": stats.get(survey["id"], (0, 0))[0],
+            "metrics": summary.metrics if summary is not None else metrics[survey["id"]],
+            "summary_at": summary.created_at if summary is not None else None,
+        })
+
+    # Questions asked in more than one survey, in survey order.
+    matched = {}
+    for survey in out:
+        for question in survey["metrics"]["questions"]:
+            matched.setdefault(question["key"], []).append((survey, question))
+    questions = [
+        {
+            "key": key,
+            "question": entries[-1][1]["text"],
+            "surveys": [
+                {
+                    "survey": survey["id"],
+                    "budget_year": survey["budget_year"],
+                    "question_id": question["question_id"],
+                    "answers": question["answers"],
+                    "avg_rating": round(question["rating_sum"] / question["answers"], 2) if question["answers"] else None,
+                }
+                for survey, question in entries
+            ],
+        }
+        for key, entries in matched.items()
+        if len({survey["id"] for survey, _question in entries}) > 1
+    ]
+    return {"surveys": out, "questions": questions}
@@ -0,0 +1,190 @@
+"""Region / CSC catalog and hierarchy index.
+
+The catalog lives in ``REGION_DATA_DIR`` (default ``backend/Region& csc``):
+
+    Regions.JSON       region -> CSC hierarchy (Amharic values)
+    Regions-en.json    top-level regions as offered by the survey page, in English
+    Regions-am.json    the same list in Amharic, in the same order
+
+A ``regions`` answer stores the value the respondent picked, so one region can be
+stored as ``"Adama"`` or ``"አዳማ"``, and a CSC value may appear as well. The index maps
+every known value to its region and every region to all values that belong to it, so
+validation, filters and rollups are dictionary lookups. It is built once per process.
+
+Each ``Response`` also stores its regions answer split into ``region`` (canonical key)
+and ``csc`` at submit time (``response_region``), so dashboard filters and breakdowns
+read indexed columns instead of joining answers (``response_region_filter``).
+"""
+import gzip
+import hashlib
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import NamedTuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class Region(NamedTuple):
+    # Canonical key used for rollups: the English value.
+    key: str
+    en: dict
+    am: dict
+    # Every stored value that names the region itself (English, Amharic, hierarchy spelling).
+    aliases: frozenset
+    # CSC values under this region, in catalog order.
+    children: tuple
+
+
+class RegionIndex:
+    def __init__(self, regions):
+        self.regions = list(regions)
+        self.by_key = {r.key: r for r in self.regions}
+        self._alias_of = {}
+        self._csc_of = {}
+        self._members = {}
+        for r in self.regions:
+            for value in r.aliases:
+                self._alias_of[value] = r.key
+            for value in r.children:
+                self._csc_of.setdefault(value, r.key)
+            self._members[r.key] = r.aliases | frozenset(r.children)
+        # All values a regions answer may hold.
+        self.values = frozenset(self._alias_of) | frozenset(self._csc_of)
+
+        self.payload = json.dumps(self.catalog(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.payload_gzip = gzip.compress(self.payload, mtime=0)
+        self.etag = hashlib.sha256(self.payload).hexdigest()[:32]
+
+    def is_known(self, value) -> bool:
+        return value in self._alias_of or value in self._csc_of
+
+    def is_csc(self, value) -> bool:
+        return value in self._csc_of and value not in self._alias_of
+
+    def region_of(self, value):
+        """Canonical region key for a region or CSC value, or None if unknown."""
+        return self._alias_of.get(value) or self._csc_of.get(value)
+
+    def members(self, key) -> frozenset:
+        """All stored values of region ``key`` (its names and its CSCs)."""
+        return self._members.get(key, frozenset())
+
+    def expand(self, value) -> frozenset:
+        """Stored values matched by a filter on ``value``.
+
+        A region matches itself in either language and all of its CSCs; a CSC or an
+        unknown value matches only itself.
+        """
+        key = self._alias_of.get(value)
+        if key is None:
+            return frozenset([value])
+        return self._members[key]
+
+    def catalog(self) -> dict:
+        return {
+            "regions": [
+                {
+                    "key": r.key,
+                    "en": r.en,
+                    "am": r.am,
+                    "children": [{"value": c, "title": c} for c in r.children],
+                }
+                for r in self.regions
+            ]
+        }
+
+
+def _read_json(path: Path):
+    with open(path, encoding="utf-8-sig") as fh:
+        return json.load(fh)
+
+
+def load_region_index(directory=None) -> RegionIndex:
+    directory = Path(directory or getattr(settings, "REGION_DATA_DIR", Path(settings.BASE_DIR) / "Region& csc"))
+    hierarchy = _read_json(directory / "Regions.JSON")
+    english = _read_json(directory / "Regions-en.json")
+    amharic = _read_json(directory / "Regions-am.json")
+    if len(english) != len(amharic):
+        raise ValueError("Regions-en.json and Regions-am.json must list the same regions")
+
+    # The hierarchy names regions in Amharic. Repeated entries are merged, and a
+    # hierarchy name that is a shortened form of the survey-page name (e.g. without
+    # "ኢትዮጵያ") is matched by prefix.
+    children_by_name = {}
+    for node in hierarchy:
+        name = str(node.get("value") or "").strip()
+        if not name:
+            continue
+        kids = children_by_name.setdefault(name, [])
+        for child in node.get("children") or []:
+            value = str(child.get("value") or "").strip()
+            if value and value not in kids:
+                kids.append(value)
+
+    regions = []
+    matched = set()
+    for en, am in zip(english, amharic):
+        en = {"value": en["value"], "title": en.get("title") or en["value"]}
+        am = {"value": am["value"], "title": am.get("title") or am["value"]}
+        names = [n for n in children_by_name if n == am["value"]]
+        if not names:
+            names = [n for n in children_by_name if n not in matched and am["value"].startswith(n)]
+        matched.update(names)
+        children = tuple(c for n in names for c in children_by_name[n])
+        aliases = frozenset([en["value"], am["value"], *names])
+        regions.append(Region(key=en["value"], en=en, am=am, aliases=aliases, children=children))
+
+    for name in [n for n in children_by_name if n not in matched]:
+        logger.warning("Region %r in Regions.JSON has no survey-page entry", name)
+        entry = {"value": name, "title": name}
+        regions.append(
+            Region(key=name, en=entry, am=entry, aliases=frozenset([name]), children=tuple(children_by_name[name]))
+        )
+    return RegionIndex(regions)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_region_index() -> RegionIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = load_region_index()
+    return _index
+
+
+def response_region(choice) -> tuple[str, str]:
+    """``(region, csc)`` stored on a Response for its regions answer.
+
+    ``region`` is the canonical region key. ``csc`` is the answer when it names a CSC,
+    or the raw answer when it is not a known value at all (``region`` is then blank).
+    """
+    value = str(choice or "").strip()[:300]
+    if not value:
+        return "", ""
+    index = get_region_index()
+    key = index.region_of(value)
+    if key is None:
+        return "", value
+    return key, (value if index.is_csc(value) else "")
+
+
+def response_region_filter(value) -> dict:
+    """Response filter kwargs for a dashboard ``region`` filter value.
+
+    A region name (either language) matches the whole region, CSCs included; a CSC or
+    an unknown value matches only itself.
+    """
+    value = str(value or "").strip()
+    index = get_region_index()
+    key = index.region_of(value)
+    if key is not None and not index.is_csc(value):
+        return {"region": key}
+    return {"csc": value}
@@ -0,0 +1,227 @@
+"""Incrementally maintained analytics rollups.
+
+``ResponseRollup`` counts responses per (survey, day, region) and ``AnswerRollup``
+counts answers per (survey, day, question, rating or choice, region), with the sum of
+ratings. ``apply_rollups`` adds a batch of new submissions inside the transaction that
+inserts them (see ``ingest.write_submissions``), so the dashboard can aggregate a
+survey in time proportional to its questions and days rather than its responses.
+
+``day`` is the date of ``submitted_at`` in ``ANALYTICS_TIME_ZONE`` (``timeseries.local_date``,
+as every date filter uses) and ``region`` is ``Response.region``, so date and top-level region filters map
+directly onto rollup rows. Filters the rollups cannot answer (a CSC, free text) fall
+back to raw answers.
+
+``rebuild_rollups`` recomputes a survey from its raw answers; run it once for surveys
+that predate the rollups (``manage.py rebuild_rollups``, after
+``backfill_response_regions``), preferably while quiet.
+"""
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .aggregates import AnswerAggregates, RATING_VALUES, empty_rating_counts
+from .demographics import demographic_code
+from .models import Answer, AnswerRollup, Response, ResponseRollup, Survey
+from .regions import response_region_filter
+from .timeseries import analytics_timezone, local_date
+
+UPSERT_CHUNK = 100
+
+
+def _deltas(pairs):
+    responses = {}
+    answers = {}
+    for response, record in pairs:
+        survey_id = record["survey"]
+        day = local_date(response.submitted_at)
+        region = response.region
+
+        key = (survey_id, day, region)
+        responses[key] = responses.get(key, 0) + 1
+        for a in record["answers"]:
+            rating = a.get("rating")
+            choice = (a.get("choice") or "")[:300]
+            if rating is not None:
+                key = (survey_id, day, a["question"], int(rating), "", region)
+                n, total = answers.get(key, (0, 0))
+                answers[key] = (n + 1, total + int(rating))
+            if choice.strip():
+                key = (survey_id, day, a["question"], 0, choice, region)
+                n, total = answers.get(key, (0, 0))
+                answers[key] = (n + 1, total)
+    return responses, answers
+
+
+def _supports_upsert() -> bool:
+    return connection.vendor in ("postgresql", "sqlite")
+
+
+def _upsert(model, key_columns, value_columns, rows) -> None:
+    table = connection.ops.quote_name(model._meta.db_table)
+    columns = key_columns + value_columns
+    updates = ", ".join(f"{c} = {table}.{c} + excluded.{c}" for c in value_columns)
+    row_sql = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), UPSERT_CHUNK):
+            chunk = rows[start:start + UPSERT_CHUNK]
+            sql = (
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([row_sql] * len(chunk))} "
+                f"ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET {updates}"
+            )
+            cursor.execute(sql, [v for row in chunk for v in row])
+
+
+def _adapt_day(day):
+    return connection.ops.adapt_datefield_value(day)
+
+
+def apply_rollups(pairs) -> None:
+    """Add ``(Response, record)`` pairs to the rollups; call inside the inserting transaction."""
+    responses, answers = _deltas(pairs)
+    if not responses:
+        return
+    # Sorted keys give concurrent submitters the same row lock order.
+    response_rows = sorted(responses.items())
+    answer_rows = sorted(answers.items())
+    if _supports_upsert():
+        _upsert(
+            ResponseRollup,
+            ["survey_id", "day", "region"],
+            ["responses"],
+            [(s, _adapt_day(d), r, n) for (s, d, r), n in response_rows],
+        )
+        _upsert(
+            AnswerRollup,
+            ["survey_id", "day", "question_id", "rating", "choice", "region"],
+            ["answers", "rating_sum"],
+            [(s, _adapt_day(d), q, rt, c, r, n, total) for (s, d, q, rt, c, r), (n, total) in answer_rows],
+        )
+        return
+
+    with transaction.atomic():
+        for (survey_id, day, region), n in response_rows:
+            obj, _ = ResponseRollup.objects.select_for_update().get_or_create(survey_id=survey_id, day=day, region=region)
+            ResponseRollup.objects.filter(pk=obj.pk).update(responses=F("responses") + n)
+        for (survey_id, day, qid, rating, choice, region), (n, total) in answer_rows:
+            obj, _ = AnswerRollup.objects.select_for_update().get_or_create(
+                survey_id=survey_id, day=day, question_id=qid, rating=rating, choice=choice, region=region
+            )
+            AnswerRollup.objects.filter(pk=obj.pk).update(answers=F("answers") + n, rating_sum=F("rating_sum") + total)
+
+
+def rebuild_rollups(survey_id: int) -> tuple[int, int]:
+    """Recompute a survey's rollups from raw answers. Returns (response rows, answer rows)."""
+    tz = analytics_timezone()
+    with transaction.atomic():
+        ResponseRollup.objects.filter(survey_id=survey_id).delete()
+        AnswerRollup.objects.filter(survey_id=survey_id).delete()
+
+        responses = {}
+        rows = (
+            Response.objects.filter(survey_id=survey_id)
+            .annotate(day=TruncDate("submitted_at", tzinfo=tz))
+            .values_list("day", "region")
+            .annotate(n=Count("id"))
+        )
+        for day, region, n in rows:
+            responses[(day, region)] = n
+
+        answers = {}
+        base = Answer.objects.filter(response__survey_id=survey_id).annotate(day=TruncDate("response__submitted_at", tzinfo=tz))
+        rating_rows = (
+            base.filter(rating__isnull=False)
+            .values_list("day", "question_id", "rating", "response__region")
+            .annotate(n=Count("id"), total=Sum("rating"))
+        )
+        for day, qid, rating, region, n, total in rating_rows:
+            key = (day, qid, int(rating), "", region)
+            prev_n, prev_total = answers.get(key, (0, 0))
+            answers[key] = (prev_n + n, prev_total + int(total or 0))
+        choice_rows = (
+            base.exclude(choice="")
+            .values_list("day", "question_id", "choice", "response__region")
+            .annotate(n=Count("id"))
+        )
+        for day, qid, value, region, n in choice_rows:
+            if not value.strip():
+                continue
+            key = (day, qid, 0, value, region)
+            prev_n, prev_total = answers.get(key, (0, 0))
+            answers[key] = (prev_n + n, prev_total)
+
+        ResponseRollup.objects.bulk_create(
+            [ResponseRollup(survey_id=survey_id, day=d, region=r, responses=n) for (d, r), n in responses.items()],
+            batch_size=1000,
+        )
+        AnswerRollup.objects.bulk_create(
+            [
+                AnswerRollup(
+                    survey_id=survey_id, day=d, question_id=q, rating=rt, choice=c, region=r, answers=n, rating_sum=total
+                )
+                for (d, q, rt, c, r), (n, total) in answers.items()
+            ],
+            batch_size=1000,
+        )
+        Survey.objects.filter(pk=survey_id).update(rollups_built_at=timezone.now())
+    return len(responses), len(answers)
+
+
+def rollup_region_filter(region):
+    """Region key to filter rollups by, "" for no filter, or None if rollups cannot answer it."""
+    if not region:
+        return ""
+    return response_region_filter(region).get("region")
+
+
+def aggregate_rollups(survey_id, day_from, day_to, region, rating_question_ids, choice_question_ids=(), roles=None):
+    """Rollup equivalent of ``responses.count()`` plus ``aggregate_answers``; returns (total, aggregates).
+
+    ``roles`` maps choice question ids to their demographic role; rollups keep choices
+    only, so their codes are re-derived the way ingest assigns them.
+    """
+    filters = {"survey_id": survey_id}
+    if day_from:
+        filters["day__gte"] = day_from
+    if day_to:
+        filters["day__lte"] = day_to
+    if region:
+        filters["region"] = region
+
+    total = ResponseRollup.objects.filter(**filters).aggregate(n=Sum("responses"))["n"] or 0
+
+    rating_counts = {}
+    rating_sums = {}
+    if rating_question_ids:
+        rows = (
+            AnswerRollup.objects.filter(question_id__in=list(rating_question_ids), choice="", **filters)
+            .exclude(rating=0)
+            .values_list("question_id", "rating")
+            .annotate(n=Sum("answers"), s=Sum("rating_sum"))
+        )
+        for qid, rating, n, s in rows:
+            prev_n, prev_s = rating_sums.get(qid, (0, 0))
+            rating_sums[qid] = (prev_n + int(n), prev_s + int(s))
+            if rating in RATING_VALUES:
+                rating_counts.setdefault(qid, empty_rating_counts())[rating] += int(n)
+
+    choice_counts = {}
+    code_counts = {}
+    choice_question_ids = [q for q in choice_question_ids if q is not None]
+    if choice_question_ids:
+        rows = (
+            AnswerRollup.objects.filter(question_id__in=choice_question_ids, rating=0, **filters)
+            .values_list("question_id", "choice")
+            .annotate(n=Sum("answers"))
+        )
+        for qid, choice, n in rows:
+            bucket = choice_counts.setdefault(qid, {})
+            bucket[choice] = bucket.get(choice, 0) + int(n)
+            code = demographic_code((roles or {}).get(qid), choice)
+            if code:
+                bucket = code_counts.setdefault(qid, {})
+                bucket[code] = bucket.get(code, 0) + int(n)
+
+    return int(total), AnswerAggregates(
+        rating_counts=rating_counts, rating_sums=rating_sums, choice_counts=choice_counts, code_counts=code_counts
+    )
@@ -0,0 +1,189 @@
+"""Full-text search of answer comments.
+
+The database keeps the index itself, maintained on every insert, update and delete of an
+answer (migration 0028), so ingest needs no extra work:
+
+- PostgreSQL: a generated ``tsvector`` column ``surveys_answer.comment_search`` with a
+  GIN index;
+- SQLite: an FTS5 table ``surveys_answer_fts`` over ``surveys_answer.comment``, kept in
+  step by triggers.
+
+Both behave the same, so local development on SQLite matches production:
+
+- Words must all appear, in any order; a "quoted phrase" must appear in sequence.
+- Matching ignores case and does not stem. Postgres uses the ``simple`` configuration
+  and SQLite the ``unicode61`` tokenizer, so Amharic is matched word for word like English.
+- Results are ranked (``ts_rank_cd`` / ``bm25``), and matches are highlighted with
+  ``<mark>``.
+
+Ranking, ordering and pagination happen in the database: a response's rank is that of
+its best matching answer, and only the answers of the page are read back to highlight.
+
+Other databases fall back to ``icontains`` without ranking.
+"""
+import html
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Answer, Response
+
+FTS_TABLE = "surveys_answer_fts"
+SEARCH_COLUMN = "comment_search"
+MAX_PHRASES = 10
+
+_PHRASES = re.compile(r'"([^"]*)"|(\S+)')
+# Highlight delimiters, swapped for <mark> once the comment is HTML-escaped.
+_START, _STOP = "\ue000", "\ue001"
+
+_sqlite_fts = None
+
+
+def parse_query(text) -> list:
+    """Phrases of a search query: "quoted phrases" as given, other words one by one."""
+    phrases = []
+    for quoted, word in _PHRASES.findall(str(text or "")):
+        phrase = " ".join((quoted or word).split())
+        # Punctuation alone is not indexed.
+        if re.search(r"\w", phrase) and phrase not in phrases:
+            phrases.append(phrase)
+    return phrases[:MAX_PHRASES]
+
+
+def _backend() -> str:
+    global _sqlite_fts
+    if connection.vendor == "postgresql":
+        return "postgresql"
+    if connection.vendor == "sqlite":
+        if _sqlite_fts is None:
+            # The FTS5 table is skipped by the migration where SQLite lacks FTS5.
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+                _sqlite_fts = cursor.fetchone() is not None
+        return "sqlite" if _sqlite_fts else ""
+    return ""
+
+
+def _fts5_match(phrases) -> str:
+    return " AND ".join('"' + phrase.replace('"', '""') + '"' for phrase in phrases)
+
+
+def _match(phrases, survey_id=None):
+    """``(FROM, WHERE, rank expression, params)`` over answers ``a`` matching every phrase.
+
+    ``params`` go with the FROM clause first, then the WHERE clause.
+    """
+    answers = connection.ops.quote_name(Answer._meta.db_table)
+    join = ""
+    where_params = []
+    if survey_id is not None:
+        join = f" JOIN {connection.ops.quote_name(Response._meta.db_table)} r ON r.id = a.response_id AND r.survey_id = %s"
+        where_params = [survey_id]
+    if _backend() == "postgresql":
+        tsquery = " && ".join(["phraseto_tsquery('simple', %s)"] * len(phrases))
+        return (
+            f"{answers} a{join}, (SELECT {tsquery} AS query) q",
+            f"a.{SEARCH_COLUMN} @@ q.query",
+            f"ts_rank_cd(a.{SEARCH_COLUMN}, q.query)",
+            where_params + list(phrases),
+        )
+    # bm25() is lower for better matches.
+    return (
+        f"{FTS_TABLE} JOIN {answers} a ON a.id = {FTS_TABLE}.rowid{join}",
+        f"{FTS_TABLE} MATCH %s",
+        f"-bm25({FTS_TABLE})",
+        where_params + [_fts5_match(phrases)],
+    )
+
+
+def search_responses(responses_qs, phrases, survey_id=None, question_id=None):
+    """``responses_qs`` narrowed to responses with a comment matching every phrase, best first.
+
+    Each response is annotated with ``search_rank`` (its best answer's rank; higher is
+    better, 0 without a full-text index) and ordered by it, then newest first, so the
+    caller can slice a page straight from the database. ``question_id`` limits the search
+    to one question's answers.
+    """
+    if not _backend():
+        answers = Answer.objects.all()
+        if survey_id is not None:
+            answers = answers.filter(response__survey_id=survey_id)
+        if question_id is not None:
+            answers = answers.filter(question_id=question_id)
+        for phrase in phrases:
+            answers = answers.filter(comment__icontains=phrase)
+        return (
+            responses_qs.filter(id__in=answers.values("response_id"))
+            .annotate(search_rank=Value(0.0, output_field=FloatField()))
+            .order_by("-submitted_at", "-id")
+        )
+
+    question = ""
+    question_params = []
+    if question_id is not None:
+        question = " AND a.question_id = %s"
+        question_params = [question_id]
+    from_sql, where, rank, params = _match(phrases, survey_id)
+    matched = RawSQL(f"SELECT a.response_id FROM {from_sql} WHERE {where}{question}", params + question_params)
+    # Correlated with the listed response; only evaluated for matching ones.
+    from_sql, where, rank, params = _match(phrases)
+    outer = connection.ops.quote_name(Response._meta.db_table)
+    if _backend() == "sqlite":
+        # bm25() is only available on rows read straight from the full-text query, not
+        # inside an aggregate; LIMIT -1 keeps SQLite from flattening the subquery.
+        best_sql = (
+            f"SELECT MAX(h.rank) FROM (SELECT a.response_id, {rank} AS rank FROM {from_sql} "
+            f"WHERE {where}{question} LIMIT -1) h WHERE h.response_id = {outer}.id"
+        )
+    else:
+        best_sql = f"SELECT MAX({rank}) FROM {from_sql} WHERE {where}{question} AND a.response_id = {outer}.id"
+    best = RawSQL(best_sql, params + question_params, output_field=FloatField())
+    return (
+        responses_qs.filter(id__in=matched)
+        .annotate(search_rank=best)
+        .order_by("-search_rank", "-submitted_at", "-id")
+    )
+
+
+def highlight(response_ids, phrases, question_id=None) -> dict:
+    """answer id -> comment as HTML, escaped, with the matched words in ``<mark>``.
+
+    Covers the matching answers of ``response_ids`` (a page of search results).
+    """
+    response_ids = list(response_ids)
+    if not response_ids:
+        return {}
+    backend = _backend()
+    if not backend:
+        pattern = re.compile("|".join(re.escape(p) for p in phrases), re.IGNORECASE)
+        answers = Answer.objects.filter(response_id__in=response_ids)
+        if question_id is not None:
+            answers = answers.filter(question_id=question_id)
+        for phrase in phrases:
+            answers = answers.filter(comment__icontains=phrase)
+        return {
+            answer_id: _marked(pattern.sub(lambda m: f"{_START}{m.group(0)}{_STOP}", comment))
+            for answer_id, comment in answers.values_list("id", "comment")
+        }
+
+    from_sql, where, _rank, params = _match(phrases)
+    if backend == "postgresql":
+        marked = "ts_headline('simple', a.comment, q.query, %s)"
+        select_params = [f"StartSel={_START}, StopSel={_STOP}, HighlightAll=true"]
+    else:
+        marked = f"highlight({FTS_TABLE}, 0, %s, %s)"
+        select_params = [_START, _STOP]
+    where += f" AND a.response_id IN ({', '.join(['%s'] * len(response_ids))})"
+    params = select_params + params + response_ids
+    if question_id is not None:
+        where += " AND a.question_id = %s"
+        params.append(question_id)
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT a.id, {marked} FROM {from_sql} WHERE {where}", params)
+        return {answer_id: _marked(text or "") for answer_id, text in cursor.fetchall()}
+
+
+def _marked(text) -> str:
+    return html.escape(text).replace(_START, "<mark>").replace(_STOP, "</mark>")
@@ -1,12 +1,21 @@
 from rest_framework import serializers
 from django.utils import timezone
-from .models import Survey, Section, Question, Response, Answer
+from drf_spectacular.utils import extend_schema_field
+from .models import Survey, Section, Question
+from .cache import invalidate_survey
+from .tree import get_survey_tree, load_survey_trees
+from .validation import get_validation_plan
+from .demographics import recode_answers, suggest_role
+from .ingest import write_submissions
+from .portfolio import deactivate_surveys, summarize_on_commit
+from .idempotency import SUBMISSION_ID_RE
 
 
 class QuestionSerializer(serializers.ModelSerializer):
     maxChars = serializers.IntegerField(source="max_chars", required=False, allow_null=True)
     labels = serializers.JSONField(source="linear_scale_labels", required=False, allow_null=True)
     displayStyle = serializers.CharField(source="rating_display_style", required=False, allow_blank=True)
+    demographicRole = serializers.CharField(source="demographic_role", required=False, allow_blank=True)
 
     class Meta:
         model = Question
@@ -22,15 +31,52 @@ class QuestionSerializer(serializers.ModelSerializer):
             "labels",
             "displayStyle",
             "maxChars",
+            "demographicRole",
         ]
 
 
+def _sections_data(tree):
+    # Backwards compatible: if no sections exist yet, return a single default section.
+    if not tree.sections:
+        return [
+            {
+                "id": None,
+                "title": "Untitled Section",
+                "description": "",
+                "order": 0,
+                "questions": QuestionSerializer(tree.questions, many=True).data,
+            }
+        ]
+
+    out = []
+    for s, questions in tree.sections:
+        out.append(
+            {
+                "id": s.id,
+                "title": s.title,
+                "description": s.description,
+                "order": s.order,
+                "questions": QuestionSerializer(questions, many=True).data,
+            }
+        )
+    return out
+
+
+class SurveyTreeListSerializer(serializers.ListSerializer):
+    """Load the section/question trees of every listed survey up front (two queries in total)."""
+
+    def to_representation(self, data):
+        iterable = data.all() if hasattr(data, "all") else data
+        return super().to_representation(load_survey_trees(iterable))
+
+
 class SurveySerializer(serializers.ModelSerializer):
-    questions = QuestionSerializer(many=True, read_only=True)
+    questions = serializers.SerializerMethodField()
     sections = serializers.SerializerMethodField()
 
     class Meta:
         model = Survey
+        list_serializer_class = SurveyTreeListSerializer
         fields = [
             "id",
             "title",
@@ -46,34 +92,12 @@ class SurveySerializer(serializers.ModelSerializer):
             "questions",
         ]
 
-    def get_sections(self, obj):
-        # Backwards compatible: if no sections exist yet, return a single default section.
-        sections = list(getattr(obj, "sections", []).all()) if hasattr(obj, "sections") else []
-        if not sections:
-            qs = list(obj.questions.all().order_by("order", "id"))
-            return [
-                {
-                    "id": None,
-                    "title": "Untitled Section",
-                    "description": "",
-                    "order": 0,
-                    "questions": QuestionSerializer(qs, many=True).data,
-                }
-            ]
+    @extend_schema_field(QuestionSerializer(many=True))
+    def get_questions(self, obj):
+        return QuestionSerializer(get_survey_tree(obj).questions, many=True).data
 
-        out = []
-        for s in sections:
-            qset = s.questions.all().order_by("order", "id")
-            out.append(
-                {
-                    "id": s.id,
-                    "title": s.title,
-                    "description": s.description,
-                    "order": s.order,
-                    "questions": QuestionSerializer(qset, many=True).data,
-                }
-            )
-        return out
+    def get_sections(self, obj):
+        return _sections_data(get_survey_tree(obj))
 
 
 class AnswerCreateSerializer(serializers.Serializer):
@@ -86,28 +110,29 @@ class AnswerCreateSerializer(serializers.Serializer):
 class SubmitSurveySerializer(serializers.Serializer):
     survey = serializers.IntegerField()
     answers = AnswerCreateSerializer(many=True)
+    # Optional idempotency key (may also be sent as an Idempotency-Key header).
+    submission_id = serializers.RegexField(SUBMISSION_ID_RE, required=False, allow_null=True, allow_blank=True)
 
     def validate(self, data):
         survey_id = data["survey"]
-        try:
-            survey = Survey.objects.get(id=survey_id)
-        except Survey.DoesNotExist:
+        # Rules are compiled once per survey version; see surveys/validation.py.
+        plan = get_validation_plan(survey_id)
+        if plan is None:
             raise serializers.ValidationError("Survey not found")
         # Ensure all questions belong to this survey
         qids = {a["question"] for a in data["answers"]}
-        qs = Question.objects.filter(survey_id=survey_id, id__in=qids)
-        valid_ids = set(qs.values_list("id", flat=True))
-        if qids - valid_ids:
+        if qids - plan.rules.keys():
             raise serializers.ValidationError("One or more questions do not belong to the specified survey")
-
-        q_by_id = {q.id: q for q in qs}
+        # A response holds one answer per question (unique on Answer).
+        if len(qids) != len(data["answers"]):
+            raise serializers.ValidationError("Each question may be answered only once")
 
         # Validate per question type and required flag
         for a in data["answers"]:
-            qobj = q_by_id.get(a["question"])
-            if not qobj:
+            rule = plan.rules.get(a["question"])
+            if not rule:
                 continue
-            qtype = qobj.question_type
+            qtype = rule.question_type
             rating = a.get("rating")
             comment = a.get("comment")
             choice = a.get("choice")
@@ -118,7 +143,10 @@ class SubmitSurveySerializer(serializers.Serializer):
             comment_str = (comment or "").strip()
             choice_str = (choice or "").strip()
 
-            if qobj.required:
+            if choice_str and rule.choices is not None and choice_str not in rule.choices:
+                raise serializers.ValidationError("The selected option is not valid for this question")
+
+            if rule.required:
                 if qtype in ["rating", "linear_scale"]:
                     if rating is None:
                         raise serializers.ValidationError("A rating is required for required scale questions")
@@ -128,34 +156,53 @@ class SubmitSurveySerializer(serializers.Serializer):
                 else:  # text / paragraph
                     if not comment_str:
                         raise serializers.ValidationError("An answer is required for required text questions")
-        data["_survey_obj"] = survey
         return data
 
+    def to_record(self, employee_identifier=None, admin_bypass=False, submission_id=None):
+        """Plain-JSON form of the validated submission, as stored by surveys/ingest.py."""
+        data = self.validated_data
+        return {
+            "survey": data["survey"],
+            "submission_id": submission_id or data.get("submission_id") or None,
+            # For admin-bypass submissions we intentionally do NOT persist employee_identifier,
+            # so admins can submit multiple times without hitting the (survey, employee_identifier)
+            # unique constraint.
+            "employee_identifier": None if admin_bypass else employee_identifier,
+            "submitted_at": timezone.now().isoformat(),
+            "answers": [
+                {
+                    "question": a["question"],
+                    "rating": a.get("rating"),
+                    "comment": a.get("comment") or "",
+                    "choice": (a.get("choice") or ""),
+                }
+                for a in data["answers"]
+            ],
+        }
+
     def create(self, validated_data):
-        survey = validated_data["_survey_obj"]
         employee_identifier = validated_data.pop("employee_identifier", None)
         admin_bypass = bool(validated_data.pop("_admin_bypass", False))
-
-        # For admin-bypass submissions we intentionally do NOT persist employee_identifier,
-        # so admins can submit multiple times without hitting the (survey, employee_identifier)
-        # unique constraint.
-        resp = Response.objects.create(
-            survey=survey,
-            employee_identifier=None if admin_bypass else employee_identifier,
+        record = self.to_record(
+            employee_identifier=employee_identifier,
+            admin_bypass=admin_bypass,
+            submission_id=validated_data.pop("_submission_id", None),
         )
-        bulk = []
-        for a in validated_data["answers"]:
-            bulk.append(
-                Answer(
-                    response=resp,
-                    question_id=a["question"],
-                    rating=a.get("rating"),
-                    comment=a.get("comment") or "",
-                    choice=(a.get("choice") or ""),
-                )
-            )
-        Answer.objects.bulk_create(bulk)
-        return resp
+        return write_submissions([record])[0]
+
+
+class SubmitSurveyBatchItemSerializer(SubmitSurveySerializer):
+    """One response inside a batch upload; may carry the time it was collected offline."""
+
+    submitted_at = serializers.DateTimeField(required=False, allow_null=True)
+
+    def to_record(self, employee_identifier=None, admin_bypass=False, submission_id=None):
+        record = super().to_record(employee_identifier, admin_bypass, submission_id)
+        submitted_at = self.validated_data.get("submitted_at")
+        if submitted_at is not None:
+            # Never trust a device clock that runs ahead of the server.
+            record["submitted_at"] = min(submitted_at, timezone.now()).isoformat()
+        return record
 
 
 # Admin serializers
@@ -173,6 +220,10 @@ class QuestionCreateSerializer(serializers.Serializer):
     labels = serializers.JSONField(required=False, allow_null=True)
     displayStyle = serializers.ChoiceField(choices=["stars", "emojis", "numbers"], required=False)
     maxChars = serializers.IntegerField(required=False, allow_null=True)
+    # Omitted: suggested from the text for new questions, unchanged for existing ones.
+    demographicRole = serializers.ChoiceField(
+        choices=[role for role, _ in Question.DEMOGRAPHIC_ROLE_CHOICES], required=False, allow_blank=True
+    )
 
 
 class SectionCreateSerializer(serializers.Serializer):
@@ -183,6 +234,12 @@ class SectionCreateSerializer(serializers.Serializer):
     questions = QuestionCreateSerializer(many=True, required=False)
 
 
+def _role_for_new(q) -> str:
+    if "demographicRole" in q:
+        return q["demographicRole"]
+    return suggest_role(q.get("text"), q.get("question_type"))
+
+
 class SurveyCreateUpdateSerializer(serializers.ModelSerializer):
     questions = QuestionCreateSerializer(many=True, required=False)
     sections = SectionCreateSerializer(many=True, required=False)
@@ -208,7 +265,7 @@ class SurveyCreateUpdateSerializer(serializers.ModelSerializer):
         questions = validated_data.pop("questions", [])
         # If creating with is_active=True, deactivate others
         if validated_data.get("is_active"):
-            Survey.objects.filter(is_active=True).update(is_active=False)
+            deactivate_surveys()
         # Default budget_year to current year if not provided
         if validated_data.get("budget_year") is None:
             validated_data["budget_year"] = timezone.now().year
@@ -260,16 +317,20 @@ class SurveyCreateUpdateSerializer(serializers.ModelSerializer):
                         linear_scale_labels=labels,
                         rating_display_style=rating_display_style,
                         max_chars=max_chars,
+                        demographic_role=_role_for_new(q),
                     )
                 )
             if bulk_q:
                 Question.objects.bulk_create(bulk_q)
+        if survey.is_active:
+            invalidate_survey()
         return survey
 
     def update(self, instance, validated_data):
         # Handle is_active toggle (ensure single active)
         if validated_data.get("is_active") and not instance.is_active:
-            Survey.objects.filter(is_active=True).update(is_active=False)
+            deactivate_surveys()
+        closing = validated_data.get("is_active") is False and instance.is_active
 
         sections_payload = validated_data.pop("sections", None)
         questions_payload = validated_data.pop("questions", None)
@@ -392,6 +453,12 @@ class SurveyCreateUpdateSerializer(serializers.ModelSerializer):
                                 qobj.max_chars = max_chars
                                 changed_fields.append("max_chars")
 
+                            role = qd.get("demographicRole", qobj.demographic_role)
+                            if qobj.demographic_role != role:
+                                qobj.demographic_role = role
+                                changed_fields.append("demographic_role")
+                                recode_answers(qobj.id, role)
+
                             if changed_fields:
                                 qobj.save(update_fields=changed_fields)
                             payload_q_ids.add(q_id)
@@ -409,6 +476,7 @@ class SurveyCreateUpdateSerializer(serializers.ModelSerializer):
                                 linear_scale_labels=labels,
                                 rating_display_style=(display_style or "stars") if qtype == "rating" else "",
                                 max_chars=max_chars,
+                                demographic_role=_role_for_new(qd),
                             )
                             payload_q_ids.add(qnew.id)
 
@@ -422,31 +490,17 @@ class SurveyCreateUpdateSerializer(serializers.ModelSerializer):
                 if to_delete_sections:
                     Section.objects.filter(id__in=to_delete_sections, survey=instance).delete()
 
+        invalidate_survey(instance.id)
+        instance.refresh_from_db(fields=["version"])
+        if closing:
+            # Snapshot the closed survey's portfolio metrics (surveys/portfolio.py).
+            summarize_on_commit([instance.id])
         return instance
 
 
-class SurveyDetailSerializer(serializers.ModelSerializer):
-    questions = QuestionSerializer(many=True, read_only=True)
-    sections = serializers.SerializerMethodField()
-
-    class Meta:
-        model = Survey
-        fields = [
-            "id",
-            "title",
-            "description",
-            "header_title",
-            "header_subtitle",
-            "language",
-            "budget_year",
-            "is_active",
-            "created_at",
-            "sections",
-            "questions",
-        ]
-
-    def get_sections(self, obj):
-        return SurveySerializer(obj, context=self.context).data.get("sections")
+class SurveyDetailSerializer(SurveySerializer):
+    class Meta(SurveySerializer.Meta):
+        pass
 
 
 class ResponseSummarySerializer(serializers.Serializer):
@@ -0,0 +1,213 @@
+"""Precomputed admin dashboard snapshots.
+
+Without them, the first admin to open the dashboard after a quiet period pays for
+computing every block. ``refresh_snapshots`` computes the dashboard of a survey for the
+common filter sets (``snapshot_filters``: no filter, each top-level region, the last 7
+and the last 30 days) and stores each as a ``DashboardSnapshot`` row. All workers can
+serve these rows at once, and they survive restarts.
+
+The dashboard falls back to a snapshot for blocks that are not in the cache. A snapshot
+is served as is while the data has not changed. After new submissions it is still served
+for up to ``SURVEY_DASHBOARD_SNAPSHOT_MAX_AGE`` seconds. Responses carry ``computed_at``,
+and ``?refresh=1`` recomputes on demand.
+
+Snapshots are refreshed in two ways:
+- by ``manage.py precompute_dashboard`` (once, e.g. from cron, or ``--watch``);
+- by an in-process scheduler (``SURVEY_DASHBOARD_SNAPSHOT_SCHEDULER``).
+
+Either refreshes the active survey's snapshots once the data has changed and either
+``SURVEY_DASHBOARD_SNAPSHOT_INTERVAL`` seconds have passed or
+``SURVEY_DASHBOARD_SNAPSHOT_SUBMISSIONS`` new responses have arrived.
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .cache import get_data_generation, split_generation
+from .models import DashboardSnapshot, Survey
+from .regions import get_region_index
+from .timeseries import local_date
+
+logger = logging.getLogger(__name__)
+
+# Day ranges precomputed besides the unfiltered and per-region dashboards.
+SNAPSHOT_DAYS = (7, 30)
+
+
+def _interval() -> float:
+    return float(getattr(settings, "SURVEY_DASHBOARD_SNAPSHOT_INTERVAL", 5 * 60))
+
+
+def _submissions() -> int:
+    return int(getattr(settings, "SURVEY_DASHBOARD_SNAPSHOT_SUBMISSIONS", 200))
+
+
+def _max_age() -> float:
+    return float(getattr(settings, "SURVEY_DASHBOARD_SNAPSHOT_MAX_AGE", 15 * 60))
+
+
+def _poll_interval() -> float:
+    return float(getattr(settings, "SURVEY_DASHBOARD_SNAPSHOT_POLL", 15))
+
+
+def local_today():
+    return local_date(timezone.now())
+
+
+def snapshot_filters(today) -> list:
+    """``(region, day_from, day_to)`` filter sets precomputed on ``today`` (a local date)."""
+    filters = [(None, None, None)]
+    filters += [(region.key, None, None) for region in get_region_index().regions]
+    filters += [(None, today - timedelta(days=days - 1), today) for days in SNAPSHOT_DAYS]
+    return filters
+
+
+def get_snapshot(survey_id: int, filter_key: str, generation: str) -> dict | None:
+    """Cache-style entries (``{name: entry}``) of the stored snapshot, if it may be served.
+
+    A snapshot of the current data generation is always served. An older one is served
+    only if it is younger than ``SURVEY_DASHBOARD_SNAPSHOT_MAX_AGE`` and the survey
+    itself has not been edited since.
+    """
+    snapshot = DashboardSnapshot.objects.filter(survey_id=survey_id, filter_key=filter_key).first()
+    if snapshot is None:
+        return None
+    computed_at = snapshot.computed_at.timestamp()
+    if snapshot.generation != generation and (
+        split_generation(snapshot.generation)[0] != split_generation(generation)[0]
+        or time.time() - computed_at >= _max_age()
+    ):
+        return None
+    return {
+        name: {
+            "generation": snapshot.generation,
+            "computed_at": computed_at,
+            "last_modified": snapshot.last_submitted_at,
+            "body": body,
+        }
+        for name, body in snapshot.body.items()
+    }
+
+
+def _snapshot_fields(entries) -> dict:
+    first = next(iter(entries.values()))
+    return {
+        "generation": first["generation"],
+        "responses": split_generation(first["generation"])[1],
+        "body": {name: entry["body"] for name, entry in entries.items()},
+        "last_submitted_at": first["last_modified"],
+        "computed_at": datetime.fromtimestamp(min(e["computed_at"] for e in entries.values()), tz=dt_timezone.utc),
+    }
+
+
+def store_snapshot(survey_id: int, filter_key: str, entries) -> None:
+    """Store dashboard cache entries (all blocks, of one generation) as the filter set's snapshot."""
+    with transaction.atomic():
+        DashboardSnapshot.objects.filter(survey_id=survey_id, filter_key=filter_key).delete()
+        # A concurrent refresh of the same filter set wins; both computed the same blocks.
+        DashboardSnapshot.objects.bulk_create([
+            DashboardSnapshot(survey_id=survey_id, filter_key=filter_key, **_snapshot_fields(entries))
+        ], ignore_conflicts=True)
+
+
+def update_snapshot(survey_id: int, filter_key: str, entries) -> None:
+    """Replace the filter set's snapshot, if it has one, with blocks just recomputed."""
+    DashboardSnapshot.objects.filter(survey_id=survey_id, filter_key=filter_key).update(**_snapshot_fields(entries))
+
+
+def refresh_snapshots(survey) -> int:
+    """Recompute and store the survey's snapshots; returns how many were stored."""
+    # accounts.views builds the dashboard and imports this module.
+    from accounts.views import refresh_dashboard_snapshot
+
+    keys = [
+        refresh_dashboard_snapshot(survey, region, day_from, day_to)
+        for region, day_from, day_to in snapshot_filters(local_today())
+    ]
+    # Snapshots of earlier days, or of regions no longer listed.
+    DashboardSnapshot.objects.filter(survey=survey).exclude(filter_key__in=keys).delete()
+    return len(keys)
+
+
+def snapshot_due(survey) -> bool:
+    """Whether the survey's snapshots should be refreshed (see the module docstring)."""
+    oldest = (
+        DashboardSnapshot.objects.filter(survey=survey)
+        .order_by("computed_at")
+        .values_list("generation", "responses", "computed_at")
+        .first()
+    )
+    if oldest is None:
+        return True
+    stored_generation, stored_responses, computed_at = oldest
+    if local_date(computed_at) != local_today():
+        return True
+    generation, _last_submitted_at = get_data_generation(survey.id)
+    if stored_generation == generation:
+        return False
+    version, responses, _last_id, _history = split_generation(generation)
+    if version != split_generation(stored_generation)[0]:
+        return True
+    submissions = _submissions()
+    interval = _interval()
+    return bool(
+        (submissions and responses - stored_responses >= submissions)
+        or (interval and time.time() - computed_at.timestamp() >= interval)
+    )
+
+
+def refresh_due(survey=None) -> int:
+    """Refresh the snapshots of ``survey`` (default: the active one) if they are due.
+
+    Returns how many were stored. With a shared cache, only one worker refreshes a
+    survey at a time.
+    """
+    if survey is None:
+        survey = Survey.objects.filter(is_active=True).order_by("-created_at").first()
+    if survey is None or not snapshot_due(survey):
+        return 0
+    lock_key = f"dashboard:snapshots:lock:{survey.id}"
+    if not cache.add(lock_key, os.getpid(), timeout=max(60, int(_interval()))):
+        return 0
+    try:
+        return refresh_snapshots(survey)
+    finally:
+        cache.delete(lock_key)
+
+
+def run_scheduler() -> None:
+    """Refresh due snapshots every ``SURVEY_DASHBOARD_SNAPSHOT_POLL`` seconds, forever."""
+    while True:
+        try:
+            refresh_due()
+        except Exception:
+            logger.exception("Dashboard snapshot refresh failed")
+        finally:
+            close_old_connections()
+        time.sleep(_poll_interval())
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def start_scheduler() -> None:
+    """Start this process's scheduler thread if ``SURVEY_DASHBOARD_SNAPSHOT_SCHEDULER`` is on.
+
+    Called by the dashboard and submission views, so it runs in every worker that serves them.
+    """
+    global _scheduler
+    if _scheduler is not None or not getattr(settings, "SURVEY_DASHBOARD_SNAPSHOT_SCHEDULER", False):
+        return
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = threading.Thread(target=run_scheduler, name="dashboard-snapshots", daemon=True)
+            _scheduler.start()
@@ -0,0 +1,90 @@
+"""Summary statistics of 1..5 ratings, derived from count histograms.
+
+The dashboard already has ``{rating: count}`` histograms for every question, section
+and region (surveys/aggregates.py, surveys/rollups.py, the answer cube), so everything
+here is computed from those in a single pass over five buckets: no extra queries and
+no answer lists. Histograms add up, so the statistics of any union of groups are those
+of the summed histogram.
+"""
+import math
+
+from .aggregates import RATING_VALUES
+
+# Two-sided 95% Student t critical values for 1..30 degrees of freedom.
+_T95 = (
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+)
+_Z95 = 1.959964
+
+TOP_BOX = (4, 5)
+BOTTOM_BOX = (1, 2)
+
+
+def _t95(df) -> float:
+    if df <= len(_T95):
+        return _T95[df - 1]
+    # Cornish-Fisher correction to the normal quantile; within 0.005 of t above 30 df.
+    return _Z95 + (_Z95 ** 3 + _Z95) / (4.0 * df)
+
+
+def _percent(part, n) -> float:
+    return round(part * 100.0 / n, 1)
+
+
+def rating_statistics(counts) -> dict:
+    """Statistics of a ``{rating: count}`` histogram (keys 1..5, as ints or strings).
+
+    ``mean`` with a 95% confidence interval (Student t), sample standard deviation,
+    ``median``, ``top2_box`` / ``bottom2_box`` (% of 4-5 and 1-2 ratings) and
+    ``net_score`` (top-2 minus bottom-2, in percentage points). Values are None when
+    there are too few ratings.
+    """
+    hist = [(r, int(counts.get(r, counts.get(str(r), 0)) or 0)) for r in RATING_VALUES]
+    n = total = squares = top = bottom = 0
+    for r, c in hist:
+        n += c
+        total += r * c
+        squares += r * r * c
+        if r in TOP_BOX:
+            top += c
+        elif r in BOTTOM_BOX:
+            bottom += c
+    if not n:
+        return {
+            "n": 0, "mean": None, "ci95": None, "sd": None, "median": None,
+            "top2_box": None, "bottom2_box": None, "net_score": None,
+        }
+
+    mean = total / float(n)
+    sd = ci95 = None
+    if n > 1:
+        variance = max(0.0, (squares - n * mean * mean) / (n - 1))
+        sd = math.sqrt(variance)
+        half = _t95(n - 1) * sd / math.sqrt(n)
+        # Clamped to the rating scale, which small samples would overshoot.
+        ci95 = [round(max(RATING_VALUES[0], mean - half), 2), round(min(RATING_VALUES[-1], mean + half), 2)]
+
+    # Median: the middle rating (the mean of the two middle ones for an even count).
+    lower_rank, upper_rank = (n + 1) // 2, n // 2 + 1
+    lower = upper = None
+    seen = 0
+    for r, c in hist:
+        seen += c
+        if lower is None and seen >= lower_rank:
+            lower = r
+        if seen >= upper_rank:
+            upper = r
+            break
+
+    return {
+        "n": n,
+        "mean": round(mean, 2),
+        "ci95": ci95,
+        "sd": round(sd, 2) if sd is not None else None,
+        "median": (lower + upper) / 2.0,
+        "top2_box": _percent(top, n),
+        "bottom2_box": _percent(bottom, n),
+        "net_score": round((top - bottom) * 100.0 / n, 1),
+    }
@@ -0,0 +1,567 @@
+import gzip
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import date, datetime, timezone as dt_timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ParseError
+from rest_framework.test import APIClient
+
+from utils import analytics
+
+from . import cache as survey_cache
+from . import idempotency, validation
+from .models import Answer, Question, Response, ResponseRollup, Section, Survey
+from .parsers import CompressedJSONParser
+from .ingest import SubmissionSpool, write_submissions
+from .rollups import aggregate_rollups, rebuild_rollups
+
+
+def _reset_caches():
+    """Forget cached and per-process survey state; test databases reuse survey ids."""
+    cache.clear()
+    survey_cache._local_payloads.clear()
+    validation._plans.clear()
+    idempotency._recent.clear()
+    analytics._cubes.clear()
+
+
+def _make_surveys(surveys, sections, active=True):
+    """``surveys`` surveys of ``sections`` sections with two questions each; the first is active."""
+    created = []
+    for s in range(surveys):
+        survey = Survey.objects.create(title=f"Survey {s}", is_active=active and s == 0)
+        for n in range(sections):
+            section = Section.objects.create(survey=survey, title=f"Section {n}", order=n)
+            Question.objects.create(survey=survey, section=section, text=f"Rate {n}", question_type="rating", order=2 * n)
+            Question.objects.create(survey=survey, section=section, text=f"Why {n}", question_type="text", order=2 * n + 1)
+        created.append(survey)
+    return created
+
+
+class SurveyTreeQueryCountTests(TestCase):
+    """Survey trees load in a fixed number of queries, however many sections and surveys there are."""
+
+    SHAPES = [(1, 1), (1, 6), (5, 1), (5, 6)]  # (surveys, sections per survey)
+
+    def setUp(self):
+        user = get_user_model().objects.create_superuser("admin", "admin@example.com", "secret")
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def _assert_flat(self, expected, request, check):
+        for surveys, sections in self.SHAPES:
+            with self.subTest(surveys=surveys, sections=sections):
+                Survey.objects.all().delete()
+                created = _make_surveys(surveys, sections)
+                _reset_caches()
+                with self.assertNumQueries(expected):
+                    response = request(created)
+                self.assertEqual(response.status_code, 200)
+                check(response, created, sections)
+
+    def test_admin_survey_list(self):
+        # Surveys, sections, questions.
+        def check(response, created, sections):
+            self.assertEqual(len(response.json()), len(created))
+
+        self._assert_flat(3, lambda created: self.client.get("/api/admin/surveys/"), check)
+
+    def test_admin_survey_detail(self):
+        # Survey, sections, questions.
+        def check(response, created, sections):
+            self.assertEqual(len(response.json()["sections"]), sections)
+
+        self._assert_flat(3, lambda created: self.client.get(f"/api/admin/surveys/{created[-1].id}/"), check)
+
+    def test_active_survey_payload(self):
+        def check(response, created, sections):
+            self.assertEqual(response.json()["id"], created[0].id)
+            self.assertEqual(len(response.json()["sections"]), sections)
+
+        # Active survey ref, survey, sections, questions.
+        self._assert_flat(4, lambda created: self.client.get("/api/survey/active/"), check)
+
+
+@override_settings(SURVEY_BATCH_SUBMIT_MAX_BYTES=64)
+class CompressedJSONParserLimitTests(SimpleTestCase):
+    def _parse(self, body, encoding="", length=None):
+        meta = {"CONTENT_LENGTH": str(len(body) if length is None else length)}
+        if encoding:
+            meta["HTTP_CONTENT_ENCODING"] = encoding
+        context = {"request": SimpleNamespace(META=meta)}
+        return CompressedJSONParser().parse(io.BytesIO(body), parser_context=context)
+
+    def test_plain_body_within_limit(self):
+        self.assertEqual(self._parse(b'{"items": []}'), {"items": []})
+
+    def test_plain_body_over_limit(self):
+        body = json.dumps({"items": ["x" * 100]}).encode()
+        with self.assertRaisesMessage(ParseError, "too large"):
+            self._parse(body)
+        # Without a Content-Length (chunked), the read itself stops at the limit.
+        with self.assertRaisesMessage(ParseError, "too large"):
+            self._parse(body, length="")
+
+    def test_gzip_body_expanding_over_limit(self):
+        body = gzip.compress(json.dumps({"items": ["x" * 1000]}).encode())
+        self.assertLess(len(body), 64)
+        with self.assertRaisesMessage(ParseError, "too large"):
+            self._parse(body, "gzip")
+
+
+@override_settings(ANALYTICS_TIME_ZONE="Africa/Addis_Ababa")
+class LocalDayTests(TestCase):
+    """Date filters, rollups, the answer cube and the timeseries agree on a submission's day."""
+
+    def test_evening_submission_counts_on_the_local_day(self):
+        survey = Survey.objects.create(title="Survey", is_active=True)
+        # 22:30 UTC is 01:30 the next day in Addis Ababa.
+        Response.objects.create(survey=survey, submitted_at=datetime(2025, 3, 1, 22, 30, tzinfo=dt_timezone.utc))
+        rebuild_rollups(survey.id)
+        self.assertEqual(list(ResponseRollup.objects.values_list("day", flat=True)), [date(2025, 3, 2)])
+
+        client = APIClient()
+        client.force_authenticate(get_user_model().objects.create_superuser("admin", "admin@example.com", "secret"))
+        for cube in (False, True):
+            for day, expected in ((date(2025, 3, 1), 0), (date(2025, 3, 2), 1)):
+                with self.subTest(cube=cube, day=day), override_settings(SURVEY_ANSWER_CUBE=cube):
+                    _reset_caches()
+                    body = client.get(
+                        f"/api/admin/dashboard/?survey={survey.id}&from={day}&to={day}&fields=totals,timeseries"
+                    ).json()
+                    self.assertEqual(body["totals"]["responses"], expected)
+                    self.assertEqual(sum(bucket["count"] for bucket in body["timeseries"]), expected)
+                    listed = client.get(f"/api/admin/responses/?survey={survey.id}&from={day}&to={day}").json()
+                    self.assertEqual(listed["count"], expected)
+
+
+@override_settings(SURVEY_ANSWER_CUBE=True, SURVEY_ANSWER_CUBE_MAX_ANSWERS=2)
+class AnswerCubeLimitTests(TestCase):
+    def setUp(self):
+        _reset_caches()
+        self.survey = _make_surveys(1, 1)[0]
+        self.questions = list(self.survey.questions.all())
+
+    def _respond(self):
+        response = Response.objects.create(survey=self.survey)
+        for question in self.questions:
+            Answer.objects.create(response=response, question=question, rating=4, comment="ok")
+        # New data generation, as a committed submission would start.
+        cache.delete(survey_cache._generation_key(self.survey.id))
+
+    def test_small_survey_loads_without_counting_answers(self):
+        self._respond()
+        with CaptureQueriesContext(connection) as queries:
+            cube = analytics.get_answer_cube(self.survey.id)
+        self.assertEqual(len(cube.response_id), 1)
+        self.assertFalse(any("COUNT" in q["sql"] and "surveys_answer" in q["sql"] for q in queries.captured_queries))
+
+    def test_oversized_survey_is_counted_once(self):
+        self._respond()
+        self._respond()
+        self.assertIsNone(analytics.get_answer_cube(self.survey.id))
+        self._respond()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertIsNone(analytics.get_answer_cube(self.survey.id))
+        self.assertFalse(any("surveys_answer" in q["sql"] for q in queries.captured_queries))
+
+
+class CommentIndexTests(TestCase):
+    def setUp(self):
+        _reset_caches()
+        self.survey = _make_surveys(1, 1)[0]
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_superuser("admin", "admin@example.com", "secret"))
+
+    def test_unindexed_survey_is_built_once_in_the_background(self):
+        Survey.objects.filter(pk=self.survey.pk).update(comments_indexed_at=None)
+        url = f"/api/admin/dashboard/comments/terms/?survey={self.survey.id}"
+        with mock.patch("surveys.keywords.threading.Thread") as thread:
+            first = self.client.get(url)
+            second = self.client.get(url)
+        self.assertEqual((first.status_code, second.status_code), (503, 503))
+        self.assertEqual(first["Retry-After"], "30")
+        thread.return_value.start.assert_called_once_with()
+
+    def test_invalid_date_is_rejected(self):
+        for value in ("2024-13-01", "soon"):
+            with self.subTest(value=value):
+                response = self.client.get(f"/api/admin/dashboard/comments/terms/?survey={self.survey.id}&from={value}")
+                self.assertEqual(response.status_code, 400)
+
+
+class CommentSearchTests(TestCase):
+    def setUp(self):
+        _reset_caches()
+        self.survey = _make_surveys(1, 1)[0]
+        self.question = self.survey.questions.get(question_type="text")
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_superuser("admin", "admin@example.com", "secret"))
+
+    def _respond(self, comment):
+        response = Response.objects.create(survey=self.survey)
+        Answer.objects.create(response=response, question=self.question, comment=comment)
+        return response
+
+    def _search(self, q, **params):
+        return self.client.get("/api/admin/responses/", {"q": q, **params}).json()
+
+    def test_best_match_first_across_pages(self):
+        weak = self._respond("the salary is late, the office is far and the canteen is small")
+        strong = self._respond("salary salary salary")
+        # Enough other comments for the term to weigh in bm25.
+        for _ in range(4):
+            self._respond("nothing to add")
+        pages = [self._search("salary", page_size=1, page=page) for page in (1, 2)]
+        self.assertEqual([p["count"] for p in pages], [2, 2])
+        self.assertEqual([p["results"][0]["id"] for p in pages], [strong.id, weak.id])
+        self.assertGreater(pages[0]["results"][0]["rank"], pages[1]["results"][0]["rank"])
+
+    def test_phrase_and_highlight(self):
+        hit = self._respond("Office & environment <3")
+        self._respond("environment of the office")
+        body = self._search('"office environment"')
+        self.assertEqual([r["id"] for r in body["results"]], [hit.id])
+        answer = next(a for a in body["results"][0]["answers"] if a["question_id"] == self.question.id)
+        # SQLite marks the phrase as a whole, PostgreSQL word by word.
+        self.assertIn("<mark>Office", answer["highlight"])
+        self.assertIn("environment</mark> &lt;3", answer["highlight"])
+        self.assertEqual(answer["highlight"].replace("<mark>", "").replace("</mark>", ""), "Office &amp; environment &lt;3")
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        for n in range(8):
+            self._respond(f"salary comment {n}")
+        counts = []
+        for page_size in (1, 8):
+            with CaptureQueriesContext(connection) as queries:
+                body = self._search("salary", page_size=page_size)
+            self.assertEqual(len(body["results"]), page_size)
+            counts.append(len(queries.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class BatchSubmitTests(TestCase):
+    def setUp(self):
+        _reset_caches()
+        self.survey = _make_surveys(1, 1)[0]
+        self.rating = self.survey.questions.get(question_type="rating")
+        self.text = self.survey.questions.get(question_type="text")
+        self.client = APIClient()
+
+    def _item(self, submission_id, *answers):
+        answers = answers or ({"question": self.rating.id, "rating": 4}, {"question": self.text.id, "comment": "ok"})
+        return {"submission_id": submission_id, "answers": list(answers)}
+
+    def _post(self, items):
+        return self.client.post(
+            "/api/survey/submit/batch/", {"survey": self.survey.id, "responses": items}, format="json"
+        )
+
+    def test_repeated_question_fails_only_its_item(self):
+        repeated = self._item(
+            "kiosk-2",
+            {"question": self.rating.id, "rating": 4},
+            {"question": self.rating.id, "rating": 2},
+            {"question": self.text.id, "comment": "ok"},
+        )
+        for attempt in range(2):
+            with self.subTest(attempt=attempt):
+                response = self._post([self._item("kiosk-1"), repeated, self._item("kiosk-3")])
+                self.assertEqual(response.status_code, 200)
+                body = response.json()
+                self.assertEqual([r["ok"] for r in body["results"]], [True, False, True])
+                self.assertIn("only once", str(body["results"][1]["errors"]))
+                expected = ["created", "created"] if attempt == 0 else ["duplicate", "duplicate"]
+                self.assertEqual([body["results"][i]["status"] for i in (0, 2)], expected)
+        self.assertEqual(sorted(Response.objects.values_list("submission_id", flat=True)), ["kiosk-1", "kiosk-3"])
+
+    def test_concurrently_stored_submission_id_is_a_conflict(self):
+        Response.objects.create(survey=self.survey, submission_id="kiosk-1")
+        # The other request commits between the duplicate check and the insert.
+        with mock.patch("surveys.views.existing_submission_ids", side_effect=[set(), {"kiosk-1"}]):
+            response = self._post([self._item("kiosk-1"), self._item("kiosk-2")])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Response.objects.count(), 1)
+
+
+class SubmitValidationTests(TestCase):
+    def setUp(self):
+        _reset_caches()
+        self.survey = _make_surveys(1, 1)[0]
+        self.rating = self.survey.questions.get(question_type="rating")
+        self.text = self.survey.questions.get(question_type="text")
+
+    def test_repeated_question_is_rejected_in_both_ingest_modes(self):
+        payload = {
+            "survey": self.survey.id,
+            "answers": [
+                {"question": self.rating.id, "rating": 4},
+                {"question": self.rating.id, "rating": 2},
+                {"question": self.text.id, "comment": "ok"},
+            ],
+        }
+        for mode in ("direct", "spool"):
+            with self.subTest(mode=mode), override_settings(SURVEY_INGEST_MODE=mode):
+                with mock.patch("surveys.views.get_spool") as get_spool:
+                    response = APIClient().post("/api/survey/submit/", payload, format="json")
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("only once", str(response.json()))
+                get_spool.assert_not_called()
+        self.assertFalse(Response.objects.exists())
+
+
+class IdempotentSubmitTests(TestCase):
+    def setUp(self):
+        _reset_caches()
+        self.survey = _make_surveys(1, 1)[0]
+        self.payload = {
+            "survey": self.survey.id,
+            "answers": [
+                {"question": self.survey.questions.get(question_type="rating").id, "rating": 4},
+                {"question": self.survey.questions.get(question_type="text").id, "comment": "ok"},
+            ],
+        }
+        self.client = APIClient()
+
+    def _submit(self, payload, **headers):
+        return self.client.post("/api/survey/submit/", payload, format="json", headers=headers)
+
+    def _assert_replays(self, submit):
+        first = submit()
+        self.assertEqual(first.status_code, 201)
+        self.assertNotIn("Idempotent-Replayed", first)
+        for cached in (True, False):
+            with self.subTest(cached=cached):
+                if not cached:
+                    # Another worker: the id is only known to the database.
+                    idempotency._recent.clear()
+                replay = submit()
+                self.assertEqual((replay.status_code, replay.json()), (first.status_code, first.json()))
+                self.assertEqual(replay["Idempotent-Replayed"], "true")
+        self.assertEqual(Response.objects.count(), 1)
+        self.assertEqual(Answer.objects.count(), 2)
+
+    def test_replay_by_submission_id(self):
+        self._assert_replays(lambda: self._submit({**self.payload, "submission_id": "device-1:0001"}))
+        self.assertEqual(Response.objects.get().submission_id, "device-1:0001")
+
+    def test_replay_by_idempotency_key_header(self):
+        self._assert_replays(lambda: self._submit(self.payload, **{"Idempotency-Key": "device-1:0002"}))
+        self.assertEqual(Response.objects.get().submission_id, "device-1:0002")
+
+    def test_concurrent_retry_gets_the_stored_result(self):
+        # The other request inserts the id after this one checked for it.
+        Response.objects.create(survey=self.survey, submission_id="device-1:0003")
+        with mock.patch("surveys.views.previous_result", side_effect=[None, (201, {"ok": True})]) as previous:
+            response = self._submit({**self.payload, "submission_id": "device-1:0003"})
+        self.assertEqual(previous.call_count, 2)
+        self.assertEqual((response.status_code, response.json()), (201, {"ok": True}))
+        self.assertEqual(response["Idempotent-Replayed"], "true")
+        self.assertEqual(Response.objects.count(), 1)
+        self.assertFalse(Answer.objects.exists())
+
+
+@override_settings(SURVEY_ANSWER_CUBE=False, ANALYTICS_TIME_ZONE="Africa/Addis_Ababa")
+class RollupDashboardParityTests(TestCase):
+    """The rollup-backed dashboard matches the one computed from raw answers."""
+
+    FILTERS = [
+        {},
+        {"region": "North Addis Ababa"},
+        {"region": "ሰሜን አዲስ አበባ"},
+        {"from": "2025-03-02", "to": "2025-03-03"},
+        {"region": "Head office", "from": "2025-03-01", "to": "2025-03-02"},
+    ]
+
+    def setUp(self):
+        _reset_caches()
+        self.survey = Survey.objects.create(title="Survey", is_active=True)
+        section = Section.objects.create(survey=self.survey, title="Section", order=0)
+        self.ratings = [
+            Question.objects.create(survey=self.survey, section=section, text=f"Rate {n}", question_type="rating", order=n)
+            for n in range(2)
+        ]
+        self.gender = Question.objects.create(
+            survey=self.survey, section=section, text="Sex", question_type="dropdown", options="Male\nFemale",
+            demographic_role="gender", order=2,
+        )
+        self.region = Question.objects.create(
+            survey=self.survey, section=section, text="Region", question_type="regions", demographic_role="region", order=3,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_superuser("admin", "admin@example.com", "secret"))
+
+    def _submit(self, count, offset=0):
+        regions = ["North Addis Ababa", "ሰሜን አ.አ አ.መ.ማ ቁ.1", "Head office", ""]
+        records = []
+        for n in range(offset, offset + count):
+            answers = [
+                {"question": self.ratings[0].id, "rating": n % 5 + 1},
+                {"question": self.gender.id, "choice": ["Male", "Female"][n % 2]},
+                {"question": self.region.id, "choice": regions[n % len(regions)]},
+            ]
+            if n % 3:
+                answers.append({"question": self.ratings[1].id, "rating": (n * 2) % 5 + 1})
+            # 20:00 to 23:00 UTC straddles the local midnight.
+            submitted_at = datetime(2025, 3, 1 + n % 3, 20 + n % 4, 30, tzinfo=dt_timezone.utc)
+            records.append(
+                {"survey": self.survey.id, "submitted_at": submitted_at.isoformat(), "answers": answers}
+            )
+        write_submissions(records)
+
+    def _dashboards(self):
+        bodies = []
+        for params in self.FILTERS:
+            cache.clear()
+            body = self.client.get("/api/admin/dashboard/", {"survey": self.survey.id, **params}).json()
+            body.pop("computed_at")
+            bodies.append(body)
+        return bodies
+
+    def _assert_parity(self):
+        self.survey.refresh_from_db()
+        self.assertIsNotNone(self.survey.rollups_built_at)
+        with mock.patch("accounts.views.aggregate_rollups", wraps=aggregate_rollups) as rollups:
+            from_rollups = self._dashboards()
+        self.assertEqual(rollups.call_count, len(self.FILTERS))
+
+        Survey.objects.filter(pk=self.survey.pk).update(rollups_built_at=None)
+        with mock.patch("accounts.views.aggregate_rollups") as rollups:
+            from_answers = self._dashboards()
+        rollups.assert_not_called()
+        Survey.objects.filter(pk=self.survey.pk).update(rollups_built_at=self.survey.rollups_built_at)
+
+        for params, rolled, raw in zip(self.FILTERS, from_rollups, from_answers):
+            with self.subTest(**params):
+                self.assertGreater(raw["totals"]["responses"], 0)
+                self.assertEqual(rolled, raw)
+
+    def test_after_write_submissions(self):
+        self._submit(24)
+        self._assert_parity()
+        self._submit(7, offset=24)
+        self._assert_parity()
+
+    def test_after_rebuild_rollups(self):
+        self._submit(24)
+        rebuild_rollups(self.survey.id)
+        self._assert_parity()
+
+
+class DashboardETagTests(TestCase):
+    """The dashboard ETag follows the data generation, which moves when a change commits."""
+
+    def setUp(self):
+        _reset_caches()
+        self.survey = _make_surveys(1, 1)[0]
+        self.rating = self.survey.questions.get(question_type="rating")
+        self.text = self.survey.questions.get(question_type="text")
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_superuser("admin", "admin@example.com", "secret"))
+        self.url = f"/api/admin/dashboard/?survey={self.survey.id}&fields=totals"
+
+    def _dashboard(self, etag=None):
+        return self.client.get(self.url, headers={"If-None-Match": etag} if etag else {})
+
+    def _submit(self):
+        payload = {
+            "survey": self.survey.id,
+            "answers": [{"question": self.rating.id, "rating": 5}, {"question": self.text.id, "comment": "ok"}],
+        }
+        self.assertEqual(APIClient().post("/api/survey/submit/", payload, format="json").status_code, 201)
+
+    def test_unchanged_generation_is_not_modified(self):
+        first = self._dashboard()
+        self.assertEqual(first.status_code, 200)
+        again = self._dashboard(first["ETag"])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again["ETag"], first["ETag"])
+
+    def test_submission_changes_the_etag_once_committed(self):
+        etag = self._dashboard()["ETag"]
+        with self.captureOnCommitCallbacks() as callbacks:
+            self._submit()
+        # Until the transaction commits, the cached generation (and a 304) stands.
+        self.assertEqual(self._dashboard(etag).status_code, 304)
+        for callback in callbacks:
+            callback()
+        response = self._dashboard(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["totals"]["responses"], 1)
+
+    def test_survey_edit_changes_the_etag(self):
+        etag = self._dashboard()["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f"/api/admin/surveys/{self.survey.id}/", {"title": "Renamed"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        response = self._dashboard(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()["survey"]["title"], "Renamed")
+
+
+class SubmissionSpoolTests(TestCase):
+    def setUp(self):
+        _reset_caches()
+        self.survey = _make_surveys(1, 1)[0]
+        rating = self.survey.questions.get(question_type="rating")
+        self.record = {"survey": self.survey.id, "answers": [{"question": rating.id, "rating": 3}]}
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.spool = SubmissionSpool(self.directory, orphan_age=3600)
+        # No background flusher in tests; flushes are called explicitly.
+        self.spool.start = lambda: None
+
+    def _segment(self, pid, suffix=".spool"):
+        name = f"{pid}-{len(os.listdir(self.directory))}-1{suffix}"
+        with open(os.path.join(self.directory, name), "w", encoding="utf-8") as fh:
+            fh.write(json.dumps(self.record) + "\n")
+        return name
+
+    def test_all_takes_over_segments_of_exited_processes(self):
+        child = subprocess.Popen([sys.executable, "-c", "pass"])
+        child.wait()
+        self._segment(child.pid)
+        self._segment(child.pid, f".flushing.{child.pid}")
+        self.assertEqual(self.spool.flush(include_active=True), 2)
+        self.assertEqual(Response.objects.count(), 2)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_all_leaves_segments_of_running_processes(self):
+        live = os.getppid()
+        names = {self._segment(live), self._segment(live, f".flushing.{live}")}
+        self.assertEqual(self.spool.flush(include_active=True), 0)
+        self.assertFalse(Response.objects.exists())
+        self.assertEqual(set(os.listdir(self.directory)), names)
+
+    def test_appender_survives_its_segment_being_claimed(self):
+        self.spool.append(self.record)
+        (name,) = os.listdir(self.directory)
+        claimed = name.replace(".spool", ".flushing.1")
+        os.replace(os.path.join(self.directory, name), os.path.join(self.directory, claimed))
+        # Later records start a new segment instead of following the claimed file.
+        self.spool.append(self.record)
+        self.assertEqual(len(os.listdir(self.directory)), 2)
+        with open(os.path.join(self.directory, claimed), encoding="utf-8") as fh:
+            self.assertEqual(len(fh.readlines()), 1)
+
+        # Rotating a segment claimed meanwhile is not an error.
+        os.replace(
+            os.path.join(self.directory, f"{self.spool._segment_base}.spool"),
+            os.path.join(self.directory, f"{self.spool._segment_base}.flushing.1"),
+        )
+        self.spool._rotate()
+        self.assertIsNone(self.spool._segment)
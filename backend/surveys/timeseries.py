@@ -0,0 +1,204 @@
+"""Response counts over time, bucketed by hour, day or week in a chosen timezone.
+
+Counts are grouped in the database (``TruncHour`` / ``TruncDay`` / ``TruncWeek`` with
+the timezone applied) over a plain ``submitted_at`` range, which the
+``(survey, submitted_at)`` index serves; empty buckets are filled in here.
+
+A bucket that ended more than ``SURVEY_TIMESERIES_LATE_SECONDS`` ago is closed: new
+submissions land in later buckets, so closed buckets are cached and only the open
+tail of a range is counted again. Submissions stored with an older ``submitted_at``
+(kiosk batches, a drained spool) call ``touch_survey_history`` and so start a new
+history token, which retires the cached buckets of that survey.
+"""
+import hashlib
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.functions import TruncDay, TruncHour, TruncWeek
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .cache import get_history_token
+from .models import Response
+from .regions import response_region_filter
+
+GRANULARITIES = {"hour": TruncHour, "day": TruncDay, "week": TruncWeek}
+BUCKET_SECONDS = {"hour": 3600, "day": 86400, "week": 7 * 86400}
+# Buckets shown when no ``from`` is given, ending with the current bucket.
+DEFAULT_BUCKETS = {"hour": 24, "day": 14, "week": 12}
+
+
+def analytics_timezone(name=None):
+    """ZoneInfo for ``name`` (default ``ANALYTICS_TIME_ZONE``); raises ValueError if unknown."""
+    name = name or getattr(settings, "ANALYTICS_TIME_ZONE", "Africa/Addis_Ababa")
+    try:
+        return ZoneInfo(str(name))
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone: {name}")
+
+
+def local_date(value):
+    """Date of the aware datetime ``value`` in ``ANALYTICS_TIME_ZONE``.
+
+    This is the day of a submission everywhere: date filters, rollup and keyword index
+    ``day`` columns and the answer cube, as well as the day buckets here.
+    """
+    return value.astimezone(analytics_timezone()).date()
+
+
+def local_day_filter(day_from=None, day_to=None, field="submitted_at") -> dict:
+    """Queryset filters keeping ``field`` within the inclusive local days ``day_from``..``day_to``."""
+    tz = analytics_timezone()
+    filters = {}
+    if day_from:
+        filters[f"{field}__gte"] = datetime.combine(day_from, time(), tzinfo=tz)
+    if day_to:
+        filters[f"{field}__lt"] = datetime.combine(day_to + timedelta(days=1), time(), tzinfo=tz)
+    return filters
+
+
+def late_seconds() -> int:
+    return int(getattr(settings, "SURVEY_TIMESERIES_LATE_SECONDS", 5 * 60))
+
+
+def _closed_timeout() -> int:
+    return int(getattr(settings, "SURVEY_TIMESERIES_CACHE_TIMEOUT", 60 * 60))
+
+
+def bucket_floor(value, granularity, tz):
+    """Start of the bucket containing the aware datetime ``value``, in ``tz``."""
+    local = value.astimezone(tz)
+    if granularity == "hour":
+        return local.replace(minute=0, second=0, microsecond=0)
+    day = local.date()
+    if granularity == "week":
+        day -= timedelta(days=day.weekday())
+    return datetime.combine(day, time(), tzinfo=tz)
+
+
+def next_bucket(start, granularity, tz):
+    if granularity == "hour":
+        # Step in absolute time so DST changes do not repeat or skip an hour.
+        return (start.astimezone(ZoneInfo("UTC")) + timedelta(hours=1)).astimezone(tz)
+    days = 7 if granularity == "week" else 1
+    return datetime.combine(start.date() + timedelta(days=days), time(), tzinfo=tz)
+
+
+def bucket_starts(start, end, granularity, tz) -> list:
+    """Starts of every bucket that overlaps ``[start, end)``."""
+    out = []
+    current = bucket_floor(start, granularity, tz)
+    while current < end:
+        out.append(current)
+        current = next_bucket(current, granularity, tz)
+    return out
+
+
+def _max_buckets() -> int:
+    return int(getattr(settings, "SURVEY_TIMESERIES_MAX_BUCKETS", 2000))
+
+
+def _parse_bound(value, tz, upper):
+    # A date covers the whole local day (``to`` is inclusive); a datetime is exact.
+    value = str(value).strip()
+    # Dates first: parse_datetime also reads a bare date, as midnight.
+    day = parse_date(value)
+    if day is not None:
+        if upper:
+            day += timedelta(days=1)
+        return datetime.combine(day, time(), tzinfo=tz)
+    dt = parse_datetime(value)
+    if dt is None:
+        raise ValueError(f"Invalid date: {value}")
+    if timezone.is_naive(dt):
+        dt = dt.replace(tzinfo=tz)
+    return dt
+
+
+def parse_range(date_from, date_to, granularity, tz):
+    """Aware ``[start, end)`` for ``from`` / ``to`` query values; raises ValueError.
+
+    Without ``to`` the range ends with the current bucket; without ``from`` it spans
+    ``DEFAULT_BUCKETS`` buckets.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity: {granularity}")
+    if date_to:
+        end = _parse_bound(date_to, tz, upper=True)
+    else:
+        end = next_bucket(bucket_floor(timezone.now(), granularity, tz), granularity, tz)
+    if date_from:
+        start = _parse_bound(date_from, tz, upper=False)
+    else:
+        start = bucket_floor(end - timedelta(microseconds=1), granularity, tz)
+        for _ in range(DEFAULT_BUCKETS[granularity] - 1):
+            start = bucket_floor(start - timedelta(microseconds=1), granularity, tz)
+    if start >= end:
+        raise ValueError("'from' must be before 'to'")
+    if (end - start).total_seconds() / BUCKET_SECONDS[granularity] > _max_buckets():
+        raise ValueError(f"Range too long for {granularity} buckets (max {_max_buckets()})")
+    return start, end
+
+
+def _bucket_key(value, tz) -> str:
+    return value.astimezone(tz).replace(tzinfo=None).isoformat()
+
+
+def _count(survey_id, region, start, end, granularity, tz) -> dict:
+    qs = Response.objects.filter(survey_id=survey_id, submitted_at__gte=start, submitted_at__lt=end)
+    if region:
+        qs = qs.filter(**response_region_filter(region))
+    rows = (
+        qs.annotate(bucket=GRANULARITIES[granularity]("submitted_at", tzinfo=tz))
+        .values_list("bucket")
+        .annotate(c=Count("id"))
+    )
+    return {_bucket_key(bucket, tz): int(c) for bucket, c in rows}
+
+
+def _closed_key(survey_id, region, granularity, tz, start, closed_end) -> str:
+    region_key = "|".join(f"{k}:{v}" for k, v in sorted(response_region_filter(region).items())) if region else ""
+    raw = f"{granularity}|{tz.key}|{start.isoformat()}|{closed_end.isoformat()}|{region_key}"
+    digest = hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+    return f"timeseries:{survey_id}:{get_history_token(survey_id)}:{digest}"
+
+
+def survey_timeseries(survey_id, start, end, granularity="day", tz=None, region=None) -> list:
+    """``[(bucket start, count), ...]`` for every bucket overlapping ``[start, end)``.
+
+    ``start`` and ``end`` are aware datetimes; partial first and last buckets only count
+    responses inside the range.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity: {granularity}")
+    tz = tz or analytics_timezone()
+    starts = bucket_starts(start, end, granularity, tz)
+    if not starts:
+        return []
+
+    # Buckets ending before the cutoff are closed; counts up to their end are cached.
+    cutoff = timezone.now() - timedelta(seconds=late_seconds())
+    closed_end = start
+    for bucket in starts:
+        bucket_end = min(next_bucket(bucket, granularity, tz), end)
+        if bucket_end > cutoff:
+            break
+        closed_end = bucket_end
+
+    counts = {}
+    if closed_end > start:
+        key = _closed_key(survey_id, region, granularity, tz, start, closed_end)
+        closed = cache.get(key)
+        if closed is None:
+            closed = _count(survey_id, region, start, closed_end, granularity, tz)
+            cache.set(key, closed, _closed_timeout())
+        counts.update(closed)
+    if closed_end < end:
+        # Open buckets are counted afresh on every call.
+        for k, c in _count(survey_id, region, closed_end, end, granularity, tz).items():
+            counts[k] = counts.get(k, 0) + c
+
+    return [(bucket, counts.get(_bucket_key(bucket, tz), 0)) for bucket in starts]
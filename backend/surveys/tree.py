@@ -0,0 +1,55 @@
+"""Load the section/question tree for one or many surveys in a fixed number of queries.
+
+Sections and questions are fetched with one query each, regardless of how many surveys
+or sections are involved, and grouped in memory. The result is attached to each survey
+as ``survey_tree`` so serializers never fall back to per-section queries.
+"""
+from collections import defaultdict
+from typing import NamedTuple
+
+from .models import Section, Question
+
+
+class SurveyTree(NamedTuple):
+    # [(section, [question, ...]), ...] ordered by (order, id)
+    sections: list
+    # Every question of the survey ordered by (order, id), including unsectioned ones
+    questions: list
+
+
+def load_survey_trees(surveys):
+    """Attach a ``SurveyTree`` to every survey that does not have one yet.
+
+    Accepts any iterable of surveys (including a queryset) and returns them as a list.
+    """
+    surveys = list(surveys)
+    pending_ids = {s.id for s in surveys if getattr(s, "survey_tree", None) is None}
+    if not pending_ids:
+        return surveys
+
+    sections_by_survey = defaultdict(list)
+    for section in Section.objects.filter(survey_id__in=pending_ids).order_by("order", "id"):
+        sections_by_survey[section.survey_id].append(section)
+
+    questions_by_survey = defaultdict(list)
+    questions_by_section = defaultdict(list)
+    for q in Question.objects.filter(survey_id__in=pending_ids).order_by("order", "id"):
+        questions_by_survey[q.survey_id].append(q)
+        if q.section_id is not None:
+            questions_by_section[q.section_id].append(q)
+
+    for survey in surveys:
+        if survey.id not in pending_ids:
+            continue
+        survey.survey_tree = SurveyTree(
+            sections=[(s, questions_by_section.get(s.id, [])) for s in sections_by_survey.get(survey.id, [])],
+            questions=questions_by_survey.get(survey.id, []),
+        )
+    return surveys
+
+
+def get_survey_tree(survey) -> SurveyTree:
+    """Return the survey's tree, loading it on first access."""
+    if getattr(survey, "survey_tree", None) is None:
+        load_survey_trees([survey])
+    return survey.survey_tree
@@ -1,9 +1,20 @@
 from django.urls import path
-from .views import ActiveSurveyView, SubmitSurveyView, CheckAttemptsView, IncrementAttemptView
+from .views import (
+    ActiveSurveyView,
+    RegionCatalogView,
+    SubmitSurveyView,
+    SubmitSurveyBatchView,
+    CheckAttemptsView,
+    IncrementAttemptView,
+    ClaimAttemptView,
+)
 
 urlpatterns = [
     path('survey/active/', ActiveSurveyView.as_view(), name='survey-active'),
+    path('regions/', RegionCatalogView.as_view(), name='region-catalog'),
     path('survey/submit/', SubmitSurveyView.as_view(), name='survey-submit'),
+    path('survey/submit/batch/', SubmitSurveyBatchView.as_view(), name='survey-submit-batch'),
     path('check-attempts/', CheckAttemptsView.as_view(), name='check-attempts'),
     path('increment-attempt/', IncrementAttemptView.as_view(), name='increment-attempt'),
+    path('claim-attempt/', ClaimAttemptView.as_view(), name='claim-attempt'),
 ]
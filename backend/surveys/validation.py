@@ -0,0 +1,68 @@
+"""Compiled, per-survey validation plans for public submissions.
+
+A survey's questions do not change while it is live, so the rules needed to validate a
+submission (question membership, type, required flag and allowed options) are compiled
+once per ``Survey.version`` and kept in memory. Validating a submission then needs no
+database reads beyond the cached version lookup.
+"""
+import threading
+from typing import NamedTuple
+
+from .cache import get_survey_version
+from .models import Question
+from .regions import get_region_index
+
+
+class QuestionRule(NamedTuple):
+    question_type: str
+    required: bool
+    # Allowed ``Answer.choice`` values for selection questions; None means unrestricted.
+    choices: frozenset | None
+    # ``Question.demographic_role`` ("" for none).
+    role: str = ""
+
+
+class ValidationPlan(NamedTuple):
+    survey_id: int
+    version: int
+    # question id -> QuestionRule
+    rules: dict
+
+
+_plans = {}
+_plans_lock = threading.Lock()
+
+
+def _option_set(options: str) -> frozenset | None:
+    # Same parsing as the survey page: one option per line, trimmed, blanks dropped.
+    values = frozenset(o.strip() for o in (options or "").split("\n") if o.strip())
+    return values or None
+
+
+def compile_plan(survey_id: int, version: int) -> ValidationPlan:
+    rules = {}
+    rows = Question.objects.filter(survey_id=survey_id).values_list(
+        "id", "question_type", "required", "options", "demographic_role"
+    )
+    for qid, qtype, required, options, role in rows:
+        choices = None
+        if qtype in ("dropdown", "multiple_choice"):
+            choices = _option_set(options)
+        elif qtype == "regions":
+            # Any region (English or Amharic) or CSC from the catalog.
+            choices = get_region_index().values
+        rules[qid] = QuestionRule(question_type=qtype, required=bool(required), choices=choices, role=role)
+    return ValidationPlan(survey_id=survey_id, version=version, rules=rules)
+
+
+def get_validation_plan(survey_id: int) -> ValidationPlan | None:
+    """Return the validation plan for a survey, or None if the survey does not exist."""
+    version = get_survey_version(survey_id)
+    if version is None:
+        return None
+    plan = _plans.get(survey_id)
+    if plan is None or plan.version != version:
+        plan = compile_plan(survey_id, version)
+        with _plans_lock:
+            _plans[survey_id] = plan
+    return plan
@@ -2,16 +2,29 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
-from django.utils import timezone
-from django.db import transaction
-from django.db.utils import OperationalError
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags, quote_etag
+from django.db.utils import IntegrityError, OperationalError
 import hashlib
 
-from .models import Survey, SurveyAttempt
-from .serializers import SurveySerializer, SubmitSurveySerializer
+from .models import SurveyAttempt
+from .serializers import SubmitSurveySerializer, SubmitSurveyBatchItemSerializer
+from .cache import get_active_survey_payload, get_active_survey_ref
+from .ingest import get_spool, ingest_mode, write_submissions
+from .parsers import CompressedJSONParser
+from .regions import get_region_index
+from .attempts import claim_attempt, increment_attempt
+from .snapshots import start_scheduler as start_snapshot_scheduler
+from .idempotency import existing_submission_ids, previous_result, remember, submission_id_from_request
 from utils.ad_utils import get_employee_identifier, is_admin_user
 
 
+# Public submissions allowed per device fingerprint (and IP) for one survey.
+MAX_ATTEMPTS = 2
+
+
 def _get_client_ip(request) -> str:
     try:
         xff = request.META.get("HTTP_X_FORWARDED_FOR")
@@ -36,46 +49,230 @@ def _fingerprint_hash(request, fingerprint: str, survey_id: int) -> str:
     return hashlib.sha256(raw).hexdigest()
 
 
+def _replayed_response(status_code: int, body) -> Response:
+    response = Response(body, status=status_code)
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _attempt_fingerprint_hash(request) -> str | None:
+    """Fingerprint hash for the attempt endpoints, or None when the client sent no usable fingerprint."""
+    fingerprint = (request.data.get("fingerprint") or "").strip()
+    survey_id_raw = request.data.get("survey_id")
+    try:
+        survey_id = int(survey_id_raw)
+    except (TypeError, ValueError):
+        survey_id = 0
+
+    if not fingerprint or survey_id <= 0:
+        return None
+    return _fingerprint_hash(request, fingerprint, survey_id)
+
+
 class ActiveSurveyView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
-        survey = (
-            Survey.objects.filter(is_active=True)
-            .order_by("-created_at")
-            .prefetch_related("sections", "sections__questions", "questions")
-            .first()
-        )
-        if not survey:
+        # The survey tree is rendered once per survey version; see surveys/cache.py.
+        payload, payload_etag = get_active_survey_payload()
+        if payload is None:
             return Response(None, status=status.HTTP_200_OK)
 
-        # NOTE: We no longer enforce the legacy one-response-per-employee restriction here.
-        # Public attempt limiting is handled via fingerprint/IP based endpoints, with full admin bypass.
-        has_responded = False
+        client_ip = _get_client_ip(request)
+        admin_bypass = _is_admin_bypass(request)
 
-        survey_data = SurveySerializer(survey).data
-        survey_data['has_responded'] = has_responded
-        survey_data['client_ip'] = _get_client_ip(request)
-        survey_data['admin_bypass'] = _is_admin_bypass(request)
-        
-        return Response(survey_data)
+        # The ETag covers the per-request fields too, so a 304 is only sent when the
+        # client would receive byte-identical content.
+        raw = f"{payload_etag}|{client_ip}|{int(admin_bypass)}".encode("utf-8", errors="ignore")
+        etag = quote_etag(hashlib.sha256(raw).hexdigest()[:32])
+
+        if_none_match = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+        if etag in if_none_match or "*" in if_none_match:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            # NOTE: We no longer enforce the legacy one-response-per-employee restriction here.
+            # Public attempt limiting is handled via fingerprint/IP based endpoints, with full admin bypass.
+            survey_data = dict(payload)
+            survey_data['has_responded'] = False
+            survey_data['client_ip'] = client_ip
+            survey_data['admin_bypass'] = admin_bypass
+            response = Response(survey_data)
+
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class RegionCatalogView(APIView):
+    """Region -> CSC catalog for the survey page and the dashboard region filter.
+
+    The body is rendered and gzip-compressed once per process (surveys/regions.py) and
+    only changes on deploy, so it is publicly cacheable and revalidated by ETag.
+    """
+
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request):
+        index = get_region_index()
+        etag = quote_etag(index.etag)
+
+        if_none_match = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+        if etag in if_none_match or "*" in if_none_match:
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        elif "gzip" in request.META.get("HTTP_ACCEPT_ENCODING", ""):
+            response = HttpResponse(index.payload_gzip, content_type="application/json; charset=utf-8")
+            response["Content-Encoding"] = "gzip"
+        else:
+            response = HttpResponse(index.payload, content_type="application/json; charset=utf-8")
+
+        response["ETag"] = etag
+        patch_vary_headers(response, ("Accept-Encoding",))
+        patch_cache_control(response, public=True, max_age=getattr(settings, "REGION_CATALOG_MAX_AGE", 3600))
+        return response
 
 
 class SubmitSurveyView(APIView):
     permission_classes = [AllowAny]
 
     def post(self, request):
+        # Retries carrying an already-seen submission id get the original result back.
+        submission_id = submission_id_from_request(request)
+        if submission_id:
+            previous = previous_result(submission_id)
+            if previous is not None:
+                return _replayed_response(*previous)
+
         # Employee identifier is still stored for analytics/auditing, but we no longer block on it.
         employee_identifier = get_employee_identifier(request)
         admin_bypass = _is_admin_bypass(request)
         
         serializer = SubmitSurveySerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        
-        # Save with employee identifier (for tracking, but admins can bypass restriction)
-        response = serializer.save(employee_identifier=employee_identifier, _admin_bypass=admin_bypass)
-        
-        return Response({"ok": True}, status=status.HTTP_201_CREATED)
+        start_snapshot_scheduler()
+
+        if ingest_mode() == "spool":
+            # Write-behind: the record is durable in the local spool and flushed in batches.
+            get_spool().append(
+                serializer.to_record(
+                    employee_identifier=employee_identifier,
+                    admin_bypass=admin_bypass,
+                    submission_id=submission_id,
+                )
+            )
+            result = (status.HTTP_202_ACCEPTED, {"ok": True, "queued": True})
+        else:
+            # Save with employee identifier (for tracking, but admins can bypass restriction)
+            try:
+                serializer.save(
+                    employee_identifier=employee_identifier,
+                    _admin_bypass=admin_bypass,
+                    _submission_id=submission_id,
+                )
+            except IntegrityError:
+                # A concurrent retry with the same submission id won the race.
+                previous = previous_result(submission_id) if submission_id else None
+                if previous is None:
+                    raise
+                return _replayed_response(*previous)
+            result = (status.HTTP_201_CREATED, {"ok": True})
+
+        if submission_id:
+            remember(submission_id, *result)
+        return Response(result[1], status=result[0])
+
+
+class SubmitSurveyBatchView(APIView):
+    """Submit many responses for one survey in a single request.
+
+    Used by offline kiosks syncing their backlog. The body may be gzip-compressed
+    (``Content-Encoding: gzip``) and looks like::
+
+        {"survey": 12, "responses": [{"submission_id": "...", "submitted_at": "...", "answers": [...]}]}
+
+    ``survey`` defaults to the active survey. Every item goes through the same rules as
+    ``SubmitSurveySerializer``; valid items are written together in one transaction and
+    the result of each item is reported by index. Kiosks are shared devices, so the
+    request's employee identifier is not stored on the responses.
+    """
+
+    permission_classes = [AllowAny]
+    parser_classes = [CompressedJSONParser]
+
+    def post(self, request):
+        body = request.data
+        items = body.get("responses") if isinstance(body, dict) else body
+        if not isinstance(items, list) or not items:
+            return Response({"detail": "Expected a non-empty list of responses"}, status=status.HTTP_400_BAD_REQUEST)
+        max_items = int(getattr(settings, "SURVEY_BATCH_SUBMIT_MAX_ITEMS", 500))
+        if len(items) > max_items:
+            return Response(
+                {"detail": f"A batch may contain at most {max_items} responses"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        survey_id = body.get("survey") if isinstance(body, dict) else None
+        if survey_id in (None, ""):
+            ref = get_active_survey_ref()
+            survey_id = ref[0] if ref else None
+        try:
+            survey_id = int(survey_id)
+        except (TypeError, ValueError):
+            return Response({"detail": "No active survey"}, status=status.HTTP_400_BAD_REQUEST)
+
+        start_snapshot_scheduler()
+        results = [None] * len(items)
+        records = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                results[index] = {"index": index, "ok": False, "errors": {"non_field_errors": ["Expected an object"]}}
+                continue
+            serializer = SubmitSurveyBatchItemSerializer(data={**item, "survey": survey_id})
+            if not serializer.is_valid():
+                results[index] = {"index": index, "ok": False, "errors": serializer.errors}
+                continue
+            records.append((index, serializer.to_record()))
+
+        # Items already stored (or repeated within this batch) are reported, not re-inserted.
+        seen = existing_submission_ids(r["submission_id"] for _i, r in records)
+        to_write = []
+        for index, record in records:
+            key = record["submission_id"]
+            if key and key in seen:
+                results[index] = {"index": index, "ok": True, "status": "duplicate", "submission_id": key}
+                continue
+            if key:
+                seen.add(key)
+            to_write.append((index, record))
+
+        try:
+            write_submissions([record for _i, record in to_write])
+        except IntegrityError:
+            # Another request stored one of these submission ids meanwhile; a retry reports it as a
+            # duplicate. Any other constraint would fail the retry too, so it is not a conflict.
+            if not existing_submission_ids(record["submission_id"] for _i, record in to_write):
+                raise
+            return Response(
+                {"detail": "A submission in this batch was stored concurrently; please retry"},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        for index, record in to_write:
+            key = record["submission_id"]
+            if key:
+                remember(key, status.HTTP_201_CREATED, {"ok": True})
+            results[index] = {"index": index, "ok": True, "status": "created", "submission_id": key}
+
+        return Response(
+            {
+                "survey": survey_id,
+                "created": len(to_write),
+                "duplicates": sum(1 for r in results if r.get("status") == "duplicate"),
+                "failed": sum(1 for r in results if not r["ok"]),
+                "results": results,
+            },
+            status=status.HTTP_200_OK,
+        )
 
 
 class CheckAttemptsView(APIView):
@@ -86,22 +283,15 @@ class CheckAttemptsView(APIView):
         if _is_admin_bypass(request):
             return Response({"allowed": True, "unlimited": True}, status=status.HTTP_200_OK)
 
-        fingerprint = (request.data.get("fingerprint") or "").strip()
-        survey_id_raw = request.data.get("survey_id")
-        try:
-            survey_id = int(survey_id_raw)
-        except (TypeError, ValueError):
-            survey_id = 0
-
-        if not fingerprint or survey_id <= 0:
+        fp_hash = _attempt_fingerprint_hash(request)
+        if not fp_hash:
             # If the client can't generate a fingerprint, allow and let frontend fallback to localStorage.
             return Response({"allowed": True, "unlimited": False, "fallback": True}, status=status.HTTP_200_OK)
 
-        fp_hash = _fingerprint_hash(request, fingerprint, survey_id)
         try:
             attempt = SurveyAttempt.objects.filter(fingerprint_hash=fp_hash).first()
             attempts = int(getattr(attempt, "attempts", 0) or 0)
-            return Response({"allowed": attempts < 2, "unlimited": False}, status=status.HTTP_200_OK)
+            return Response({"allowed": attempts < MAX_ATTEMPTS, "unlimited": False}, status=status.HTTP_200_OK)
         except OperationalError:
             # DB migrations not applied yet (e.g., missing surveys_surveyattempt table).
             # Allow and rely on frontend localStorage fallback instead of crashing.
@@ -116,30 +306,40 @@ class IncrementAttemptView(APIView):
         if _is_admin_bypass(request):
             return Response({"ok": True, "ignored": True}, status=status.HTTP_200_OK)
 
-        fingerprint = (request.data.get("fingerprint") or "").strip()
-        survey_id_raw = request.data.get("survey_id")
-        try:
-            survey_id = int(survey_id_raw)
-        except (TypeError, ValueError):
-            survey_id = 0
-
-        if not fingerprint or survey_id <= 0:
+        fp_hash = _attempt_fingerprint_hash(request)
+        if not fp_hash:
             return Response({"ok": True, "fallback": True}, status=status.HTTP_200_OK)
 
-        fp_hash = _fingerprint_hash(request, fingerprint, survey_id)
-        now = timezone.now()
-
         try:
-            with transaction.atomic():
-                obj, _created = SurveyAttempt.objects.select_for_update().get_or_create(
-                    fingerprint_hash=fp_hash,
-                    defaults={"attempts": 0, "last_submitted": None},
-                )
-                obj.attempts = int(obj.attempts or 0) + 1
-                obj.last_submitted = now
-                obj.save(update_fields=["attempts", "last_submitted"])
+            increment_attempt(fp_hash)
         except OperationalError:
             # DB migrations not applied yet.
             return Response({"ok": True, "fallback": True}, status=status.HTTP_200_OK)
 
         return Response({"ok": True}, status=status.HTTP_200_OK)
+
+
+class ClaimAttemptView(APIView):
+    """Check the attempt limit and take one attempt in a single atomic statement."""
+
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        # Completely exempt admin roles from any tracking/limits.
+        if _is_admin_bypass(request):
+            return Response({"allowed": True, "unlimited": True}, status=status.HTTP_200_OK)
+
+        fp_hash = _attempt_fingerprint_hash(request)
+        if not fp_hash:
+            return Response({"allowed": True, "unlimited": False, "fallback": True}, status=status.HTTP_200_OK)
+
+        try:
+            allowed, attempts = claim_attempt(fp_hash, MAX_ATTEMPTS)
+        except OperationalError:
+            # DB migrations not applied yet.
+            return Response({"allowed": True, "unlimited": False, "fallback": True}, status=status.HTTP_200_OK)
+
+        return Response(
+            {"allowed": allowed, "attempts": attempts, "limit": MAX_ATTEMPTS, "unlimited": False},
+            status=status.HTTP_200_OK,
+        )
@@ -3,8 +3,44 @@ import logging
 from django.contrib.auth import get_user_model
 from django.conf import settings
 
+from utils.cache_utils import TTLCache
+
 logger = logging.getLogger(__name__)
 
+ADMIN_ROLES = ("super_admin", "survey_designer", "viewer")
+
+# username -> is admin. Public endpoints resolve the caller's identity on every request;
+# this keeps repeat visitors off the auth_user table. Entries are dropped when an admin
+# user is created, changed or deleted (see ``invalidate_admin_identity``); other worker
+# processes pick the change up within ``ADMIN_IDENTITY_CACHE_TTL`` seconds.
+_admin_by_username = TTLCache(
+    maxsize=getattr(settings, "ADMIN_IDENTITY_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "ADMIN_IDENTITY_CACHE_TTL", 60),
+)
+
+_MISSING = object()
+
+
+def _request_memo(request) -> dict:
+    """Per-request memo, kept on the underlying HttpRequest so DRF's wrapper shares it."""
+    base = getattr(request, "_request", request)
+    memo = getattr(base, "_identity_memo", None)
+    if memo is None:
+        memo = {}
+        try:
+            base._identity_memo = memo
+        except AttributeError:
+            pass
+    return memo
+
+
+def invalidate_admin_identity(*usernames) -> None:
+    """Forget cached admin status for ``usernames`` (call after a user is created/changed/deleted)."""
+    for username in usernames:
+        if username:
+            _admin_by_username.delete(username)
+
+
 def get_employee_identifier(request=None) -> str:
     """
     Get the employee identifier from Active Directory environment variables.
@@ -15,7 +51,19 @@ def get_employee_identifier(request=None) -> str:
     
     Returns:
         str: Employee identifier in format "DOMAIN\\username" or empty string if not available
+    
+    The result is memoised on ``request``.
     """
+    if request is None:
+        return _resolve_employee_identifier(None)
+    memo = _request_memo(request)
+    identifier = memo.get("employee_identifier")
+    if identifier is None:
+        identifier = memo["employee_identifier"] = _resolve_employee_identifier(request)
+    return identifier
+
+
+def _resolve_employee_identifier(request=None) -> str:
     try:
         # Prefer request-provided identity (Windows/IIS auth or reverse proxy headers)
         if request is not None:
@@ -73,12 +121,26 @@ def is_admin_user(employee_identifier: str, request=None) -> bool:
     """
     Check if the current user is an admin (Super_admin or survey_designer).
     
+    The result is memoised on ``request`` and, for identifier lookups, in a
+    process-local TTL cache keyed by username.
+    
     Args:
         employee_identifier: The employee's AD identifier
         
     Returns:
         bool: True if user is admin, False otherwise
     """
+    if request is None:
+        return _resolve_is_admin(employee_identifier, None)
+    memo = _request_memo(request)
+    key = ("is_admin", employee_identifier)
+    result = memo.get(key)
+    if result is None:
+        result = memo[key] = _resolve_is_admin(employee_identifier, request)
+    return result
+
+
+def _resolve_is_admin(employee_identifier: str, request=None) -> bool:
     # If the request is authenticated (e.g., admin has JWT/session), trust request.user.
     try:
         if request is not None:
@@ -86,32 +148,36 @@ def is_admin_user(employee_identifier: str, request=None) -> bool:
             if user is not None and getattr(user, "is_authenticated", False):
                 from accounts.views import _get_user_role
                 role = _get_user_role(user)
-                return role in ("super_admin", "survey_designer", "viewer")
+                return role in ADMIN_ROLES
     except Exception as e:
         logger.error(f"Error checking admin status via request.user: {e}")
 
     if not employee_identifier:
         return False
         
+    # Extract username from DOMAIN\\username format
+    username = employee_identifier.split('\\')[-1] if '\\' in employee_identifier else employee_identifier
+    cached = _admin_by_username.get(username, _MISSING)
+    if cached is not _MISSING:
+        return cached
+
     try:
-        # Extract username from DOMAIN\\username format
-        username = employee_identifier.split('\\')[-1] if '\\' in employee_identifier else employee_identifier
-        
         # Check if user exists and has admin roles
         User = get_user_model()
         user = User.objects.filter(username=username).first()
         if not user:
-            return False
-            
-        # Check if user is super_admin or survey_designer
-        from accounts.views import _get_user_role
-        role = _get_user_role(user)
-        return role in ("super_admin", "survey_designer", "viewer")
-        
+            result = False
+        else:
+            # Check if user is super_admin or survey_designer
+            from accounts.views import _get_user_role
+            result = _get_user_role(user) in ADMIN_ROLES
     except Exception as e:
         logger.error(f"Error checking admin status: {e}")
         return False
 
+    _admin_by_username.set(username, result)
+    return result
+
 def has_employee_responded(survey_id: int, employee_identifier: str) -> bool:
     """
     Check if an employee has already responded to a specific survey.
@@ -1,6 +1,337 @@
-from typing import Iterable, Dict
+"""In-memory answer cube for survey analytics.
+
+``get_answer_cube(survey_id)`` loads a survey's responses and answers once into flat numpy
+columns and keeps them in process memory:
+
+* per response: id, region and CSC (dictionary codes of ``Response.region`` /
+  ``Response.csc``) and day (ordinal of the submission date in ``ANALYTICS_TIME_ZONE``);
+* per answer: position of its response in the columns above, question id, rating
+  (int8, ``NO_RATING`` when absent), and choice and code (dictionary codes).
+
+Filters become boolean masks over the response columns, which answers pick up through
+their response position; counts, averages and pivots are ``bincount`` / ``unique``
+calls over the masked columns, so slicing a survey again costs no SQL.
+
+A cube is tagged with the survey's data generation (``surveys.cache``). When the
+generation moves on and only new responses were added, just those are loaded and
+appended; a survey edit, a rewrite of stored responses (``touch_survey_history``) or a
+deletion loads the cube again from scratch. Cubes are immutable: a refresh builds a new
+one, so requests holding the previous cube are unaffected. Dictionaries only grow, and
+are shared between a cube and its refreshed successors.
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, NamedTuple
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from surveys.aggregates import RATING_VALUES, AnswerAggregates, empty_rating_counts
+from surveys.cache import get_data_generation, split_generation
+from surveys.models import Answer, Question, Response
+from surveys.regions import response_region_filter
+from surveys.timeseries import local_date
+
+NO_RATING = -128
+# How long a survey found too large for a cube is remembered (per version).
+OVERSIZED_TIMEOUT = 24 * 60 * 60
+
+
+class _Dictionary:
+    """Dictionary encoding of strings; code 0 is ""."""
+
+    def __init__(self):
+        self.values = [""]
+        self.index = {"": 0}
+
+    def encode(self, value) -> int:
+        value = value or ""
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class Selection(NamedTuple):
+    responses: np.ndarray
+    answers: np.ndarray
+
+
+def _rating(value) -> int:
+    if value is None:
+        return NO_RATING
+    # Ratings are 1..5; anything int8 cannot hold is clipped rather than dropped.
+    return max(NO_RATING + 1, min(127, int(value)))
+
+
+class AnswerCube:
+    def __init__(self, survey_id, generation, columns, dictionaries):
+        self.survey_id = survey_id
+        self.generation = generation
+        self.version, _count, _last_id, self.history = split_generation(generation)
+        (
+            self.response_id, self.response_region, self.response_csc, self.response_day,
+            self.answer_pos, self.answer_question, self.answer_rating, self.answer_choice, self.answer_code,
+        ) = columns
+        self.regions, self.cscs, self.choices, self.codes = dictionaries
+
+    @property
+    def columns(self) -> tuple:
+        return (
+            self.response_id, self.response_region, self.response_csc, self.response_day,
+            self.answer_pos, self.answer_question, self.answer_rating, self.answer_choice, self.answer_code,
+        )
+
+    @property
+    def dictionaries(self) -> tuple:
+        return self.regions, self.cscs, self.choices, self.codes
+
+    @property
+    def last_id(self) -> int:
+        return int(self.response_id[-1]) if len(self.response_id) else 0
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self.columns)
+
+    @classmethod
+    def load(cls, survey_id, generation, base=None, upto_id=None):
+        """Cube of the survey's responses, or ``base`` extended with responses above its last id."""
+        dictionaries = base.dictionaries if base is not None else (_Dictionary(), _Dictionary(), _Dictionary(), _Dictionary())
+        regions, cscs, choices, codes = dictionaries
+        after_id = base.last_id if base is not None else 0
+
+        responses = Response.objects.filter(survey_id=survey_id, id__gt=after_id)
+        if upto_id is not None:
+            responses = responses.filter(id__lte=upto_id)
+        ids, region, csc, day = [], [], [], []
+        for rid, r_region, r_csc, submitted_at in responses.order_by("id").values_list("id", "region", "csc", "submitted_at").iterator(chunk_size=5000):
+            ids.append(rid)
+            region.append(regions.encode(r_region))
+            csc.append(cscs.encode(r_csc))
+            # Same day as the dashboard's date filters and the rollups.
+            day.append(local_date(submitted_at).toordinal())
+
+        answer_response, question, rating, choice, code = [], [], [], [], []
+        if ids:
+            answers = Answer.objects.filter(response__survey_id=survey_id, response_id__gt=after_id, response_id__lte=ids[-1])
+            for a_response, a_question, a_rating, a_choice, a_code in answers.values_list(
+                "response_id", "question_id", "rating", "choice", "code"
+            ).iterator(chunk_size=20000):
+                answer_response.append(a_response)
+                question.append(a_question)
+                rating.append(_rating(a_rating))
+                choice.append(choices.encode(a_choice))
+                code.append(codes.encode(a_code))
+
+        new_ids = np.array(ids, dtype=np.int64)
+        answer_response = np.array(answer_response, dtype=np.int64)
+        # Responses are ordered by id, so an answer finds its response by binary search.
+        pos = np.searchsorted(new_ids, answer_response)
+        # Answers of a response that committed between the two queries are left out with it.
+        loaded = pos < len(new_ids)
+        loaded[loaded] = new_ids[pos[loaded]] == answer_response[loaded]
+        offset = len(base.response_id) if base is not None else 0
+        new = (
+            new_ids,
+            np.array(region, dtype=np.int32),
+            np.array(csc, dtype=np.int32),
+            np.array(day, dtype=np.int32),
+            (pos[loaded] + offset).astype(np.int32),
+            np.array(question, dtype=np.int32)[loaded],
+            np.array(rating, dtype=np.int8)[loaded],
+            np.array(choice, dtype=np.int32)[loaded],
+            np.array(code, dtype=np.int32)[loaded],
+        )
+        if base is not None:
+            new = tuple(np.concatenate([old, part]) for old, part in zip(base.columns, new))
+        return cls(survey_id, generation, new, dictionaries)
+
+    def select(self, day_from=None, day_to=None, region=None) -> Selection:
+        """Masks for the dashboard filters: inclusive local days and a region or CSC."""
+        responses = np.ones(len(self.response_id), dtype=bool)
+        if day_from:
+            responses &= self.response_day >= day_from.toordinal()
+        if day_to:
+            responses &= self.response_day <= day_to.toordinal()
+        if region:
+            for field, value in response_region_filter(region).items():
+                column, dictionary = (self.response_region, self.regions) if field == "region" else (self.response_csc, self.cscs)
+                code = dictionary.index.get(value)
+                if code is None:
+                    responses[:] = False
+                else:
+                    responses &= column == code
+        return Selection(responses, responses[self.answer_pos])
+
+    def response_count(self, selection) -> int:
+        return int(np.count_nonzero(selection.responses))
+
+    def aggregates(self, selection, rating_question_ids, choice_question_ids=()) -> AnswerAggregates:
+        """The same ``AnswerAggregates`` as ``surveys.aggregates.aggregate_answers``."""
+        rating_counts = {}
+        rating_sums = {}
+        rating_question_ids = sorted(set(rating_question_ids))
+        if rating_question_ids:
+            qids = np.array(rating_question_ids, dtype=np.int32)
+            mask = selection.answers & np.isin(self.answer_question, qids) & (self.answer_rating != NO_RATING)
+            dense = np.searchsorted(qids, self.answer_question[mask]).astype(np.int64)
+            # One bincount over (question, rating + 128) gives every distribution at once.
+            counts = np.bincount(dense * 256 + (self.answer_rating[mask].astype(np.int64) + 128), minlength=len(qids) * 256)
+            counts = counts.reshape(len(qids), 256)
+            values = np.arange(-128, 128, dtype=np.int64)
+            for i, qid in enumerate(rating_question_ids):
+                row = counts[i]
+                n = int(row.sum())
+                if not n:
+                    continue
+                rating_sums[qid] = (n, int((row * values).sum()))
+                buckets = empty_rating_counts()
+                for r in RATING_VALUES:
+                    buckets[r] = int(row[r + 128])
+                if any(buckets.values()):
+                    rating_counts[qid] = buckets
+
+        choice_counts = {}
+        code_counts = {}
+        choice_question_ids = sorted({q for q in choice_question_ids if q is not None})
+        if choice_question_ids:
+            mask = selection.answers & np.isin(self.answer_question, np.array(choice_question_ids, dtype=np.int32))
+            # Ordered by question and value, as the grouped SQL query returns them.
+            groups = self._group(self.answer_question[mask], self.answer_choice[mask])
+            for (qid, choice), c in sorted(groups, key=lambda g: (g[0][0], self.choices.values[g[0][1]])):
+                choice_counts.setdefault(qid, {})[self.choices.values[choice]] = c
+            groups = self._group(self.answer_question[mask], self.answer_code[mask])
+            for (qid, code), c in sorted(groups, key=lambda g: (g[0][0], self.codes.values[g[0][1]])):
+                if code:
+                    code_counts.setdefault(qid, {})[self.codes.values[code]] = c
+
+        return AnswerAggregates(
+            rating_counts=rating_counts, rating_sums=rating_sums, choice_counts=choice_counts, code_counts=code_counts
+        )
+
+    def answer_pairs(self, selection, row_question_id, column_question_ids, ratings_only=False) -> list:
+        """``(choice, code, column rating, column choice, column code, count)`` rows pairing each
+        answer to ``row_question_id`` with the answers of the same response to the column
+        questions, as ``surveys.crosstab.answer_pairs`` reads them from the database."""
+        rows = np.flatnonzero(selection.answers & (self.answer_question == row_question_id))
+        # Response position -> the row answer of that response (one per response).
+        row_of = np.full(len(self.response_id), -1, dtype=np.int64)
+        row_of[self.answer_pos[rows]] = rows
+        columns = selection.answers & np.isin(self.answer_question, np.array(list(column_question_ids), dtype=np.int32))
+        if ratings_only:
+            columns &= self.answer_rating != NO_RATING
+        columns = np.flatnonzero(columns)
+        linked = row_of[self.answer_pos[columns]]
+        keep = linked >= 0
+        linked, columns = linked[keep], columns[keep]
+        out = []
+        for (choice, code, rating, col_choice, col_code), c in self._group(
+            self.answer_choice[linked], self.answer_code[linked],
+            self.answer_rating[columns], self.answer_choice[columns], self.answer_code[columns],
+        ):
+            out.append((
+                self.choices.values[choice], self.codes.values[code],
+                None if rating == NO_RATING else rating,
+                self.choices.values[col_choice], self.codes.values[col_code], c,
+            ))
+        return out
+
+    @staticmethod
+    def _group(*columns):
+        """``((value, ...), count)`` for each distinct combination of the column values."""
+        if not len(columns[0]):
+            return []
+        keys, counts = np.unique(np.stack([c.astype(np.int64) for c in columns], axis=1), axis=0, return_counts=True)
+        return [(tuple(int(v) for v in key), int(c)) for key, c in zip(keys, counts)]
+
+
+_cubes = OrderedDict()
+_cubes_lock = threading.Lock()
+_survey_locks = {}
+
+
+def _enabled() -> bool:
+    return bool(getattr(settings, "SURVEY_ANSWER_CUBE", False))
+
+
+def _max_answers() -> int:
+    return int(getattr(settings, "SURVEY_ANSWER_CUBE_MAX_ANSWERS", 1_000_000))
+
+
+def _max_surveys() -> int:
+    return int(getattr(settings, "SURVEY_ANSWER_CUBE_SURVEYS", 4))
+
+
+def _oversized_key(survey_id, version, history) -> str:
+    return f"cube:oversized:{survey_id}:{version}:{history}"
+
+
+def _too_large(survey_id, version, history, responses) -> bool:
+    """Whether the survey has more than ``SURVEY_ANSWER_CUBE_MAX_ANSWERS`` answers.
+
+    A survey found too large stays so until it is edited, so the verdict is shared
+    through the cache and the answers are counted once per survey version, not on every
+    submission in every worker.
+    """
+    limit = _max_answers()
+    key = _oversized_key(survey_id, version, history)
+    if cache.get(key):
+        return True
+    # A response answers each question at most once.
+    if responses * Question.objects.filter(survey_id=survey_id).count() <= limit:
+        return False
+    if Answer.objects.filter(response__survey_id=survey_id).count() <= limit:
+        return False
+    cache.set(key, True, OVERSIZED_TIMEOUT)
+    return True
+
+
+def get_answer_cube(survey_id):
+    """The survey's ``AnswerCube`` for its current data generation, or None.
+
+    None when cubes are disabled (``SURVEY_ANSWER_CUBE``) or the survey has more than
+    ``SURVEY_ANSWER_CUBE_MAX_ANSWERS`` answers; callers then query the database.
+    """
+    if not _enabled():
+        return None
+    generation, _last_submitted_at = get_data_generation(survey_id)
+    with _cubes_lock:
+        cube = _cubes.get(survey_id)
+        if cube is not None:
+            _cubes.move_to_end(survey_id)
+        lock = _survey_locks.setdefault(survey_id, threading.Lock())
+    if cube is not None and cube.generation == generation:
+        return cube
+
+    # One refresh per survey at a time; others wait and reuse its result.
+    with lock:
+        with _cubes_lock:
+            cube = _cubes.get(survey_id)
+        if cube is not None and cube.generation == generation:
+            return cube
+        version, count, last_id, history = split_generation(generation)
+        fresh = None
+        if cube is not None and (cube.version, cube.history) == (version, history) and last_id >= cube.last_id:
+            fresh = AnswerCube.load(survey_id, generation, base=cube, upto_id=last_id)
+            if len(fresh.response_id) != count:
+                # Responses were deleted, or committed below the last loaded id.
+                fresh = None
+        if fresh is None:
+            if _too_large(survey_id, version, history, count):
+                with _cubes_lock:
+                    _cubes.pop(survey_id, None)
+                return None
+            fresh = AnswerCube.load(survey_id, generation, upto_id=last_id)
+        with _cubes_lock:
+            _cubes[survey_id] = fresh
+            _cubes.move_to_end(survey_id)
+            while len(_cubes) > _max_surveys():
+                _cubes.popitem(last=False)
+        return fresh
 
-# Basic stubs for analytics helpers
 
 def average_ratings(answers: Iterable[Dict[int, float]]) -> float:
     """Compute average rating from list of ratings-like dicts or values."""
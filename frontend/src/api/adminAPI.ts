@@ -44,11 +44,188 @@ export type DashboardQuery = {
   to?: string
 }
 
-export async function fetchDashboardWithParams(params?: DashboardQuery) {
+// `fields`: comma-separated blocks (e.g. 'totals,rating_overview'); only those are computed.
+// `refresh`: recompute instead of serving cached or precomputed blocks.
+export async function fetchDashboardWithParams(params?: DashboardQuery & { fields?: string; refresh?: 1 }) {
   const res = await axiosClient.get('/api/admin/dashboard/', { params })
   return res.data
 }
 
+export type TimeseriesQuery = DashboardQuery & {
+  granularity?: 'hour' | 'day' | 'week'
+  tz?: string
+}
+
+export type TimeseriesResponse = {
+  survey: { id: number; title: string } | null
+  granularity: 'hour' | 'day' | 'week'
+  tz: string
+  from: string
+  to: string
+  buckets: Array<{ start: string; count: number }>
+}
+
+export async function fetchDashboardTimeseries(params?: TimeseriesQuery): Promise<TimeseriesResponse> {
+  const res = await axiosClient.get('/api/admin/dashboard/timeseries/', { params })
+  return res.data
+}
+
+// `row`: choice/regions question id or demographic role; `col`: question id, role or 'rating' (all pooled).
+export type CrosstabQuery = DashboardQuery & {
+  row: string | number
+  col: string | number
+}
+
+type CrosstabCell = { count: number; total: number; percent: number }
+
+export type CrosstabResponse = {
+  survey: { id: number; title: string }
+  row: { question_id: number | null; question: string; type: string; role: string }
+  column: { question_id: number | null; question: string; type: string; role: string }
+  columns: Array<{ key: string; title: string; title_am?: string }>
+  // Percentages in each row sum to 100.
+  rows: Array<{ key: string; title: string; title_am?: string; total: number; cells: Record<string, CrosstabCell> }>
+  totals: { total: number; cells: Record<string, CrosstabCell> }
+}
+
+export async function fetchDashboardCrosstab(params: CrosstabQuery): Promise<CrosstabResponse> {
+  const res = await axiosClient.get('/api/admin/dashboard/crosstab/', { params })
+  return res.data
+}
+
+export type PortfolioResponse = {
+  years: number[]
+  surveys: Array<{
+    id: number
+    title: string
+    budget_year: number | null
+    is_active: boolean
+    responses: number
+    // Set when read from the summary stored at deactivation.
+    summary_at: string | null
+    avg_rating: number | null
+    ratings: Record<string, CrosstabCell>
+    sections: Array<{ section_id: number; title: string; key: string; answers: number; avg_rating: number | null }>
+  }>
+  // Questions found in more than one survey, matched by normalised text.
+  questions: Array<{
+    key: string
+    question: string
+    surveys: Array<{ survey: number; budget_year: number | null; question_id: number; answers: number; avg_rating: number | null }>
+  }>
+}
+
+export async function fetchDashboardPortfolio(years?: number[]): Promise<PortfolioResponse> {
+  const res = await axiosClient.get('/api/admin/dashboard/portfolio/', { params: years?.length ? { years: years.join(',') } : undefined })
+  return res.data
+}
+
+export type CommentQuery = DashboardQuery & {
+  // A text or paragraph question id.
+  question?: number
+}
+
+export type CommentTermsResponse = {
+  survey: { id: number; title: string }
+  // Comments with at least one indexed term.
+  comments: number
+  // `answers`: comments mentioning the term; `occurrences`: mentions in all.
+  terms: Array<{ term: string; answers: number; occurrences: number }>
+}
+
+export async function fetchCommentTerms(params?: CommentQuery & { limit?: number }): Promise<CommentTermsResponse> {
+  const res = await axiosClient.get('/api/admin/dashboard/comments/terms/', { params })
+  return res.data
+}
+
+export type CommentMatchesResponse = {
+  survey: { id: number; title: string }
+  // The normalised terms every comment contains.
+  terms: string[]
+  count: number
+  page: number
+  page_size: number
+  results: Array<{
+    response_id: number
+    submitted_at: string
+    region: string
+    csc: string
+    question_id: number
+    question: string
+    comment: string
+  }>
+}
+
+export async function fetchCommentMatches(
+  params: CommentQuery & { term: string; page?: number; page_size?: number },
+): Promise<CommentMatchesResponse> {
+  const res = await axiosClient.get('/api/admin/dashboard/comments/', { params })
+  return res.data
+}
+
+export type LiveDelta = {
+  survey: number
+  last_id: number
+  responses: number
+  ratings: Record<string, Record<string, number>>
+  regions: Record<string, { responses: number; children: Record<string, number> }>
+}
+
+type LiveHandlers = {
+  onDelta: (delta: LiveDelta) => void
+  // Too many updates were missed: reload the dashboard.
+  onResync?: () => void
+}
+
+// Follows GET /api/admin/dashboard/live/ until `signal` aborts. EventSource cannot send the
+// Authorization header, so the stream is read with fetch; it reconnects with Last-Event-ID.
+export async function followDashboardLive(params: DashboardQuery, handlers: LiveHandlers, signal: AbortSignal) {
+  const base = (axiosClient.defaults.baseURL || '').replace(/\/$/, '')
+  const query = new URLSearchParams()
+  if (params.survey != null) query.set('survey', String(params.survey))
+  if (params.region) query.set('region', params.region)
+  let lastId: string | null = null
+  let retryMs = 3000
+
+  while (!signal.aborted) {
+    try {
+      const headers: Record<string, string> = { Accept: 'text/event-stream' }
+      const token = localStorage.getItem('eeu_admin_token')
+      if (token) headers.Authorization = `Bearer ${token}`
+      if (lastId) headers['Last-Event-ID'] = lastId
+      const res = await fetch(`${base}/api/admin/dashboard/live/?${query}`, { headers, signal })
+      if (res.status === 401 || res.status === 403 || res.status === 404) return
+      if (!res.ok || !res.body) throw new Error(`live stream failed: ${res.status}`)
+
+      const reader = res.body.pipeThrough(new TextDecoderStream()).getReader()
+      let buffer = ''
+      for (;;) {
+        const { value, done } = await reader.read()
+        if (done) break
+        buffer += value
+        let sep: number
+        while ((sep = buffer.indexOf('\n\n')) >= 0) {
+          const block = buffer.slice(0, sep)
+          buffer = buffer.slice(sep + 2)
+          let event = 'message'
+          let data = ''
+          for (const line of block.split('\n')) {
+            if (line.startsWith('event: ')) event = line.slice(7)
+            else if (line.startsWith('data: ')) data += line.slice(6)
+            else if (line.startsWith('id: ')) lastId = line.slice(4)
+            else if (line.startsWith('retry: ')) retryMs = Number(line.slice(7)) || retryMs
+          }
+          if (event === 'delta' && data) handlers.onDelta(JSON.parse(data))
+          else if (event === 'resync') handlers.onResync?.()
+        }
+      }
+    } catch {
+      if (signal.aborted) return
+    }
+    await new Promise((resolve) => setTimeout(resolve, retryMs))
+  }
+}
+
 export async function changePassword(current_password: string, new_password: string): Promise<{ detail: string }> {
   const res = await axiosClient.post('/api/admin/change-password/', { current_password, new_password })
   return res.data
@@ -97,6 +274,9 @@ export async function resetAdminUserPassword(id: number, new_password: string):
 // Types
 export type QuestionType = 'rating' | 'text' | 'regions' | 'dropdown' | 'multiple_choice' | 'linear_scale' | 'paragraph'
 
+// Respondent attribute a question asks for; omitted on save, it is suggested by the server.
+export type DemographicRole = 'gender' | 'age_band' | 'education' | 'region' | 'tenure'
+
 export type LinearScaleLabels = {
   1: string
   2: string
@@ -117,6 +297,7 @@ export type AdminSurveyQuestion = {
   labels?: LinearScaleLabels
   displayStyle?: 'stars' | 'emojis' | 'numbers'
   maxChars?: number
+  demographicRole?: DemographicRole | ''
 }
 
 export type AdminSurveySection = {
@@ -166,6 +347,7 @@ export type CreateSurveyInput = {
       labels?: LinearScaleLabels
       displayStyle?: 'stars' | 'emojis' | 'numbers'
       maxChars?: number
+      demographicRole?: DemographicRole | ''
     }>
   }>
   questions?: Array<{
@@ -180,6 +362,7 @@ export type CreateSurveyInput = {
     labels?: LinearScaleLabels
     displayStyle?: 'stars' | 'emojis' | 'numbers'
     maxChars?: number
+    demographicRole?: DemographicRole | ''
   }>
 }
 
@@ -223,6 +406,8 @@ export type AdminAnswer = {
   rating?: number | null
   comment?: string
   choice?: string
+  // With `q`: the comment as HTML with the matches in <mark>, on matching answers only
+  highlight?: string
 }
 
 export type AdminResponseItem = {
@@ -230,6 +415,8 @@ export type AdminResponseItem = {
   submitted_at: string
   survey: { id: number; title: string }
   answers: AdminAnswer[]
+  // With `q`: relevance, higher is better
+  rank?: number
 }
 
 export type ResponsesQuery = {
@@ -239,6 +426,8 @@ export type ResponsesQuery = {
   question?: number
   rating_min?: number
   rating_max?: number
+  // Full-text search of comments; "quoted phrases" match in sequence
+  q?: string
   page?: number
   page_size?: number
 }
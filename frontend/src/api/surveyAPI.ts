@@ -57,8 +57,39 @@ export async function getActiveSurvey(): Promise<ActiveSurvey | null> {
   return res.data || null
 }
 
+export type RegionOption = {
+  value: string
+  title: string
+}
+
+export type RegionCatalogEntry = {
+  key: string
+  en: RegionOption
+  am: RegionOption
+  children: RegionOption[]
+}
+
+let regionCatalog: Promise<RegionCatalogEntry[]> | null = null
+
+// The catalog only changes on deploy; fetch it once per page load (revalidated by ETag).
+export function getRegionCatalog(): Promise<RegionCatalogEntry[]> {
+  if (!regionCatalog) {
+    regionCatalog = axiosClient.get('/api/regions/').then((res) => (res.data?.regions || []) as RegionCatalogEntry[])
+    regionCatalog.catch(() => {
+      regionCatalog = null
+    })
+  }
+  return regionCatalog
+}
+
+export function regionOptionsFor(catalog: RegionCatalogEntry[], lang: string): RegionOption[] {
+  return catalog.map((r) => (lang === 'am' ? r.am : r.en))
+}
+
 export type SubmitSurveyPayload = {
   survey: number
+  // Client-generated idempotency key: retries with the same id are not stored twice.
+  submission_id?: string
   answers: Array<{
     question: number
     rating?: number
@@ -67,6 +98,16 @@ export type SubmitSurveyPayload = {
   }>
 }
 
+export function newSubmissionId(): string {
+  if (typeof crypto !== 'undefined' && typeof crypto.randomUUID === 'function') {
+    return crypto.randomUUID()
+  }
+  // crypto.randomUUID is only available in secure contexts (HTTPS/localhost).
+  const bytes = new Uint8Array(16)
+  crypto.getRandomValues(bytes)
+  return Array.from(bytes, (b) => b.toString(16).padStart(2, '0')).join('')
+}
+
 export async function submitSurvey(payload: SubmitSurveyPayload): Promise<{ ok: boolean }> {
   const res = await axiosClient.post('/api/survey/submit/', payload)
   return res.data
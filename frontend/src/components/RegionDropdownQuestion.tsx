@@ -1,12 +1,6 @@
-import React, { useMemo } from 'react'
-import RegionsEn from '@/data/Regions-en.json'
-import RegionsAm from '@/data/Regions-am.json'
+import React, { useEffect, useMemo, useState } from 'react'
 import { useI18n } from '@/context/I18nContext'
-
-type RegionOption = {
-  value: string
-  title: string
-}
+import { getRegionCatalog, regionOptionsFor, type RegionCatalogEntry } from '@/api/surveyAPI'
 
 type Props = {
   value: string
@@ -22,11 +16,13 @@ export default function RegionDropdownQuestion({
   placeholder = 'Select a region',
 }: Props) {
   const { lang } = useI18n()
+  const [catalog, setCatalog] = useState<RegionCatalogEntry[]>([])
+
+  useEffect(() => {
+    getRegionCatalog().then(setCatalog).catch(() => {})
+  }, [])
 
-  const options = useMemo(() => {
-    const data = (lang === 'am' ? RegionsAm : RegionsEn) as unknown as RegionOption[]
-    return data
-  }, [lang])
+  const options = useMemo(() => regionOptionsFor(catalog, lang), [catalog, lang])
 
   return (
     <div className="mt-1">
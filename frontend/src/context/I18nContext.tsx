@@ -48,6 +48,8 @@ const strings: Record<Lang, Dict> = {
 
     'dashboard.title': 'Dashboard',
     'dashboard.active_survey': 'Active survey',
+    'dashboard.computed_at': 'Computed at',
+    'dashboard.refresh': 'Refresh',
     'dashboard.total_responses': 'Total Responses',
     'dashboard.questions_rated': 'Questions Rated',
     'dashboard.recent_submissions': 'Recent Submissions',
@@ -60,6 +62,11 @@ const strings: Record<Lang, Dict> = {
     'dashboard.rating_3': 'Neutral',
     'dashboard.rating_4': 'Satisfied',
     'dashboard.rating_5': 'Very Satisfied',
+    'dashboard.stat_mean_ci': 'Mean (95% CI)',
+    'dashboard.stat_median': 'Median',
+    'dashboard.stat_top2': 'Top-2 box',
+    'dashboard.stat_bottom2': 'Bottom-2 box',
+    'dashboard.stat_net': 'Net score',
     'dashboard.no_active': 'No active survey',
     'dashboard.no_active_desc': 'Create and activate a survey to start collecting responses.',
     'dashboard.no_responses': 'No responses yet',
@@ -124,6 +131,14 @@ const strings: Record<Lang, Dict> = {
     'manage.builder_type_rating': 'Rating',
     'manage.builder_type_regions': 'Regions',
     'manage.builder_type_text': 'Short text',
+    'manage.builder_role_label': 'Demographic role (used by the dashboard)',
+    'manage.builder_role_auto': 'Role: detect from text',
+    'manage.builder_role_none': 'Role: none',
+    'manage.builder_role_gender': 'Role: gender',
+    'manage.builder_role_age_band': 'Role: age band',
+    'manage.builder_role_education': 'Role: education level',
+    'manage.builder_role_region': 'Role: region',
+    'manage.builder_role_tenure': 'Role: years of service',
     'manage.builder_options_label': 'Options (one per line)',
     'manage.builder_min_label': 'Min label',
     'manage.builder_max_label': 'Max label',
@@ -213,6 +228,8 @@ const strings: Record<Lang, Dict> = {
 
     'dashboard.title': 'ዳሽቦርድ',
     'dashboard.active_survey': 'ንቁ የጥናት መለኪያ',
+    'dashboard.computed_at': 'የተሰላበት ጊዜ',
+    'dashboard.refresh': 'አድስ',
     'dashboard.total_responses': 'ጠቅላላ መልሶች',
     'dashboard.questions_rated': 'የተደረጉ ጥያቄዎች',
     'dashboard.recent_submissions': 'ቅርብ ማቅረቦች',
@@ -225,6 +242,11 @@ const strings: Record<Lang, Dict> = {
     'dashboard.rating_3': 'መካከለኛ',
     'dashboard.rating_4': 'ረክቻለሁ',
     'dashboard.rating_5': 'በጣም ረክቻለሁ',
+    'dashboard.stat_mean_ci': 'አማካይ (95% የእምነት ክልል)',
+    'dashboard.stat_median': 'መካከለኛ እሴት',
+    'dashboard.stat_top2': 'ከፍተኛ 2 (4–5)',
+    'dashboard.stat_bottom2': 'ዝቅተኛ 2 (1–2)',
+    'dashboard.stat_net': 'የተጣራ ውጤት',
     'dashboard.no_active': 'ንቁ የጥናት መለኪያ የለም',
     'dashboard.no_active_desc': 'መረጃ ለመሰብሰብ መለኪያ ይፍጠሩና ያንቁት።',
     'dashboard.no_responses': 'እስካሁን ምላሽ የለም',
@@ -289,6 +311,14 @@ const strings: Record<Lang, Dict> = {
     'manage.builder_type_rating': 'ደረጃ',
     'manage.builder_type_regions': 'ክልል',
     'manage.builder_type_text': 'አጭር ጽሑፍ',
+    'manage.builder_role_label': 'የሥነ-ሕዝብ ሚና (ለዳሽቦርድ)',
+    'manage.builder_role_auto': 'ሚና: ከጽሑፉ ይለይ',
+    'manage.builder_role_none': 'ሚና: የለም',
+    'manage.builder_role_gender': 'ሚና: ጾታ',
+    'manage.builder_role_age_band': 'ሚና: የዕድሜ ክልል',
+    'manage.builder_role_education': 'ሚና: የትምህርት ደረጃ',
+    'manage.builder_role_region': 'ሚና: ክልል',
+    'manage.builder_role_tenure': 'ሚና: የአገልግሎት ዘመን',
     'manage.builder_options_label': 'አማራጮች (እያንዳንዱ በመስመር)',
     'manage.builder_min_label': 'ዝቅተኛ መጠን',
     'manage.builder_max_label': 'ከፍተኛ መጠን',
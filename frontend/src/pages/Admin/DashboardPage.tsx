@@ -1,24 +1,38 @@
 import React, { useEffect, useState } from 'react'
 import { useNavigate } from 'react-router-dom'
 import ChartCard from '@/components/ChartCard'
-import { fetchDashboardWithParams, listSurveys, type AdminSurvey } from '@/api/adminAPI'
+import { fetchDashboardWithParams, followDashboardLive, listSurveys, type AdminSurvey, type LiveDelta } from '@/api/adminAPI'
 import { ResponsiveContainer, LineChart, Line, XAxis, YAxis, Tooltip, Legend, PieChart, Pie, Cell, BarChart, Bar, LabelList } from 'recharts'
 import SafeHtml from '@/components/SafeHtml'
 import { ClipboardDocumentListIcon, InboxStackIcon, MapPinIcon } from '@heroicons/react/24/outline'
 import { useI18n } from '@/context/I18nContext'
 import { useTheme } from '@/context/ThemeContext'
-import RegionsEn from '@/data/Regions-en.json'
-import RegionsAm from '@/data/Regions-am.json'
+import { getRegionCatalog, regionOptionsFor, type RegionCatalogEntry } from '@/api/surveyAPI'
+
+type RatingStatistics = {
+  n: number
+  mean: number | null
+  ci95: [number, number] | null
+  sd: number | null
+  median: number | null
+  top2_box: number | null
+  bottom2_box: number | null
+  net_score: number | null
+}
 
 type DashboardData = {
   survey: { id: number; title: string } | null
   totals: { responses: number }
   averages: Array<{ question_id: number; question: string; avg_rating: number | null }>
   recent: Array<{ id: number; submitted_at: string }>
+  // When the oldest block was computed (it may come from a precomputed snapshot).
+  computed_at?: string
   timeseries?: Array<{ date: string; count: number }>
   distributions?: Record<string, Record<string | number, number>>
   rating_overview?: Record<string, { count: number; total: number; percent: number }>
   rating_question_overview?: Record<string, Record<string, { count: number; total: number; percent: number }>>
+  rating_statistics?: RatingStatistics
+  question_statistics?: Record<string, RatingStatistics>
   rating_section_overview?: Array<{
     section_id: number | null
     title: string
@@ -46,20 +60,79 @@ type DashboardData = {
     total: number
     percent: Record<string, number>
   } | null
+  region_breakdown?: {
+    regions: Array<RegionRollup & {
+      key: string
+      title_am: string
+      children: Array<RegionRollup & { value: string }>
+    }>
+    other: RegionRollup | null
+  }
   filters?: { region?: string | null }
 }
 
+type RegionRollup = {
+  title?: string
+  responses: number
+  avg_rating: number | null
+  ratings: Record<string, { count: number; total: number; percent: number }>
+}
+
+// Adds a live delta to the loaded dashboard: totals, rating distributions and averages,
+// and region response counts. Percent breakdowns refresh on the next full load.
+function applyLiveDelta(data: DashboardData, delta: LiveDelta): DashboardData {
+  if (!data.survey || data.survey.id !== delta.survey) return data
+  const distributions = { ...(data.distributions || {}) }
+  for (const [qid, counts] of Object.entries(delta.ratings)) {
+    const next = { ...(distributions[qid] || {}) } as Record<string, number>
+    for (const [rating, n] of Object.entries(counts)) next[rating] = (Number(next[rating]) || 0) + n
+    distributions[qid] = next
+  }
+  const averages = (data.averages || []).map((a) => {
+    const counts = distributions[String(a.question_id)]
+    if (!delta.ratings[String(a.question_id)] || !counts) return a
+    let n = 0
+    let sum = 0
+    for (const [rating, c] of Object.entries(counts)) {
+      n += Number(c) || 0
+      sum += Number(rating) * (Number(c) || 0)
+    }
+    return { ...a, avg_rating: n ? Math.round((sum / n) * 100) / 100 : null }
+  })
+  const breakdown = data.region_breakdown && {
+    ...data.region_breakdown,
+    regions: data.region_breakdown.regions.map((r) => {
+      const d = delta.regions[r.key]
+      if (!d) return r
+      return {
+        ...r,
+        responses: r.responses + d.responses,
+        children: r.children.map((c) => (d.children[c.value] ? { ...c, responses: c.responses + d.children[c.value] } : c)),
+      }
+    }),
+  }
+  return {
+    ...data,
+    totals: { ...data.totals, responses: (data.totals?.responses ?? 0) + delta.responses },
+    distributions,
+    averages,
+    region_breakdown: breakdown,
+  }
+}
+
 export default function DashboardPage() {
   const [loading, setLoading] = useState(true)
   const [data, setData] = useState<DashboardData | null>(null)
   const [error, setError] = useState<string | null>(null)
   const [region, setRegion] = useState<string>('')
+  const [regionCatalog, setRegionCatalog] = useState<RegionCatalogEntry[]>([])
   const [surveys, setSurveys] = useState<AdminSurvey[]>([])
   const [surveyQuery, setSurveyQuery] = useState<string>('')
   const [budgetYear, setBudgetYear] = useState<string>('')
   const [surveyId, setSurveyId] = useState<number | undefined>(undefined)
   const [fromDate, setFromDate] = useState<string>('')
   const [toDate, setToDate] = useState<string>('')
+  const [refreshing, setRefreshing] = useState(false)
   const navigate = useNavigate()
   const { t, lang } = useI18n()
   const { theme } = useTheme()
@@ -85,6 +158,44 @@ export default function DashboardPage() {
       .finally(() => setLoading(false))
   }, [region, surveyId, fromDate, toDate])
 
+  // Recompute instead of serving cached or precomputed blocks.
+  const refreshDashboard = () => {
+    setRefreshing(true)
+    fetchDashboardWithParams({
+      region: region || undefined,
+      survey: surveyId,
+      from: fromDate || undefined,
+      to: toDate || undefined,
+      refresh: 1,
+    })
+      .then((res) => setData(res))
+      .catch((e) => setError(e?.message || 'Failed to load dashboard'))
+      .finally(() => setRefreshing(false))
+  }
+
+  // Follow new submissions while the range reaches today (date filters use local days).
+  useEffect(() => {
+    const today = new Date().toLocaleDateString('en-CA')
+    if (toDate && toDate < today) return
+    const controller = new AbortController()
+    const params: any = {}
+    if (region) params.region = region
+    if (surveyId != null) params.survey = surveyId
+    followDashboardLive(
+      params,
+      {
+        onDelta: (delta) => setData((prev) => (prev ? applyLiveDelta(prev, delta) : prev)),
+        onResync: () => {
+          fetchDashboardWithParams({ ...params, from: fromDate || undefined, to: toDate || undefined })
+            .then((res) => setData(res))
+            .catch(() => {})
+        },
+      },
+      controller.signal,
+    )
+    return () => controller.abort()
+  }, [region, surveyId, fromDate, toDate])
+
   // Load surveys for selection with server-side filters (name and budget year)
   useEffect(() => {
     const params: any = {}
@@ -96,7 +207,11 @@ export default function DashboardPage() {
     listSurveys(params).then(setSurveys).catch(() => {})
   }, [surveyQuery, budgetYear])
 
-  const regionOptions = (lang === 'am' ? (RegionsAm as any) : (RegionsEn as any)) as Array<{ value: string; title: string }>
+  useEffect(() => {
+    getRegionCatalog().then(setRegionCatalog).catch(() => {})
+  }, [])
+
+  const regionOptions = regionOptionsFor(regionCatalog, lang)
 
   if (loading) return <div className="p-6">Loading dashboard...</div>
   if (error) return <div className="p-6 text-red-600">{error}</div>
@@ -195,6 +310,14 @@ export default function DashboardPage() {
             {t('dashboard.active_survey')}: <SafeHtml html={data.survey.title} className="rte-content inline font-medium" />
           </div>
         )}
+        {data.computed_at && (
+          <div className="text-xs text-gray-500 flex items-center gap-2">
+            <span>{t('dashboard.computed_at')}: {new Date(data.computed_at).toLocaleString()}</span>
+            <button onClick={refreshDashboard} disabled={refreshing} className="underline hover:text-gray-700 disabled:opacity-50">
+              {t('dashboard.refresh')}
+            </button>
+          </div>
+        )}
         <div className="grid grid-cols-1 md:grid-cols-6 gap-3">
           <div className="md:col-span-2">
             <label className="block text-xs text-gray-600 mb-1">Search name</label>
@@ -379,6 +502,7 @@ export default function DashboardPage() {
           <div className="grid grid-cols-1 md:grid-cols-2 xl:grid-cols-3 gap-4">
             {(data.averages || []).map((q) => {
               const qOverview = ratingQuestionOverview[String(q.question_id)] || {}
+              const qStats = data.question_statistics?.[String(q.question_id)]
               const qpct1 = qOverview['1']?.percent ?? 0
               const qpct2 = qOverview['2']?.percent ?? 0
               const qpct3 = qOverview['3']?.percent ?? 0
@@ -407,6 +531,20 @@ export default function DashboardPage() {
                     <div className="font-semibold leading-snug">{stripHtml(q.question)}</div>
                     <div className="text-xs text-gray-500">{total} ratings</div>
                   </div>
+                  {qStats && qStats.n > 0 && (
+                    <div className="flex flex-wrap gap-x-4 gap-y-1 text-xs text-gray-600 mb-3 tabular-nums">
+                      <span>
+                        {t('dashboard.stat_mean_ci')}: <b>{qStats.mean}</b>
+                        {qStats.ci95 ? ` (${qStats.ci95[0]}–${qStats.ci95[1]})` : ''}
+                      </span>
+                      <span>{t('dashboard.stat_median')}: <b>{qStats.median}</b></span>
+                      <span>{t('dashboard.stat_top2')}: <b>{fmtPct(qStats.top2_box ?? 0)}</b></span>
+                      <span>{t('dashboard.stat_bottom2')}: <b>{fmtPct(qStats.bottom2_box ?? 0)}</b></span>
+                      <span>
+                        {t('dashboard.stat_net')}: <b>{(qStats.net_score ?? 0) > 0 ? '+' : ''}{qStats.net_score}</b>
+                      </span>
+                    </div>
+                  )}
 
                   <div className="grid grid-cols-1 sm:grid-cols-2 gap-4 items-center">
                     <div className="w-full h-56">
@@ -564,6 +702,52 @@ export default function DashboardPage() {
         </div>
       )}
 
+      {/* Responses and average rating per region; click a region to drill down into its CSCs */}
+      {(data.region_breakdown?.regions?.length ?? 0) > 0 && (
+        <div className="bg-white rounded border p-4">
+          <h3 className="font-semibold mb-2">{lang === 'am' ? 'ክልሎች' : 'Regions'}</h3>
+          <table className="w-full text-sm">
+            <thead>
+              <tr className="text-left text-gray-600">
+                <th className="py-1">{lang === 'am' ? 'ክልል' : 'Region'}</th>
+                <th className="py-1 text-right">Responses</th>
+                <th className="py-1 text-right">Avg Rating</th>
+                <th className="py-1 text-right">4–5</th>
+              </tr>
+            </thead>
+            <tbody className="divide-y">
+              {data.region_breakdown!.regions.flatMap((r) => {
+                const rows = [
+                  { id: r.key, title: lang === 'am' ? r.title_am : r.title, stats: r as RegionRollup, child: false },
+                ]
+                if (region) {
+                  r.children.forEach((c) => rows.push({ id: `${r.key}/${c.value}`, title: c.value, stats: c, child: true }))
+                }
+                return rows.map((row) => {
+                  const top = (row.stats.ratings['4']?.percent ?? 0) + (row.stats.ratings['5']?.percent ?? 0)
+                  return (
+                    <tr
+                      key={row.id}
+                      className={row.child ? 'text-gray-700' : 'cursor-pointer hover:bg-gray-50'}
+                      onClick={() => {
+                        if (row.child) return
+                        const entry = regionCatalog.find((x) => x.key === r.key)
+                        setRegion(entry ? (lang === 'am' ? entry.am.value : entry.en.value) : r.key)
+                      }}
+                    >
+                      <td className={row.child ? 'py-1 pl-6' : 'py-1 font-medium'}>{row.title}</td>
+                      <td className="py-1 text-right">{row.stats.responses}</td>
+                      <td className="py-1 text-right">{row.stats.avg_rating ?? '-'}</td>
+                      <td className="py-1 text-right">{fmtPct(Math.round(top * 10) / 10)}</td>
+                    </tr>
+                  )
+                })
+              })}
+            </tbody>
+          </table>
+        </div>
+      )}
+
       {/* Responses over time (line chart) */}
       <div className="bg-white rounded border p-4">
         <h3 className="font-semibold mb-2">{t('dashboard.responses_over_time')}</h3>
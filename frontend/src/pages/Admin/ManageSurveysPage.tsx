@@ -24,6 +24,7 @@ import {
   type CreateSurveyInput,
   type QuestionType,
   type LinearScaleLabels,
+  type DemographicRole,
 } from '@/api/adminAPI'
 import { useI18n } from '@/context/I18nContext'
 import { useNavigate } from 'react-router-dom'
@@ -42,6 +43,8 @@ type NewQuestion = {
   labels?: LinearScaleLabels
   displayStyle?: 'stars' | 'emojis' | 'numbers'
   maxChars?: number
+  // Undefined until chosen: the server then suggests one from the question text.
+  demographicRole?: DemographicRole | ''
 }
 
 type NewSection = {
@@ -158,6 +161,22 @@ const formatApiError = (e: any) => {
                 <option value="rating">{t('manage.builder_type_rating')}</option>
                 <option value="text">{t('manage.builder_type_text')}</option>
               </select>
+              {(optionsVisible || q.question_type === 'regions') && (
+                <select
+                  value={q.demographicRole ?? 'auto'}
+                  onChange={e => updateQuestion(mode, sectionId, q.id, { demographicRole: e.target.value as DemographicRole | '' })}
+                  className="border border-[#DADCE0] dark:border-slate-700 rounded px-2 py-1 text-xs bg-white dark:bg-slate-950 text-gray-900 dark:text-slate-100"
+                  title={t('manage.builder_role_label')}
+                >
+                  {q.demographicRole === undefined && <option value="auto">{t('manage.builder_role_auto')}</option>}
+                  <option value="">{t('manage.builder_role_none')}</option>
+                  <option value="gender">{t('manage.builder_role_gender')}</option>
+                  <option value="age_band">{t('manage.builder_role_age_band')}</option>
+                  <option value="education">{t('manage.builder_role_education')}</option>
+                  <option value="region">{t('manage.builder_role_region')}</option>
+                  <option value="tenure">{t('manage.builder_role_tenure')}</option>
+                </select>
+              )}
               <label className="inline-flex items-center gap-1">
                 <input
                   type="checkbox"
@@ -613,6 +632,7 @@ export default function ManageSurveysPage() {
               maxChars: getMaxCharsForType(q.question_type),
               labels: (q.question_type === 'linear_scale' || q.question_type === 'rating') ? q.labels : undefined,
               displayStyle: q.question_type === 'rating' ? q.displayStyle || 'stars' : undefined,
+              demographicRole: q.demographicRole,
             })),
         })),
       }
@@ -683,6 +703,7 @@ export default function ManageSurveysPage() {
             },
             displayStyle: (q as any).displayStyle || ((q.question_type === 'rating') ? 'stars' : undefined),
             maxChars: (q as any).maxChars ?? getMaxCharsForType(q.question_type),
+            demographicRole: q.demographicRole ?? '',
           })),
       }))
 
@@ -730,6 +751,7 @@ export default function ManageSurveysPage() {
                 maxChars: getMaxCharsForType(q.question_type),
                 labels: (q.question_type === 'linear_scale' || q.question_type === 'rating') ? q.labels : undefined,
                 displayStyle: q.question_type === 'rating' ? q.displayStyle || 'stars' : undefined,
+                demographicRole: q.demographicRole,
               }
               return q.backendId && existingQuestionIds.has(q.backendId)
                 ? { id: q.backendId, ...base }
@@ -1,6 +1,6 @@
 import React, { useEffect, useRef, useState } from 'react'
 import { useLocation, useNavigate, useParams } from 'react-router-dom'
-import { checkAttempts, getActiveSurvey, incrementAttempt, submitSurvey, type ActiveSurvey, type SurveyQuestionType } from '@/api/surveyAPI'
+import { checkAttempts, getActiveSurvey, incrementAttempt, newSubmissionId, submitSurvey, type ActiveSurvey, type SurveyQuestionType } from '@/api/surveyAPI'
 import TextQuestion from '@/components/TextQuestion'
 import LinearScaleQuestion from '@/components/LinearScaleQuestion'
 import RatingQuestion from '@/components/RatingQuestion'
@@ -24,6 +24,8 @@ export default function SurveyPage() {
   const { role } = useAuth()
   const isAdminRole = role === 'super_admin' || role === 'survey_designer' || role === 'viewer'
   const fingerprintRef = useRef<string | null>(null)
+  // Reused if the user retries after a failed submit, so the server stores it only once.
+  const submissionIdRef = useRef<string>(newSubmissionId())
 
   useEffect(() => {
     // For now, preview and normal survey both use the active survey endpoint.
@@ -193,6 +195,7 @@ export default function SurveyPage() {
     try {
       const payload = {
         survey: survey.id,
+        submission_id: submissionIdRef.current,
         answers: Object.entries(answers).map(([qid, a]) => ({ question: Number(qid), ...a }))
       }
       console.log('Submitting payload:', payload)